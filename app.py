@@ -3,102 +3,216 @@
 Streamlit web application for semantic search over Bahá'í Writings.
 """
 
-# import os
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from pinecone import Pinecone
 from openai import OpenAI
 # from dotenv import load_dotenv
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Optional, Sequence
+from rate_limiter import RateLimiter, estimate_tokens
+from embedding_cache import QueryEmbeddingCache, DEFAULT_QUERY_CACHE_PATH
+from completion_cache import CompletionCache, completion_key
+from index_stats import IndexStatsCache
+from fusion import reciprocal_rank_fusion
+from document_store import DocumentStore, DEFAULT_DOCUMENT_STORE_PATH
+from bm25 import BM25Index, DEFAULT_BM25_INDEX_PATH
+from vector_store import (VectorBackend, PineconeBackend, LocalVectorStore, DEFAULT_LOCAL_INDEX_PATH,
+                          FULL_EMBEDDING_DIMENSIONS, pinecone_index_name)
+from dimension_eval import append_query_log
+from hnsw import HNSWIndex
+from ivfpq import IVFPQIndex
+from quantization import BinaryIndex, Int8Index
 
 # Load environment variables
 # load_dotenv()
 
+# Upper end of the results slider; every search fetches this many so the slider can re-slice them
+MAX_RESULTS = 20
+
+# Searches remembered per session
+SEARCH_CACHE_ENTRIES = 16
+
+# End of a sentence: terminal punctuation, optional closing quote or bracket, then whitespace
+SENTENCE_END = re.compile(r"[.!?][\"'”’)\]]*\s")
+
+# Authors offered by the filter; "Other" is stored for documents without a known author
+AUTHORS = [
+    "Bahá'u'lláh", 
+    "'Abdu'l-Bahá", 
+    "The Báb", 
+    "Shoghi Effendi", 
+    "Universal House of Justice", 
+    "Compilations"
+]
+
 class BahaiSemanticSearch:
-    def __init__(self, openai_api_key: str, pinecone_api_key: str):
-        """Initialize the semantic search engine."""
-        self.openai_client = OpenAI(api_key=openai_api_key)
-        self.pc = Pinecone(api_key=pinecone_api_key)
-        self.index_name = "bahai-writings"
+    def __init__(self, openai_api_key: str, pinecone_api_key: Optional[str], backend: Optional[VectorBackend] = None,
+                 dimensions: int = FULL_EMBEDDING_DIMENSIONS, query_cache: Optional[QueryEmbeddingCache] = None,
+                 journal_cache: Optional[CompletionCache] = None, documents: Optional[DocumentStore] = None,
+                 bm25: Optional[BM25Index] = None):
+        """Initialize the semantic search engine, searching Pinecone unless another backend is given.
+        
+        dimensions must match the embedding size the index was built with. Query
+        embeddings are looked up in query_cache before calling the API, and journal
+        rewrites in journal_cache (which also runs each distinct rewrite only once at a time).
+        Passage text is read from documents when the index was built with a document store.
+        With bm25 as well, keyword matches are fused with the vector matches.
+        """
+        # Retries are handled by the rate limiters, which are shared by every session
+        # through the cached search engine
+        self.openai_client = OpenAI(api_key=openai_api_key, max_retries=0)
+        self.embedding_rate_limiter = RateLimiter(requests_per_minute=3000, tokens_per_minute=1_000_000, max_retries=3)
+        self.chat_rate_limiter = RateLimiter(requests_per_minute=500, tokens_per_minute=200_000, max_retries=3)
+        self.dimensions = dimensions
+        self.index_name = pinecone_index_name(dimensions)
+        self.query_cache = query_cache
+        self.journal_cache = journal_cache
+        self.documents = documents
+        # Keyword hits carry only IDs, so they can be shown only with a document store
+        self.bm25 = bm25 if documents is not None else None
         
+        if backend is not None:
+            self.backend = backend
+            return
+        
+        self.pc = Pinecone(api_key=pinecone_api_key)
         try:
             self.index = self.pc.Index(self.index_name)
         except Exception as e:
             st.error(f"Failed to connect to Pinecone index: {e}")
             st.error("Please run the ingestion script first: `streamlit run ingest.py`")
             st.stop()
+        self.backend = PineconeBackend(self.index)
 
-    def generate_query_embedding(self, query: str) -> List[float]:
-        """Generate embedding for search query."""
+    def generate_query_embedding(self, query: str) -> Sequence[float]:
+        """Generate embedding for search query, or take it from the query cache."""
+        if self.query_cache is not None:
+            cached = self.query_cache.get(query)
+            if cached is not None:
+                return cached
+        
         try:
-            response = self.openai_client.embeddings.create(
-                model="text-embedding-3-large",
-                input=query,
-                encoding_format="float"
+            response = self.embedding_rate_limiter.call(
+                lambda: self.openai_client.embeddings.with_raw_response.create(
+                    model="text-embedding-3-large",
+                    input=query,
+                    dimensions=self.dimensions,
+                    encoding_format="float"
+                ),
+                tokens=estimate_tokens(query)
             )
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
         except Exception as e:
             st.error(f"Error generating query embedding: {e}")
             return []
+        
+        if self.query_cache is not None:
+            self.query_cache.put(query, embedding)
+        return embedding
 
-    def process_journal_entry(self, journal_entry: str) -> str:
-        """Process journal entry through GPT-4o-mini and return response for search."""
+    def process_journal_entry(self, journal_entry: str, on_text: Optional[Callable[[str], None]] = None) -> str:
+        """Process journal entry through GPT-4o-mini and return response for search.
+        
+        With on_text, the response is streamed and on_text is called with the text so far
+        as each piece arrives (not when the response comes from the journal cache).
+        """
         prompt = "Here is a journal entry. Provide a compassionate and uplifting response to the user based on the Teachings of the Baha'i Faith. In your response, restate what the user is saying to you."
+        model = "gpt-4o-mini"
         
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": journal_entry}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip() if response.choices[0].message.content else ""
-        except Exception as e:
-            st.error(f"Error processing journal entry: {e}")
-            return ""
+        def complete() -> str:
+            try:
+                response = self.chat_rate_limiter.call(
+                    lambda: self.openai_client.chat.completions.with_raw_response.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": prompt},
+                            {"role": "user", "content": journal_entry}
+                        ],
+                        max_tokens=500,
+                        temperature=0.7,
+                        stream=on_text is not None
+                    ),
+                    tokens=estimate_tokens(prompt + journal_entry) + 500
+                )
+                if on_text is None:
+                    return response.choices[0].message.content.strip() if response.choices[0].message.content else ""
+                
+                parts = []
+                for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        on_text("".join(parts))
+                return "".join(parts).strip()
+            except Exception as e:
+                st.error(f"Error processing journal entry: {e}")
+                return ""
+        
+        if self.journal_cache is None:
+            return complete()
+        return self.journal_cache.get_or_compute(completion_key(model, prompt, journal_entry), complete)
 
     def search(self, query: str, n_results: int = 10, author_filter: Optional[List[str]] = None) -> List[Dict[str, Any]]:
-        """Perform semantic search and return results."""
+        """Perform semantic search, fused with keyword search when there is a BM25 index, and return results."""
         if not query.strip():
             return []
         
         # Generate query embedding
         query_embedding = self.generate_query_embedding(query)
-        if not query_embedding:
+        if len(query_embedding) == 0:
             return []
         
         try:
-            # Prepare filter for Pinecone query
-            pinecone_filter = None
+            # Prepare metadata filter (Pinecone syntax, also understood by the local backend)
+            metadata_filter = None
             if author_filter:
-                pinecone_filter = {"author": {"$in": author_filter}}
+                metadata_filter = {"author": {"$in": author_filter}}
             
-            # Search in Pinecone
-            results = self.index.query(
-                vector=query_embedding,
+            # Search the vector backend; with a document store only IDs and scores are needed
+            matches = self.backend.query(
+                query_embedding,
                 top_k=n_results,
-                include_metadata=True,
-                filter=pinecone_filter
+                filter=metadata_filter,
+                include_metadata=self.documents is None
             )
             
-            # Format results
-            formatted_results = []
-            for match in results['matches']:
-                formatted_results.append({
-                    'text': match['metadata']['text'],
-                    'source_file': match['metadata']['source_file'],
-                    'paragraph_id': match['metadata']['paragraph_id'],
-                    'score': match['score']
-                })
+            if self.bm25 is not None:
+                # Exact wording the embedding ranks below paraphrases still scores high on BM25
+                keyword_matches = [{'id': document_id, 'score': score}
+                                   for document_id, score in self.bm25.search(query, n_results, author_filter)]
+                matches = reciprocal_rank_fusion([matches, keyword_matches], lambda match: match['id'])[:n_results]
             
-            return formatted_results
+            return self.format_results(matches)
             
         except Exception as e:
             st.error(f"Search error: {e}")
             return []
 
+    def format_results(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turn backend matches into displayable results, reading text from the document store if there is one."""
+        if self.documents is not None:
+            # One batched lookup for every hit
+            documents = self.documents.get_many([match['id'] for match in matches])
+            missing = [match['id'] for match in matches if match['id'] not in documents]
+            if missing:
+                st.warning(f"{len(missing)} results are missing from the document store; re-run ingest.py")
+            return [dict(documents[match['id']], score=match['score'])
+                    for match in matches if match['id'] in documents]
+        
+        formatted_results = []
+        for match in matches:
+            formatted_results.append({
+                'text': match['metadata']['text'],
+                'source_file': match['metadata']['source_file'],
+                'paragraph_id': match['metadata']['paragraph_id'],
+                'score': match['score']
+            })
+        return formatted_results
+
     def get_bahai_library_url(self, source_file: str) -> str:
         """Convert source filename to Bahá'í library URL."""
         base_url = "https://www.bahai.org/library/authoritative-texts"
@@ -150,13 +264,174 @@ class BahaiSemanticSearch:
         # Return specific URL if mapping exists, otherwise return main library page
         return url_mappings.get(filename, "https://www.bahai.org/library/")
 
+    def check_passage_text(self):
+        """Raise if results could not be displayed: no document store and no text in the vector metadata."""
+        if self.documents is not None:
+            return
+        # Any stored vector will do; a unit vector is a valid query for every backend
+        matches = self.backend.query([1.0] + [0.0] * (self.dimensions - 1), top_k=1)
+        if matches and 'text' not in matches[0]['metadata']:
+            raise RuntimeError(
+                "the index keeps passage text in a document store, but none was found at DOCUMENT_STORE_PATH. "
+                "Deploy the store written by ingest.py (--document-store-path), or re-ingest with --text-in-metadata."
+            )
+
     def get_index_stats(self) -> Dict[str, Any]:
-        """Get index statistics."""
+        """Get index statistics: the vector count and, where the backend can count them, vectors per author."""
         try:
-            stats = self.index.describe_index_stats()
-            return {"total_vectors": stats['total_vector_count']}
+            stats = {"total_vectors": self.backend.count()}
         except Exception as e:
             return {"error": str(e)}
+        try:
+            stats["author_counts"] = self.backend.count_by("author", AUTHORS + ["Other"])
+        except Exception:
+            # e.g. Pinecone serverless indexes, which do not count by metadata filter
+            pass
+        return stats
+
+@st.cache_resource
+def get_background_executor() -> ThreadPoolExecutor:
+    """Worker threads for calls overlapped with a session's own work, shared by every session.
+    
+    Streamlit re-executes this script on every rerun, so a module-level pool would be
+    recreated each time; st.cache_resource keeps one for the whole server. Each journal
+    search holds one worker for its rewrite, so BACKGROUND_WORKERS bounds how many run
+    at once; the rest queue.
+    """
+    max_workers = int(st.secrets.get("BACKGROUND_WORKERS", 8))
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="background")
+
+def run_in_background(fn: Callable, *args) -> Future:
+    """Run fn on a worker thread that can still write to the current session's page (e.g. st.error)."""
+    ctx = get_script_run_ctx()
+    
+    def target():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+    
+    return get_background_executor().submit(target)
+
+def leading_sentences(text: str, min_chars: int = 80) -> Optional[str]:
+    """The complete sentences at the start of text once they reach min_chars, else None."""
+    ends = [match.end() for match in SENTENCE_END.finditer(text)]
+    ends = [end for end in ends if end >= min_chars]
+    return text[:ends[0]].strip() if ends else None
+
+def result_key(result: Dict[str, Any]):
+    """Identity of a search result across result lists."""
+    return (result['source_file'], result['paragraph_id'])
+
+def run_search(search_engine: BahaiSemanticSearch, search_mode: str, query: str, n_results: int,
+               author_filter: Optional[List[str]], query_log_path: Optional[str] = None,
+               speculative: bool = True, stream: bool = True,
+               on_partial: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> List[Dict[str, Any]]:
+    """Search, reusing this session's results for the same mode, query and author filter.
+    
+    Streamlit reruns the script on every widget change, so without this each rerun would
+    repeat the GPT, embedding and vector calls. Results are fetched MAX_RESULTS deep and
+    sliced to n_results, so moving the slider needs no new query.
+    
+    In journal mode with speculative set, the raw entry is searched while GPT rewrites
+    it; those results go to on_partial straight away and are then fused (RRF) with the
+    results for the rewrite. With stream set, the rewrite is streamed and its first
+    sentence or so is searched before it finishes, refining the early results.
+    """
+    key = (search_mode, query, tuple(author_filter) if author_filter else None)
+    cache = st.session_state.setdefault("search_cache", {})
+    if key in cache:
+        # Move to the end so the oldest search is the one evicted
+        cache[key] = cache.pop(key)
+        return cache[key][:n_results]
+    
+    fetch = max(n_results, MAX_RESULTS)
+    searched_texts = []
+    complete = True
+    if search_mode == 'journal':
+        # The rewrite runs in the background; when streaming, early_ready is set once its
+        # first sentence or so is in early_text, or once the rewrite has finished
+        early_text = {}
+        early_ready = threading.Event()
+        
+        def on_text(text: str):
+            if "text" not in early_text:
+                sentences = leading_sentences(text)
+                if sentences:
+                    early_text["text"] = sentences
+                    early_ready.set()
+        
+        rewrite = run_in_background(search_engine.process_journal_entry, query, on_text if stream else None)
+        rewrite.add_done_callback(lambda _: early_ready.set())
+        
+        # A rerun stops this script at its next st call; cancel the rewrite if it is still
+        # queued behind other sessions' work, so it doesn't take a worker for nothing
+        try:
+            raw_results = []
+            if speculative:
+                with st.spinner("Searching..."):
+                    raw_results = search_engine.search(query, fetch, author_filter)
+                searched_texts.append(query)
+                if raw_results and on_partial is not None:
+                    on_partial(raw_results[:n_results])
+            
+            if stream:
+                with st.spinner("Processing your journal entry..."):
+                    early_ready.wait()
+                if "text" in early_text and not rewrite.done():
+                    with st.spinner("Refining passages..."):
+                        early_results = search_engine.search(early_text["text"], fetch, author_filter)
+                    if early_results and on_partial is not None:
+                        on_partial(reciprocal_rank_fusion([early_results, raw_results], result_key)[:n_results])
+            
+            with st.spinner("Processing your journal entry..."):
+                processed_query = rewrite.result()
+        finally:
+            rewrite.cancel()
+        
+        # st.markdown("### AI Response to Your Entry")
+        # st.markdown(f"*{processed_query}*")
+        # st.markdown("### Related Passages")
+        
+        if processed_query:
+            with st.spinner("Finding related passages..."):
+                rewritten_results = search_engine.search(processed_query, fetch, author_filter)
+            searched_texts.append(processed_query)
+            results = reciprocal_rank_fusion([rewritten_results, raw_results], result_key)[:fetch]
+        else:
+            # Show what the raw entry found, but try the rewrite again on the next rerun
+            results = raw_results
+            complete = False
+    else:
+        with st.spinner("Searching..."):
+            results = search_engine.search(query, fetch, author_filter)
+        searched_texts.append(query)
+    if query_log_path:
+        for text in searched_texts:
+            append_query_log(query_log_path, search_mode, text)
+    
+    # Failed searches come back empty and are retried on the next rerun
+    if results and complete:
+        cache[key] = results
+        while len(cache) > SEARCH_CACHE_ENTRIES:
+            cache.pop(next(iter(cache)))
+    return results[:n_results]
+
+def render_results(search_engine: BahaiSemanticSearch, results: List[Dict[str, Any]]):
+    """Show search results as expandable passages with library links."""
+    st.markdown(f"### Search Results ({len(results)} found)")
+    
+    for i, result in enumerate(results, 1):
+        with st.expander(f"Result {i} - {result['source_file']} (Para {result['paragraph_id']})"):
+            st.markdown(result['text'])
+            
+            # Show metadata and library link
+            col1, col2, col3 = st.columns([2, 2, 1])
+            with col1:
+                st.caption(f"📄 Source: {result['source_file']}")
+            with col2:
+                st.caption(f"📍 Paragraph: {int(result['paragraph_id'])}")
+            with col3:
+                library_url = search_engine.get_bahai_library_url(result['source_file'])
+                st.link_button("📖 Library", library_url, use_container_width=True)
 
 def main():
     """Main Streamlit application."""
@@ -171,19 +446,71 @@ def main():
     
     # Check for API keys
     openai_api_key = st.secrets["OPENAI_API_KEY"]
-    pinecone_api_key = st.secrets["PINECONE_API_KEY"]
+    # "pinecone" (default) or "local" to search the index built by `ingest.py --backend local`
+    vector_backend = st.secrets.get("VECTOR_BACKEND", "pinecone")
+    # Embedding size the index was built with (`ingest.py --dimensions`)
+    dimensions = int(st.secrets.get("EMBEDDING_DIMENSIONS", FULL_EMBEDDING_DIMENSIONS))
+    # When set, searched texts are appended here for `ingest.py --evaluate-dimensions`
+    query_log_path = st.secrets.get("QUERY_LOG_PATH")
+    # In journal mode, search the raw entry while GPT rewrites it
+    speculative_journal_search = bool(st.secrets.get("SPECULATIVE_JOURNAL_SEARCH", True))
+    # Stream the rewrite and search its first sentence before the rest arrives
+    stream_journal_rewrite = bool(st.secrets.get("STREAM_JOURNAL_REWRITE", True))
+    pinecone_api_key = st.secrets["PINECONE_API_KEY"] if vector_backend == "pinecone" else None
     
     if not openai_api_key:
         st.error("⚠️ OPENAI_API_KEY is required in streamlit secrets")
         st.stop()
-    if not pinecone_api_key:
+    if vector_backend == "pinecone" and not pinecone_api_key:
         st.error("⚠️ PINECONE_API_KEY is required in streamlit secrets")
         st.stop()
     
+    # Query embeddings are cached in memory for every session and on disk across restarts
+    @st.cache_resource
+    def get_query_embedding_cache():
+        return QueryEmbeddingCache(max_entries=int(st.secrets.get("QUERY_CACHE_SIZE", 1024)),
+                                   ttl_seconds=float(st.secrets.get("QUERY_CACHE_TTL", 24 * 3600)),
+                                   path=st.secrets.get("QUERY_CACHE_PATH", DEFAULT_QUERY_CACHE_PATH) or None,
+                                   dimensions=dimensions)
+    
+    # Journal rewrites are shared by every session, and each distinct entry is rewritten once at a time
+    @st.cache_resource
+    def get_journal_cache():
+        return CompletionCache(max_entries=int(st.secrets.get("JOURNAL_CACHE_SIZE", 512)),
+                               ttl_seconds=float(st.secrets.get("JOURNAL_CACHE_TTL", 24 * 3600)))
+    
     # Initialize search engine
     @st.cache_resource
     def get_search_engine():
-        return BahaiSemanticSearch(openai_api_key, pinecone_api_key)
+        backend = None
+        if vector_backend == "local":
+            # Optional approximate index built by `ingest.py --ann hnsw|ivfpq|int8|binary`
+            ann = None
+            local_index_ann = st.secrets.get("LOCAL_INDEX_ANN", "exact")
+            if local_index_ann == "hnsw":
+                ann = HNSWIndex(ef_search=int(st.secrets.get("HNSW_EF_SEARCH", 64)))
+            elif local_index_ann == "ivfpq":
+                ann = IVFPQIndex(nprobe=int(st.secrets.get("IVF_NPROBE", 128)),
+                                 rerank=int(st.secrets.get("IVF_RERANK", 300)))
+            elif local_index_ann in ("int8", "binary"):
+                index_class = Int8Index if local_index_ann == "int8" else BinaryIndex
+                ann = index_class(rerank=int(st.secrets.get("QUANTIZED_RERANK", 100)))
+            # Memory-mapped, so every app process shares one copy of the vectors in the page cache
+            backend = LocalVectorStore(dimension=dimensions,
+                                       path=st.secrets.get("LOCAL_INDEX_PATH", DEFAULT_LOCAL_INDEX_PATH),
+                                       mmap=True, ann=ann)
+        # Passage text written by ingest.py, unless it was run with --text-in-metadata
+        documents_path = st.secrets.get("DOCUMENT_STORE_PATH", DEFAULT_DOCUMENT_STORE_PATH)
+        documents = DocumentStore(documents_path) if os.path.exists(documents_path) else None
+        # Keyword index built by ingest.py, fused with vector results unless HYBRID_SEARCH is false
+        bm25 = None
+        bm25_path = st.secrets.get("BM25_INDEX_PATH", DEFAULT_BM25_INDEX_PATH)
+        if bool(st.secrets.get("HYBRID_SEARCH", True)) and os.path.exists(bm25_path):
+            bm25 = BM25Index(bm25_path)
+        search_engine = BahaiSemanticSearch(openai_api_key, pinecone_api_key, backend, dimensions,
+                                            get_query_embedding_cache(), get_journal_cache(), documents, bm25)
+        search_engine.check_passage_text()
+        return search_engine
     
     try:
         search_engine = get_search_engine()
@@ -191,31 +518,44 @@ def main():
         st.error(f"Failed to initialize search engine: {e}")
         st.stop()
     
+    # Index statistics are refreshed in the background and shared by every session
+    @st.cache_resource
+    def get_index_stats_cache():
+        return IndexStatsCache(search_engine.get_index_stats,
+                               ttl_seconds=float(st.secrets.get("INDEX_STATS_TTL", 300)))
+    
     # Display index statistics
-    stats = search_engine.get_index_stats()
-    if "error" in stats:
-        st.sidebar.error(f"Index error: {stats['error']}")
+    stats = get_index_stats_cache().get()
+    if stats is not None:
+        if "error" in stats:
+            st.sidebar.error(f"Index error: {stats['error']}")
+        else:
+            with st.sidebar.expander(f"📊 {stats['total_vectors']:,} passages indexed"):
+                for author, count in stats.get("author_counts", {}).items():
+                    if count:
+                        st.caption(f"{author}: {count:,}")
+                refreshed = time.strftime("%H:%M:%S", time.localtime(stats["refreshed_at"]))
+                st.caption(f"Updated {refreshed}")
+    
+    # Hit rates of the caches shared by every session, as of the start of this rerun
+    with st.sidebar.expander("⚡ Cache hit rates"):
+        if search_engine.query_cache is not None:
+            st.caption(f"Query embeddings: {search_engine.query_cache.stats()}")
+        if search_engine.journal_cache is not None:
+            st.caption(f"Journal rewrites: {search_engine.journal_cache.stats()}")
     
     # Search options in sidebar
     st.sidebar.markdown("### Search Options")
     
     # Author filter
-    author_options = [
-        "All Authors",
-        "Bahá'u'lláh", 
-        "'Abdu'l-Bahá", 
-        "The Báb", 
-        "Shoghi Effendi", 
-        "Universal House of Justice", 
-        "Compilations"
-    ]
+    author_options = ["All Authors"] + AUTHORS
     selected_authors = st.sidebar.multiselect(
         "Filter by Author:",
         author_options,
         default=["All Authors"]
     )
     
-    n_results = st.sidebar.slider("Number of results:", 1, 20, 10)
+    n_results = st.sidebar.slider("Number of results:", 1, MAX_RESULTS, 10)
     
     # Handle "All Authors" selection
     if "All Authors" in selected_authors:
@@ -274,42 +614,20 @@ def main():
 
     # Perform search
     if query or search_clicked:
-        if search_mode == 'journal':
-            with st.spinner("Processing your journal entry..."):
-                processed_query = search_engine.process_journal_entry(query)
-            
-            if processed_query:
-                # st.markdown("### AI Response to Your Entry")
-                # st.markdown(f"*{processed_query}*")
-                # st.markdown("### Related Passages")
-                
-                with st.spinner("Finding related passages..."):
-                    results = search_engine.search(processed_query, n_results, author_filter)
-            else:
-                results = []
-        else:
-            with st.spinner("Searching..."):
-                results = search_engine.search(query, n_results, author_filter)
+        # Early (speculative) results are drawn here and replaced by the final ones
+        results_area = st.empty()
+        
+        def show_results(results: List[Dict[str, Any]]):
+            with results_area.container():
+                render_results(search_engine, results)
+        
+        results = run_search(search_engine, search_mode, query, n_results, author_filter, query_log_path,
+                             speculative_journal_search, stream_journal_rewrite, show_results)
         
         if results:
-            st.markdown(f"### Search Results ({len(results)} found)")
-            
-            for i, result in enumerate(results, 1):
-                with st.expander(f"Result {i} - {result['source_file']} (Para {result['paragraph_id']})"):
-                    st.markdown(result['text'])
-                    
-                    # Show metadata and library link
-                    col1, col2, col3 = st.columns([2, 2, 1])
-                    with col1:
-                        st.caption(f"📄 Source: {result['source_file']}")
-                    with col2:
-                        st.caption(f"📍 Paragraph: {int(result['paragraph_id'])}")
-                    with col3:
-                        library_url = search_engine.get_bahai_library_url(result['source_file'])
-                        st.link_button("📖 Library", library_url, use_container_width=True)
-                    
+            show_results(results)
         else:
-            st.warning("No results found. Try a different search query.")
+            results_area.warning("No results found. Try a different search query.")
     
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the BM25 keyword index.
+
+Builds an index over synthetic paragraphs whose words follow a Zipf distribution, as
+natural text does, reopens it memory-mapped, and queries it with phrases copied from
+random paragraphs, as a user pasting a remembered quote would. Reports build time,
+file size, how often the quoted paragraph ranks first and in the top 10, and the
+median and 95th percentile query latency, with and without an author filter.
+
+    uv run python benchmarks/bm25_benchmark.py [--paragraphs 50000] [--phrase-words 8]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bm25 import BM25Index, write_bm25_index  # noqa: E402
+
+AUTHORS = ["Bahá'u'lláh", "The Báb", "'Abdu'l-Bahá", "Shoghi Effendi", "Other"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=50_000)
+    parser.add_argument("--words", type=int, default=150, help="Average words per paragraph")
+    parser.add_argument("--vocabulary", type=int, default=30_000)
+    parser.add_argument("--phrase-words", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vocabulary = [f"w{i}" for i in range(args.vocabulary)]
+    # Zipf-like word frequencies: the word of rank r has weight 1 / r
+    weights = 1 / np.arange(1, args.vocabulary + 1)
+    weights /= weights.sum()
+    lengths = rng.integers(args.words // 2, args.words * 3 // 2, args.paragraphs)
+    paragraphs = [rng.choice(args.vocabulary, length, p=weights) for length in lengths]
+
+    def documents():
+        for i, words in enumerate(paragraphs):
+            yield f"doc_{i}", " ".join(vocabulary[word] for word in words), AUTHORS[i % len(AUTHORS)]
+
+    path = Path(tempfile.mkdtemp()) / "bm25.idx"
+    start = time.perf_counter()
+    write_bm25_index(str(path), documents())
+    print(f"Built BM25 index over {args.paragraphs} paragraphs in {time.perf_counter() - start:.1f}s, "
+          f"{path.stat().st_size / 2**20:.1f} MB")
+
+    start = time.perf_counter()
+    index = BM25Index(str(path))
+    print(f"Opened in {(time.perf_counter() - start) * 1000:.2f} ms; {index.term_count} terms\n")
+
+    queries = []
+    for target in rng.choice(args.paragraphs, args.queries, replace=False):
+        words = paragraphs[target]
+        offset = rng.integers(0, max(1, len(words) - args.phrase_words))
+        phrase = " ".join(vocabulary[word] for word in words[offset:offset + args.phrase_words])
+        queries.append((f"doc_{target}", phrase, AUTHORS[target % len(AUTHORS)]))
+
+    print(f"{'search':<16} {'top 1':>6} {'top 10':>7} {'median ms':>10} {'p95 ms':>7}")
+    for name, filtered in (("unfiltered", False), ("author filter", True)):
+        top1 = top10 = 0
+        timings = []
+        for document_id, phrase, author in queries:
+            start = time.perf_counter()
+            hits = index.search(phrase, 10, [author] if filtered else None)
+            timings.append((time.perf_counter() - start) * 1000)
+            ids = [hit_id for hit_id, _ in hits]
+            top1 += bool(ids) and ids[0] == document_id
+            top10 += document_id in ids
+        print(f"{name:<16} {top1 / len(queries):>6.2f} {top10 / len(queries):>7.2f} "
+              f"{statistics.median(timings):>10.2f} {np.percentile(timings, 95):>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark for paragraph combining in extract_paragraphs_from_docx.
+
+Builds synthetic documents of mostly very short paragraphs (the shape of the Hidden
+Words or a prayer book), checks that combine_short_paragraphs matches the original
+loop exactly, and times both at doubling sizes up to 100k paragraphs. Linear scaling
+shows up as time per paragraph staying flat.
+
+    uv run python benchmarks/chunking_benchmark.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docx_parser import combine_short_paragraphs  # noqa: E402
+
+WORDS = ["O", "Son", "of", "Spirit", "My", "first", "counsel", "is", "this", "possess",
+         "a", "pure", "kindly", "and", "radiant", "heart"]
+
+
+def legacy_combine(raw_paragraphs: List[Dict[str, Any]], min_words: int = 100) -> List[Tuple[str, List[int]]]:
+    """The original combining loop: re-splits the growing string and appends with +=."""
+    chunks = []
+    i = 0
+    while i < len(raw_paragraphs):
+        current_text = raw_paragraphs[i]["text"]
+        current_word_count = len(current_text.split())
+        combined_ids = [raw_paragraphs[i]["original_id"]]
+        if current_word_count < min_words and i < len(raw_paragraphs) - 1:
+            j = i + 1
+            while j < len(raw_paragraphs) and len(current_text.split()) < min_words:
+                current_text += " " + raw_paragraphs[j]["text"]
+                combined_ids.append(raw_paragraphs[j]["original_id"])
+                j += 1
+            i = j
+        else:
+            i += 1
+        chunks.append((current_text, combined_ids))
+    return chunks
+
+
+def synthetic_paragraphs(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Mostly one- to three-word paragraphs with the occasional long one."""
+    rng = random.Random(seed)
+    paragraphs = []
+    for i in range(count):
+        length = rng.randint(40, 160) if rng.random() < 0.02 else rng.randint(1, 3)
+        paragraphs.append({"text": " ".join(rng.choice(WORDS) for _ in range(length)), "original_id": i})
+    return paragraphs
+
+
+def time_call(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    sample = synthetic_paragraphs(5_000, seed=1)
+    assert combine_short_paragraphs(sample) == legacy_combine(sample), "outputs differ"
+    print("Outputs identical on a 5k-paragraph sample\n")
+
+    print(f"{'paragraphs':>10}  {'legacy s':>9}  {'new s':>8}  {'new µs/para':>11}  {'speedup':>7}")
+    for count in (12_500, 25_000, 50_000, 100_000):
+        paragraphs = synthetic_paragraphs(count)
+        legacy = time_call(legacy_combine, paragraphs)
+        new = time_call(combine_short_paragraphs, paragraphs)
+        print(f"{count:>10}  {legacy:>9.3f}  {new:>8.3f}  {new / count * 1e6:>11.2f}  {legacy / new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
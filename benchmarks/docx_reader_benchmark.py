@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the streaming .docx reader against python-docx.
+
+For each document this checks that iter_docx_paragraphs yields exactly the indexes and
+text of python-docx's Document(path).paragraphs, then compares parse time and peak
+Python heap usage (lxml's C allocations are not traced, so python-docx's true footprint
+is larger than reported). Without arguments it builds a synthetic book with python-docx.
+
+    uv run python benchmarks/docx_reader_benchmark.py [corpus_indexed/*.docx]
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docx import Document  # noqa: E402
+from docx.enum.text import WD_BREAK  # noqa: E402
+
+from docx_parser import iter_docx_paragraphs  # noqa: E402
+
+
+def python_docx_paragraphs(file_path: str):
+    return [(i, paragraph.text) for i, paragraph in enumerate(Document(file_path).paragraphs)]
+
+
+def streaming_paragraphs(file_path: str):
+    return list(iter_docx_paragraphs(file_path))
+
+
+def synthetic_book(path: str, paragraphs: int = 50_000):
+    """A long document mixing formatted runs, tabs, breaks, tables and empty paragraphs."""
+    doc = Document()
+    for i in range(paragraphs):
+        if i % 500 == 0:
+            table = doc.add_table(rows=1, cols=2)
+            table.cell(0, 0).text = "table text is not a body paragraph"
+        paragraph = doc.add_paragraph(f"O Son of Spirit! {i}\tMy first counsel is this: ")
+        paragraph.add_run("Possess a pure, kindly and radiant heart").bold = True
+        if i % 7 == 0:
+            paragraph.add_run().add_break()
+            paragraph.add_run("after a line break")
+        if i % 11 == 0:
+            paragraph.add_run().add_break(WD_BREAK.PAGE)
+        if i % 13 == 0:
+            doc.add_paragraph("")
+    doc.save(path)
+
+
+def measure(function, file_path: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(file_path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    paths = sys.argv[1:]
+    if not paths:
+        tmp_dir = tempfile.mkdtemp()
+        paths = [str(Path(tmp_dir) / "synthetic-book.docx")]
+        print("Building synthetic book...")
+        synthetic_book(paths[0])
+
+    print(f"{'document':<40} {'paras':>7} {'python-docx s':>13} {'stream s':>9} {'python-docx MB':>14} {'stream MB':>9}")
+    for path in paths:
+        expected, docx_time, docx_peak = measure(python_docx_paragraphs, path)
+        actual, stream_time, stream_peak = measure(streaming_paragraphs, path)
+        assert actual == expected, f"{path}: streamed paragraphs differ from python-docx"
+        print(f"{Path(path).name[:40]:<40} {len(expected):>7} {docx_time:>13.2f} {stream_time:>9.2f} "
+              f"{docx_peak / 2**20:>14.1f} {stream_peak / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
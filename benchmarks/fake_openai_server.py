@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+A local stand-in for the OpenAI embeddings endpoint that enforces rate limits.
+
+POST /v1/embeddings returns deterministic random embeddings (float or base64). The
+server keeps its own request and token buckets. It answers 429 with retry-after,
+retry-after-ms and x-ratelimit-* headers when either bucket is empty, and also at
+random with --failure-rate. Every response carries the x-ratelimit-* headers OpenAI
+sends, so a client can learn the real limits from them.
+
+Run it on its own and point ingest.py or the app at it:
+
+    uv run python benchmarks/fake_openai_server.py --port 8001 --requests-per-minute 600
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 uv run python ingest.py --backend local
+
+benchmarks/rate_limiter_benchmark.py starts it in-process to drive RateLimiter.
+"""
+
+import argparse
+import base64
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def _format_duration(seconds: float) -> str:
+    """Reset duration in OpenAI's style, e.g. '1.5s' or '20ms'."""
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.3f}s"
+
+
+class _Bucket:
+    """Server-side quota refilled continuously at a per-minute rate, holding burst_seconds of it."""
+
+    def __init__(self, limit_per_minute: float, burst_seconds: float):
+        self.limit = limit_per_minute
+        self.capacity = limit_per_minute * burst_seconds / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.limit / 60.0)
+        self.updated = now
+
+    def reset_seconds(self, amount: float) -> float:
+        """Time until amount is available."""
+        return max(0.0, (amount - self.level) * 60.0 / self.limit)
+
+
+class FakeOpenAIServer:
+    def __init__(self, requests_per_minute: float = 600, tokens_per_minute: float = 150_000,
+                 failure_rate: float = 0.0, burst_seconds: float = 1.0, port: int = 0, seed: int = 0):
+        """Create a server enforcing the given limits, failing a further failure_rate of requests with 429.
+
+        Unlike OpenAI, which allows a minute's quota at once, the buckets hold only
+        burst_seconds of it, so a short run already hits the limits.
+        """
+        self.requests = _Bucket(requests_per_minute, burst_seconds)
+        self.tokens = _Bucket(tokens_per_minute, burst_seconds)
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.served = 0
+        self.rejected = 0
+        self.injected = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> str:
+        """Serve on a background thread and return the base URL for the OpenAI client."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def admit(self, tokens: int) -> Optional[float]:
+        """Charge a request against the buckets, or return seconds to wait if it is rejected."""
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            if self.requests.level < 1 or self.tokens.level < tokens:
+                self.rejected += 1
+                return max(self.requests.reset_seconds(1), self.tokens.reset_seconds(tokens))
+            if self.random.random() < self.failure_rate:
+                self.injected += 1
+                return self.random.uniform(0.05, 0.5)
+            self.requests.level -= 1
+            self.tokens.level -= tokens
+            self.served += 1
+            return None
+
+    def rate_limit_headers(self) -> Dict[str, str]:
+        """x-ratelimit-* headers describing the buckets right now."""
+        with self._lock:
+            return {
+                "x-ratelimit-limit-requests": str(int(self.requests.limit)),
+                "x-ratelimit-limit-tokens": str(int(self.tokens.limit)),
+                "x-ratelimit-remaining-requests": str(max(0, math.floor(self.requests.level))),
+                "x-ratelimit-remaining-tokens": str(max(0, math.floor(self.tokens.level))),
+                "x-ratelimit-reset-requests": _format_duration(self.requests.reset_seconds(self.requests.capacity)),
+                "x-ratelimit-reset-tokens": _format_duration(self.tokens.reset_seconds(self.tokens.capacity)),
+            }
+
+    def stats(self) -> str:
+        return f"{self.served} served, {self.rejected} rejected over the limit, {self.injected} injected 429s"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, body: dict, headers: Dict[str, str]):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                if not self.path.endswith("/embeddings"):
+                    self._reply(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error",
+                                                "param": None, "code": None}}, {})
+                    return
+                texts = request.get("input", [])
+                texts = [texts] if isinstance(texts, str) else texts
+                tokens = sum(len(text) // 4 + 1 for text in texts)
+
+                wait = server.admit(tokens)
+                headers = server.rate_limit_headers()
+                if wait is not None:
+                    headers["retry-after"] = str(math.ceil(wait))
+                    headers["retry-after-ms"] = str(math.ceil(wait * 1000))
+                    self._reply(429, {"error": {"message": "Rate limit reached (fake server)", "type": "requests",
+                                                "param": None, "code": "rate_limit_exceeded"}}, headers)
+                    return
+
+                dimensions = int(request.get("dimensions") or 8)
+                data = []
+                for i, text in enumerate(texts):
+                    rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+                    vector = rng.standard_normal(dimensions).astype(np.float32)
+                    if request.get("encoding_format") == "base64":
+                        embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+                    else:
+                        embedding = vector.tolist()
+                    data.append({"object": "embedding", "index": i, "embedding": embedding})
+                self._reply(200, {"object": "list", "data": data, "model": request.get("model", "fake"),
+                                  "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}, headers)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--requests-per-minute", type=float, default=600)
+    parser.add_argument("--tokens-per-minute", type=float, default=150_000)
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Fraction of admitted requests failed with 429")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.requests_per_minute, args.tokens_per_minute, args.failure_rate, port=args.port)
+    print(f"Fake OpenAI server on {server.start()} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(10)
+            print(server.stats())
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
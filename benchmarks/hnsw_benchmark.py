@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the HNSW graph of the local index.
+
+Builds a graph over synthetic vectors with a low intrinsic dimension (like embeddings
+of real text, and unlike uniform random vectors, where every neighbor is almost
+equally far away), then reports recall@10 against exact search and the median query
+latency for several ef_search values next to the exact scan.
+
+    uv run python benchmarks/hnsw_benchmark.py [--vectors 20000] [--dimension 3072] [--m 16]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from hnsw import HNSWIndex  # noqa: E402
+from vector_store import LocalVectorStore, normalize_rows  # noqa: E402
+
+
+def embedding_like_vectors(count: int, dimension: int, projection: np.ndarray, rng) -> np.ndarray:
+    """Vectors with low intrinsic dimension: a random latent point projected up, plus small noise."""
+    latent = rng.standard_normal((count, len(projection)), dtype=np.float32)
+    vectors = latent @ projection
+    vectors += 0.3 / np.sqrt(dimension) * rng.standard_normal((count, dimension), dtype=np.float32)
+    return normalize_rows(vectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20_000)
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--latent-dimension", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    projection = rng.standard_normal((args.latent_dimension, args.dimension), dtype=np.float32)
+    projection /= np.sqrt(args.latent_dimension)
+    vectors = embedding_like_vectors(args.vectors, args.dimension, projection, rng)
+    queries = embedding_like_vectors(args.queries, args.dimension, projection, rng)
+
+    store = LocalVectorStore(dimension=args.dimension,
+                             ann=HNSWIndex(M=args.m, ef_construction=args.ef_construction))
+    store.upsert([(f"doc_{i}", vector, {}) for i, vector in enumerate(vectors)])
+    start = time.perf_counter()
+    store.build_index()
+    build = time.perf_counter() - start
+    print(f"Built HNSW (M={args.m}, efConstruction={args.ef_construction}) over "
+          f"{args.vectors} x {args.dimension} vectors in {build:.1f}s ({build / args.vectors * 1000:.2f} ms/vector)\n")
+
+    exact = []
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        rows, _ = store._exact_top(query, 10, None)
+        timings.append((time.perf_counter() - start) * 1000)
+        exact.append(set(rows.tolist()))
+    print(f"{'search':<16} {'recall@10':>9} {'median ms':>10}")
+    print(f"{'exact':<16} {1.0:>9.3f} {statistics.median(timings):>10.2f}")
+
+    for ef in (16, 32, 64, 128, 256):
+        store.ann.ef_search = ef
+        hits = 0
+        timings = []
+        for query, expected in zip(queries, exact):
+            start = time.perf_counter()
+            rows, _ = store.ann.search(store.vectors, query, 10)
+            timings.append((time.perf_counter() - start) * 1000)
+            hits += len(expected & set(rows.tolist()))
+        print(f"{f'hnsw ef={ef}':<16} {hits / (10 * len(queries)):>9.3f} {statistics.median(timings):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the IVF-PQ index of the local index against brute-force search.
+
+Saves embedding-like synthetic vectors (low intrinsic dimension, see hnsw_benchmark.py)
+to a vector file, builds an IVF-PQ index next to it, reopens both memory-mapped, and
+reports recall@10, median latency and memory for several nprobe values. Brute force
+has to keep every full-precision vector resident; IVF-PQ keeps only its codes and
+quantizer tables, and per query re-reads only the rerank candidates' full vectors
+from the file ("reread MB").
+
+    uv run python benchmarks/ivfpq_benchmark.py [--vectors 50000] [--dimension 3072] [--m 64]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ivfpq import IVFPQIndex  # noqa: E402
+from vector_store import LocalVectorStore, normalize_rows  # noqa: E402
+
+
+def embedding_like_vectors(count: int, dimension: int, projection: np.ndarray, rng) -> np.ndarray:
+    """Vectors with low intrinsic dimension: a random latent point projected up, plus small noise."""
+    latent = rng.standard_normal((count, len(projection)), dtype=np.float32)
+    vectors = latent @ projection
+    vectors += 0.3 / np.sqrt(dimension) * rng.standard_normal((count, dimension), dtype=np.float32)
+    return normalize_rows(vectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--latent-dimension", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--m", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    projection = rng.standard_normal((args.latent_dimension, args.dimension), dtype=np.float32)
+    projection /= np.sqrt(args.latent_dimension)
+    queries = embedding_like_vectors(args.queries, args.dimension, projection, rng)
+
+    path = Path(tempfile.mkdtemp()) / "index.vec"
+    store = LocalVectorStore(dimension=args.dimension, path=str(path), ann=IVFPQIndex(m=args.m))
+    for start in range(0, args.vectors, 10_000):
+        vectors = embedding_like_vectors(min(10_000, args.vectors - start), args.dimension, projection, rng)
+        for i, vector in enumerate(vectors):
+            store.submit(f"doc_{start + i}", vector, {})
+    store.flush()
+    store.save()
+    start = time.perf_counter()
+    store.build_index()
+    build = time.perf_counter() - start
+    del store
+
+    store = LocalVectorStore(dimension=args.dimension, path=str(path), mmap=True, ann=IVFPQIndex())
+    index = store.ann
+    print(f"Built IVF-PQ ({index.nlist} lists, {args.m} bytes/vector) over "
+          f"{args.vectors} x {args.dimension} vectors in {build:.1f}s\n")
+
+    exact = []
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        rows, _ = store._exact_top(query, 10, None)
+        timings.append((time.perf_counter() - start) * 1000)
+        exact.append(set(rows.tolist()))
+
+    brute_force_mb = args.vectors * args.dimension * 4 / 2**20
+    print(f"{'search':<28} {'recall@10':>9} {'median ms':>10} {'resident MB':>12} {'reread MB':>10}")
+    print(f"{'brute force':<28} {1.0:>9.3f} {statistics.median(timings):>10.2f} {brute_force_mb:>12.1f} {0:>10.1f}")
+    for nprobe, rerank in ((16, 100), (64, 100), (64, 300), (128, 300), (128, 1000)):
+        index.nprobe, index.rerank = nprobe, rerank
+        hits = 0
+        timings = []
+        for query, expected in zip(queries, exact):
+            start = time.perf_counter()
+            rows, _ = index.search(store.vectors, query, 10)
+            timings.append((time.perf_counter() - start) * 1000)
+            hits += len(expected & set(rows.tolist()))
+        print(f"{f'ivfpq nprobe={nprobe} rerank={rerank}':<28} {hits / (10 * len(queries)):>9.3f} "
+              f"{statistics.median(timings):>10.2f} {index.memory_bytes() / 2**20:>12.1f} "
+              f"{rerank * args.dimension * 4 / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
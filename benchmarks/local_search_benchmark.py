@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark for exact top-k search in LocalVectorStore.
+
+Fills a store with random vectors, checks that query() returns the same IDs as a full
+sort of the cosine scores, and reports query latency with and without an author
+filter.
+
+    uv run python benchmarks/local_search_benchmark.py [--vectors 200000] [--dimension 3072]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from vector_store import LocalVectorStore  # noqa: E402
+
+AUTHORS = ["Bahá'u'lláh", "'Abdu'l-Bahá", "The Báb", "Shoghi Effendi", "Universal House of Justice", "Compilations"]
+
+
+def build_store(count: int, dimension: int, seed: int = 0) -> LocalVectorStore:
+    rng = np.random.default_rng(seed)
+    store = LocalVectorStore(dimension=dimension)
+    batch_size = 10_000
+    for start in range(0, count, batch_size):
+        vectors = rng.standard_normal((min(batch_size, count - start), dimension), dtype=np.float32)
+        store.upsert([(f"doc_{start + i}", vector, {"author": AUTHORS[(start + i) % len(AUTHORS)]})
+                      for i, vector in enumerate(vectors)])
+    return store
+
+
+def latencies(store: LocalVectorStore, queries: np.ndarray, top_k: int, filter=None):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        store.query(query, top_k, filter=filter)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"Building store of {args.vectors} x {args.dimension} vectors...")
+    store = build_store(args.vectors, args.dimension)
+    queries = np.random.default_rng(1).standard_normal((args.queries, args.dimension), dtype=np.float32)
+
+    for query in queries[:5]:
+        scores = store.vectors @ (query / np.linalg.norm(query))
+        expected = [f"doc_{row}" for row in np.argsort(-scores, kind="stable")[:args.top_k]]
+        assert [match["id"] for match in store.query(query, args.top_k)] == expected, "top-k differs from full sort"
+    print("Top-k matches a full sort\n")
+
+    author_filter = {"author": {"$in": AUTHORS[:2]}}
+    store.query(queries[0], args.top_k, filter=author_filter)  # build the filter codes once
+    for label, timings in (("unfiltered", latencies(store, queries, args.top_k)),
+                           ("author filter", latencies(store, queries, args.top_k, author_filter))):
+        print(f"{label:<14} median {statistics.median(timings):7.2f} ms   max {max(timings):7.2f} ms")
+    print(f"\nMatrix size: {store.vectors.nbytes / 2**20:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
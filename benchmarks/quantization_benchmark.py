@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the int8 and binary quantized first pass of the local index.
+
+Saves embedding-like synthetic vectors (low intrinsic dimension, see hnsw_benchmark.py)
+to a vector file, builds an Int8Index and a BinaryIndex next to it, reopens them
+memory-mapped, and reports recall@10, median latency and memory for several rerank
+depths against brute force. The quantized indexes keep only their codes resident
+and per query re-read only the rerank candidates' full vectors from the file
+("reread MB").
+
+    uv run python benchmarks/quantization_benchmark.py [--vectors 50000] [--dimension 3072]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from quantization import BinaryIndex, Int8Index  # noqa: E402
+from vector_store import LocalVectorStore, normalize_rows  # noqa: E402
+
+
+def embedding_like_vectors(count: int, dimension: int, projection: np.ndarray, rng) -> np.ndarray:
+    """Vectors with low intrinsic dimension: a random latent point projected up, plus small noise."""
+    latent = rng.standard_normal((count, len(projection)), dtype=np.float32)
+    vectors = latent @ projection
+    vectors += 0.3 / np.sqrt(dimension) * rng.standard_normal((count, dimension), dtype=np.float32)
+    return normalize_rows(vectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--latent-dimension", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    projection = rng.standard_normal((args.latent_dimension, args.dimension), dtype=np.float32)
+    projection /= np.sqrt(args.latent_dimension)
+    queries = embedding_like_vectors(args.queries, args.dimension, projection, rng)
+
+    path = Path(tempfile.mkdtemp()) / "index.vec"
+    store = LocalVectorStore(dimension=args.dimension, path=str(path))
+    for start in range(0, args.vectors, 10_000):
+        vectors = embedding_like_vectors(min(10_000, args.vectors - start), args.dimension, projection, rng)
+        for i, vector in enumerate(vectors):
+            store.submit(f"doc_{start + i}", vector, {})
+    store.flush()
+    store.save()
+    for index_class in (Int8Index, BinaryIndex):
+        store.ann = index_class()
+        start = time.perf_counter()
+        store._ann_ready = False
+        store.build_index()
+        print(f"Built {index_class.__name__} over {args.vectors} x {args.dimension} vectors "
+              f"in {time.perf_counter() - start:.1f}s")
+    del store
+
+    exact = []
+    timings = []
+    store = LocalVectorStore(dimension=args.dimension, path=str(path), mmap=True)
+    for query in queries:
+        start = time.perf_counter()
+        rows, _ = store._exact_top(query, 10, None)
+        timings.append((time.perf_counter() - start) * 1000)
+        exact.append(set(rows.tolist()))
+
+    brute_force_mb = args.vectors * args.dimension * 4 / 2**20
+    print(f"\n{'search':<22} {'recall@10':>9} {'median ms':>10} {'resident MB':>12} {'reread MB':>10}")
+    print(f"{'brute force':<22} {1.0:>9.3f} {statistics.median(timings):>10.2f} {brute_force_mb:>12.1f} {0:>10.1f}")
+    for index_class, reranks in ((Int8Index, (10, 50, 100)), (BinaryIndex, (50, 100, 200, 400))):
+        index = index_class.load(str(path.with_suffix(index_class.SUFFIX)))
+        for rerank in reranks:
+            index.rerank = rerank
+            hits = 0
+            timings = []
+            for query, expected in zip(queries, exact):
+                start = time.perf_counter()
+                rows, _ = index.search(store.vectors, query, 10)
+                timings.append((time.perf_counter() - start) * 1000)
+                hits += len(expected & set(rows.tolist()))
+            name = f"{index_class.SUFFIX[1:]} rerank={rerank}"
+            print(f"{name:<22} {hits / (10 * len(queries)):>9.3f} {statistics.median(timings):>10.2f} "
+                  f"{index.memory_bytes() / 2**20:>12.1f} {rerank * args.dimension * 4 / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
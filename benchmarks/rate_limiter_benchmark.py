@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Drives RateLimiter against the fake OpenAI server (fake_openai_server.py) that injects 429s.
+
+The server allows --server-rpm requests per minute, in bursts of one second's worth,
+and fails a further --failure-rate of requests with 429 at random. The limiter starts
+out configured for the default 3000 requests per minute, far above that. Embedding
+requests are sent through RateLimiter.call from a thread pool and then through
+RateLimiter.call_async from concurrent tasks. Each run reports how many requests
+succeeded, the 429s the server sent and the limiter absorbed, the request limit the
+limiter learned from the x-ratelimit-* headers, and the achieved request rate.
+
+    uv run python benchmarks/rate_limiter_benchmark.py [--requests 100] [--server-rpm 600]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from openai import AsyncOpenAI, OpenAI
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_openai_server import FakeOpenAIServer  # noqa: E402
+from rate_limiter import RateLimiter, estimate_tokens  # noqa: E402
+
+
+def report(name: str, server: FakeOpenAIServer, limiter: RateLimiter, succeeded: int, requests: int,
+           elapsed: float, served_before: int, rejected_before: int, injected_before: int):
+    rejected = server.rejected - rejected_before
+    injected = server.injected - injected_before
+    print(f"{name:<11} {succeeded:>4}/{requests:<4} {rejected:>9} {injected:>9} "
+          f"{limiter.rate_limited_count:>9} {limiter.requests.capacity:>11.0f} "
+          f"{(server.served - served_before) / elapsed * 60:>9.0f} {elapsed:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--server-rpm", type=float, default=600)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--base-delay", type=float, default=0.25, help="RateLimiter backoff base in seconds")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(requests_per_minute=args.server_rpm, failure_rate=args.failure_rate)
+    base_url = server.start()
+    texts = [f"Paragraph {i} of the benchmark corpus." for i in range(args.requests)]
+    print(f"Fake server at {base_url}: {args.server_rpm:.0f} requests/min, "
+          f"{args.failure_rate:.0%} random 429s\n")
+    print(f"{'client':<11} {'succeeded':>9} {'over limit':>9} {'injected':>9} {'absorbed':>9} "
+          f"{'learned rpm':>11} {'achieved':>9} {'seconds':>8}")
+
+    # Synchronous calls from a thread pool, as ingest.py and the app make them
+    limiter = RateLimiter(base_delay=args.base_delay, max_retries=20)
+    client = OpenAI(api_key="fake", base_url=base_url, max_retries=0)
+
+    def embed(text: str):
+        return limiter.call(
+            lambda: client.embeddings.with_raw_response.create(model="text-embedding-3-large", input=text,
+                                                               dimensions=8, encoding_format="float"),
+            tokens=estimate_tokens(text)
+        )
+
+    before = (server.served, server.rejected, server.injected)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        responses = list(pool.map(embed, texts))
+    succeeded = sum(len(response.data[0].embedding) == 8 for response in responses)
+    report("call", server, limiter, succeeded, len(texts), time.perf_counter() - start, *before)
+
+    # Concurrent asyncio tasks, as the ingest.py --pipeline embedding workers make them
+    limiter = RateLimiter(base_delay=args.base_delay, max_retries=20)
+    async_client = AsyncOpenAI(api_key="fake", base_url=base_url, max_retries=0)
+
+    async def embed_all():
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def embed_async(text: str):
+            async with semaphore:
+                return await limiter.call_async(
+                    lambda: async_client.embeddings.with_raw_response.create(
+                        model="text-embedding-3-large", input=text, dimensions=8, encoding_format="base64"),
+                    tokens=estimate_tokens(text)
+                )
+
+        return await asyncio.gather(*(embed_async(text) for text in texts))
+
+    time.sleep(1)  # let the server's bucket refill between runs
+    before = (server.served, server.rejected, server.injected)
+    start = time.perf_counter()
+    responses = asyncio.run(embed_all())
+    succeeded = sum(bool(response.data[0].embedding) for response in responses)
+    report("call_async", server, limiter, succeeded, len(texts), time.perf_counter() - start, *before)
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark for opening the local index from its memory-mappable vector file.
+
+Writes a file of random vectors in float32 and float16, then in a fresh process per
+case opens it either copied into memory or memory-mapped and runs a few queries,
+reporting open time, query latency and the process's private (anonymous) versus
+file-backed resident memory. File-backed pages live in the shared page cache, so
+only the private figure grows with each additional app process.
+
+    uv run python benchmarks/vector_file_benchmark.py [--vectors 50000] [--dimension 3072]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from vector_store import LocalVectorStore  # noqa: E402
+
+
+def resident_memory_mb():
+    """(private, file-backed) resident memory of this process in MB, from /proc."""
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0]) / 1024
+    return fields.get("RssAnon", 0.0), fields.get("RssFile", 0.0)
+
+
+def child(path: str, dimension: int, mmap: bool):
+    anon_before, _ = resident_memory_mb()
+    start = time.perf_counter()
+    store = LocalVectorStore(dimension=dimension, path=path, mmap=mmap)
+    open_ms = (time.perf_counter() - start) * 1000
+
+    queries = np.random.default_rng(1).standard_normal((10, dimension), dtype=np.float32)
+    store.query(queries[0], 10)
+    start = time.perf_counter()
+    for query in queries:
+        store.query(query, 10)
+    query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    anon, file_backed = resident_memory_mb()
+    print(json.dumps({"open_ms": open_ms, "query_ms": query_ms,
+                      "private_mb": anon - anon_before, "file_mb": file_backed}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--child", nargs=2, metavar=("PATH", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.dimension, args.child[1] == "mmap")
+        return
+
+    tmp_dir = Path(tempfile.mkdtemp())
+    rng = np.random.default_rng(0)
+    for dtype in ("float32", "float16"):
+        store = LocalVectorStore(dimension=args.dimension, path=str(tmp_dir / f"index-{dtype}.vec"), storage_dtype=dtype)
+        for start in range(0, args.vectors, 10_000):
+            vectors = rng.standard_normal((min(10_000, args.vectors - start), args.dimension), dtype=np.float32)
+            for i, vector in enumerate(vectors):
+                store.submit(f"doc_{start + i}", vector, {"source_file": "synthetic.docx", "paragraph_id": start + i})
+        store.flush()
+        store.save()
+        size_mb = (tmp_dir / f"index-{dtype}.vec").stat().st_size / 2**20
+        print(f"{dtype}: {args.vectors} x {args.dimension} vectors, file {size_mb:.0f} MB")
+        del store
+
+    print(f"\n{'file':<9} {'mode':<7} {'open ms':>9} {'query ms':>9} {'private MB':>11} {'file-backed MB':>15}")
+    for dtype in ("float32", "float16"):
+        for mode in ("memory", "mmap"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--dimension", str(args.dimension),
+                 "--child", str(tmp_dir / f"index-{dtype}.vec"), mode],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{dtype:<9} {mode:<7} {result['open_ms']:>9.1f} {result['query_ms']:>9.2f} "
+                  f"{result['private_mb']:>11.0f} {result['file_mb']:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Okapi BM25 keyword index over the ingested paragraphs, in a memory-mappable file.
+
+Layout (little-endian):
+
+    header          fixed 48 bytes: magic, version, byte length of the author list,
+                    document, term and posting counts, and the average document length
+    id table        documents + 1 uint64 offsets into the document IDs
+    term table      terms + 1 uint64 offsets into the terms
+    posting table   terms + 1 uint64 offsets into the posting lists
+    posting docs    uint32 document number of every posting, grouped by term
+    doc lengths     uint32 tokens per document
+    posting tfs     uint16 term frequency of every posting
+    doc authors     uint16 index into the author list per document
+    ids             UTF-8 document IDs, back to back
+    terms           UTF-8 terms in byte order, back to back
+    authors         UTF-8 JSON list of author names
+
+Every section after the header starts at an offset computed from the counts. Opening
+the file reads only the header and the document lengths. A query binary-searches the
+mapped term table for each of its terms and reads only those terms' posting lists.
+"""
+
+import json
+import math
+import os
+import re
+import struct
+import unicodedata
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"BWBM25\x00\x00"
+FORMAT_VERSION = 1
+
+# magic, version, author list bytes, documents, terms, postings, average document length
+_HEADER = struct.Struct("<8sIIQQQd")
+
+# Next to the document store, so it is deployed with the app
+DEFAULT_BM25_INDEX_PATH = "./data/bm25.idx"
+
+# Apostrophes are dropped inside words, so "Bahá'u'lláh" and "Bahaullah" match
+_APOSTROPHES = re.compile(r"['‘’ʼ`]")
+_WORD = re.compile(r"[^\W_]+")
+
+_MAX_TF = np.iinfo(np.uint16).max
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words of text with diacritics and apostrophes removed."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _WORD.findall(_APOSTROPHES.sub("", text))
+
+
+def write_bm25_index(path: str, documents: Iterable[Tuple[str, str, str]]):
+    """Index (document_id, text, author) triples and write them to path, replacing it atomically."""
+    ids: List[bytes] = []
+    lengths = array("I")
+    author_codes = array("H")
+    authors: Dict[str, int] = {}
+    # term -> (document numbers, term frequencies), in document order
+    postings: Dict[str, Tuple[array, array]] = {}
+
+    for doc, (document_id, text, author) in enumerate(documents):
+        tokens = tokenize(text)
+        ids.append(document_id.encode("utf-8"))
+        lengths.append(len(tokens))
+        author_codes.append(authors.setdefault(author, len(authors)))
+        for term, tf in Counter(tokens).items():
+            if term not in postings:
+                postings[term] = (array("I"), array("H"))
+            docs, tfs = postings[term]
+            docs.append(doc)
+            tfs.append(min(tf, _MAX_TF))
+
+    terms = sorted(postings, key=lambda term: term.encode("utf-8"))
+    term_blobs = [term.encode("utf-8") for term in terms]
+    posting_offsets = np.zeros(len(terms) + 1, dtype="<u8")
+    posting_offsets[1:] = np.cumsum([len(postings[term][0]) for term in terms], dtype=np.uint64)
+    id_offsets = np.zeros(len(ids) + 1, dtype="<u8")
+    id_offsets[1:] = np.cumsum([len(blob) for blob in ids], dtype=np.uint64)
+    term_offsets = np.zeros(len(terms) + 1, dtype="<u8")
+    term_offsets[1:] = np.cumsum([len(blob) for blob in term_blobs], dtype=np.uint64)
+    author_blob = json.dumps(sorted(authors, key=authors.get), ensure_ascii=False).encode("utf-8")
+    average_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(author_blob), len(ids), len(terms),
+                             int(posting_offsets[-1]), average_length))
+        f.write(id_offsets.tobytes())
+        f.write(term_offsets.tobytes())
+        f.write(posting_offsets.tobytes())
+        for term in terms:
+            f.write(np.frombuffer(postings[term][0], dtype=np.uint32).astype("<u4").tobytes())
+        f.write(np.frombuffer(lengths, dtype=np.uint32).astype("<u4").tobytes())
+        for term in terms:
+            f.write(np.frombuffer(postings[term][1], dtype=np.uint16).astype("<u2").tobytes())
+        f.write(np.frombuffer(author_codes, dtype=np.uint16).astype("<u2").tobytes())
+        f.writelines(ids)
+        f.writelines(term_blobs)
+        f.write(author_blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class BM25Index:
+    """A BM25 index file opened read-only through numpy.memmap."""
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        """Open the index at path, scoring with term saturation k1 and length normalization b."""
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        with open(self.path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a BM25 index file")
+        (_, version, author_bytes, self.count, self.term_count, posting_count,
+         self.average_length) = _HEADER.unpack(header)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index version in {self.path}: {version}")
+
+        offset = _HEADER.size
+
+        # np.memmap cannot map zero bytes, so empty sections become empty arrays
+        def section(dtype, length: int) -> np.ndarray:
+            nonlocal offset
+            start, offset = offset, offset + length * np.dtype(dtype).itemsize
+            if length == 0:
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(self.path, dtype=dtype, mode="r", offset=start, shape=(length,))
+
+        self._id_offsets = section("<u8", self.count + 1)
+        self._term_offsets = section("<u8", self.term_count + 1)
+        self._posting_offsets = section("<u8", self.term_count + 1)
+        self._posting_docs = section("<u4", posting_count)
+        self._lengths = section("<u4", self.count)
+        self._posting_tfs = section("<u2", posting_count)
+        self._authors = section("<u2", self.count)
+        self._ids = section(np.uint8, int(self._id_offsets[-1]))
+        self._terms = section(np.uint8, int(self._term_offsets[-1]))
+        self.authors: List[str] = json.loads(section(np.uint8, author_bytes).tobytes())
+
+        # Per-document part of the BM25 denominator, k1 * (1 - b + b * length / average)
+        average = self.average_length or 1.0
+        self._norms = (k1 * (1 - b + b * np.asarray(self._lengths, dtype=np.float32) / average)).astype(np.float32)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def id(self, doc: int) -> str:
+        """ID of document number doc."""
+        return self._ids[self._id_offsets[doc]:self._id_offsets[doc + 1]].tobytes().decode("utf-8")
+
+    def _term(self, number: int) -> bytes:
+        return self._terms[self._term_offsets[number]:self._term_offsets[number + 1]].tobytes()
+
+    def _find_term(self, term: str) -> int:
+        """Number of term in the sorted term table, or -1 if no document contains it."""
+        target = term.encode("utf-8")
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self.term_count and self._term(low) == target else -1
+
+    def search(self, query: str, top_k: int = 10,
+               authors: Optional[Sequence[str]] = None) -> List[Tuple[str, float]]:
+        """The top_k (document_id, score) pairs for query, best first, optionally only by authors.
+
+        Documents sharing no term with the query are never returned.
+        """
+        if not self.count or top_k <= 0:
+            return []
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term in set(tokenize(query)):
+            number = self._find_term(term)
+            if number < 0:
+                continue
+            start, end = int(self._posting_offsets[number]), int(self._posting_offsets[number + 1])
+            docs = np.asarray(self._posting_docs[start:end], dtype=np.intp)
+            tfs = np.asarray(self._posting_tfs[start:end], dtype=np.float32)
+            idf = math.log(1 + (self.count - len(docs) + 0.5) / (len(docs) + 0.5))
+            # Each document appears once per posting list, so the fancy-indexed add is safe
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + self._norms[docs])
+
+        if authors is not None:
+            codes = [code for code, author in enumerate(self.authors) if author in authors]
+            scores[~np.isin(self._authors, codes)] = 0
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        best = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self.id(doc), float(scores[doc])) for doc in best]
@@ -0,0 +1,106 @@
+"""
+Durable checkpoint log for ingestion runs.
+
+Each chunk of a document in progress is recorded once its embedding has been generated
+(together with the embedding) and again once it has been upserted. A run that is
+interrupted part-way through a document can then resume from the last committed
+batch without re-embedding or re-upserting anything. Entries for a document are
+dropped when it finishes.
+"""
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = "./.cache/ingest_checkpoint.sqlite"
+
+
+class ChunkState(NamedTuple):
+    chunk_hash: str
+    embedding: Optional[np.ndarray]
+    upserted: bool
+
+
+class IngestCheckpoint:
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH):
+        """Open (or create) the checkpoint database at path."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Every committed batch must survive a crash
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS chunks (
+                source_file TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                embedding BLOB,
+                upserted INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (source_file, document_id)
+            )"""
+        )
+        self._conn.commit()
+
+    def load(self, source_file: str) -> Dict[str, ChunkState]:
+        """Checkpointed chunks of a document, keyed by document_id."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT document_id, chunk_hash, embedding, upserted FROM chunks WHERE source_file = ?",
+                (source_file,)
+            ).fetchall()
+        return {
+            document_id: ChunkState(chunk_hash, np.frombuffer(blob, dtype=np.float32) if blob else None, bool(upserted))
+            for document_id, chunk_hash, blob, upserted in rows
+        }
+
+    def record_embedded(self, source_file: str, chunks: Sequence[Tuple[str, str, Sequence[float]]]):
+        """Log a batch of (document_id, chunk_hash, embedding) as embedded but not yet upserted."""
+        rows = [(source_file, document_id, chunk_hash, np.asarray(embedding, dtype=np.float32).tobytes())
+                for document_id, chunk_hash, embedding in chunks]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (source_file, document_id, chunk_hash, embedding, upserted) "
+                "VALUES (?, ?, ?, ?, 0)", rows
+            )
+            self._conn.commit()
+
+    def record_upserted(self, source_file: str, document_ids: Sequence[str]):
+        """Log a batch as upserted. The stored embeddings are no longer needed and are dropped."""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE chunks SET upserted = 1, embedding = NULL WHERE source_file = ? AND document_id = ?",
+                [(source_file, document_id) for document_id in document_ids]
+            )
+            self._conn.commit()
+
+    def pending_documents(self) -> List[str]:
+        """Documents with a run in progress."""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT source_file FROM chunks").fetchall()
+        return [source_file for (source_file,) in rows]
+
+    def clear_document(self, source_file: str):
+        """Drop the log of a finished document."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE source_file = ?", (source_file,))
+            self._conn.commit()
+
+    def clear(self):
+        """Drop all logged progress."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,112 @@
+"""
+In-process cache of chat completions with single-flight deduplication.
+
+Completions are keyed by a SHA-256 of (model, prompt, normalized input text). Entries
+expire after a TTL and the least recently used are evicted beyond a size bound. When
+several callers ask for the same key at once, only the first runs the completion; the
+others wait for it and share its result.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from embedding_cache import normalize_text
+
+
+def completion_key(model: str, prompt: str, text: str) -> str:
+    """Content hash identifying a completion of text under a model and system prompt."""
+    payload = f"{model}\x00{prompt}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """A completion in progress, which other callers of the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class CompletionCache:
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 24 * 3600):
+        """Create an empty cache of at most max_entries completions, each kept for ttl_seconds."""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # Callers that waited on another caller's completion instead of starting their own
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        # key -> (expiry time, completion), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        """Return the cached completion for key, or run compute once for all concurrent callers.
+
+        Empty completions (which callers return on failure) are handed to the waiting
+        callers but not cached. If compute raises, every waiting caller gets the error.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.value:
+                    self._entries[key] = (time.monotonic() + self.ttl_seconds, flight.value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                del self._in_flight[key]
+            flight.done.set()
+        return flight.value
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served without running a completion (cache hits and coalesced waits)."""
+        with self._lock:
+            hits, coalesced, misses = self.hits, self.coalesced, self.misses
+        lookups = hits + coalesced + misses
+        return (hits + coalesced) / lookups if lookups else 0.0
+
+    def stats(self) -> str:
+        """One-line summary of hits, coalesced waits and misses."""
+        with self._lock:
+            hits, coalesced, misses, entries = self.hits, self.coalesced, self.misses, len(self)
+        lookups = hits + coalesced + misses
+        hit_rate = (hits + coalesced) / lookups if lookups else 0.0
+        return (f"{hits} hits, {coalesced} coalesced, {misses} misses "
+                f"({hit_rate:.0%} hit rate, {entries} cached)")
@@ -0,0 +1,94 @@
+"""
+Evaluation of reduced embedding dimensions against the full-size index.
+
+text-embedding-3 models return a shortened embedding for `dimensions=d` that equals
+the first d components of the full embedding, renormalized. Reduced sizes can
+therefore be evaluated offline from a full-size local index and full-size query
+embeddings, with no new embedding calls. For each size this reports recall@k
+against full-size search, storage, and the median exact-scan latency.
+"""
+
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from vector_store import LocalVectorStore, normalize_rows
+
+DEFAULT_QUERY_LOG_PATH = "./.cache/query_log.jsonl"
+
+
+def shorten_embeddings(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    """What the API returns for `dimensions`: the leading components, renormalized."""
+    return normalize_rows(np.asarray(vectors[:, :dimensions], dtype=np.float32))
+
+
+def append_query_log(path: str, mode: str, text: str):
+    """Append a searched text to the JSON-lines query log at path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"time": time.time(), "mode": mode, "text": text}, ensure_ascii=False) + "\n")
+
+
+def read_query_log(path: str) -> List[str]:
+    """Distinct searched texts from the query log, in first-seen order."""
+    texts: Dict[str, None] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                texts.setdefault(json.loads(line)["text"], None)
+    return list(texts)
+
+
+def _search_all(store: LocalVectorStore, queries: np.ndarray, top_k: int):
+    """(top ID sets, median latency in ms) of exact searches for each query."""
+    results = []
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        matches = store.exact_search(query, top_k, include_metadata=False)
+        timings.append((time.perf_counter() - start) * 1000)
+        results.append({match["id"] for match in matches})
+    return results, statistics.median(timings)
+
+
+def evaluate_dimensions(store: LocalVectorStore, query_embeddings: np.ndarray, dimensions: Sequence[int],
+                        top_k: int = 10) -> List[Dict[str, Any]]:
+    """Compare exact search over shortened copies of store's vectors with full-size search.
+
+    query_embeddings are full-size. Returns one row per size, the full size first, with
+    recall@top_k, vector storage in bytes (float32) and median query latency.
+    """
+    queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+    expected, latency = _search_all(store, queries, top_k)
+    rows = [{"dimensions": store.dimension, "recall": 1.0,
+             "storage_bytes": store.count() * store.dimension * 4, "median_ms": latency}]
+
+    for size in sorted(set(dimensions), reverse=True):
+        if size >= store.dimension:
+            continue
+        # Upserting renormalizes the leading components, as the API does
+        shortened = LocalVectorStore(dimension=size)
+        shortened.upsert([(vector_id, vector[:size], {}) for vector_id, vector in store.items()])
+        found, latency = _search_all(shortened, shorten_embeddings(queries, size), top_k)
+        hits = sum(len(e & f) for e, f in zip(expected, found))
+        total = sum(len(e) for e in expected)
+        rows.append({"dimensions": size, "recall": hits / total if total else 1.0,
+                     "storage_bytes": shortened.count() * size * 4, "median_ms": latency})
+    return rows
+
+
+def format_report(rows: List[Dict[str, Any]], top_k: int) -> str:
+    """Table of evaluate_dimensions results, with savings relative to the full size."""
+    full = rows[0]
+    lines = [f"{'dimensions':>10} {f'recall@{top_k}':>10} {'storage MB':>11} {'saved':>6} "
+             f"{'median ms':>10} {'speedup':>8}"]
+    for row in rows:
+        lines.append(f"{row['dimensions']:>10} {row['recall']:>10.3f} {row['storage_bytes'] / 2**20:>11.1f} "
+                     f"{1 - row['storage_bytes'] / full['storage_bytes']:>6.0%} {row['median_ms']:>10.2f} "
+                     f"{full['median_ms'] / row['median_ms']:>7.1f}x")
+    return "\n".join(lines)
@@ -0,0 +1,114 @@
+"""
+Local store of passage text, keyed by document_id.
+
+With a document store, vectors carry only the small metadata needed for filtering and
+checkpointing. Passage text and display fields live here in SQLite instead, which
+keeps the text out of Pinecone's index storage, upsert payloads and query
+responses. A search then asks the vector backend for IDs and scores only and
+hydrates the hits with one batched lookup.
+"""
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Outside the gitignored .cache directory: the app needs this file wherever it is deployed
+DEFAULT_DOCUMENT_STORE_PATH = "./data/documents.sqlite"
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+class DocumentStore:
+    def __init__(self, path: str = DEFAULT_DOCUMENT_STORE_PATH):
+        """Open (or create) the document database at path."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS documents (
+                document_id TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                source_file TEXT NOT NULL,
+                paragraph_id INTEGER NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def put_many(self, paragraphs: Sequence[Dict[str, Any]]):
+        """Store paragraphs (document_id, text, source_file, paragraph_id) in one transaction."""
+        rows = [(paragraph["document_id"], paragraph["text"], paragraph["source_file"], paragraph["paragraph_id"])
+                for paragraph in paragraphs]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (document_id, text, source_file, paragraph_id) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def get_many(self, document_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored paragraphs by document_id; IDs that are not stored are left out."""
+        found = {}
+        with self._lock:
+            for i in range(0, len(document_ids), _LOOKUP_CHUNK):
+                chunk = list(document_ids[i:i + _LOOKUP_CHUNK])
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT document_id, text, source_file, paragraph_id FROM documents "
+                    f"WHERE document_id IN ({placeholders})", chunk
+                ).fetchall()
+                for document_id, text, source_file, paragraph_id in rows:
+                    found[document_id] = {"text": text, "source_file": source_file, "paragraph_id": paragraph_id}
+        return found
+
+    def iter_documents(self) -> Iterator[Dict[str, Any]]:
+        """Every stored paragraph (document_id, text, source_file, paragraph_id), in document_id order.
+
+        Rows are read _LOOKUP_CHUNK at a time, so writers are only blocked between chunks.
+        """
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT document_id, text, source_file, paragraph_id FROM documents "
+                    "WHERE document_id > ? ORDER BY document_id LIMIT ?", (last_id, _LOOKUP_CHUNK)
+                ).fetchall()
+            for document_id, text, source_file, paragraph_id in rows:
+                yield {"document_id": document_id, "text": text, "source_file": source_file,
+                       "paragraph_id": paragraph_id}
+            if len(rows) < _LOOKUP_CHUNK:
+                return
+            last_id = rows[-1][0]
+
+    def delete(self, document_ids: Sequence[str]):
+        """Delete paragraphs by document_id. Unknown IDs are ignored."""
+        with self._lock:
+            for i in range(0, len(document_ids), _LOOKUP_CHUNK):
+                chunk = list(document_ids[i:i + _LOOKUP_CHUNK])
+                placeholders = ",".join("?" * len(chunk))
+                self._conn.execute(f"DELETE FROM documents WHERE document_id IN ({placeholders})", chunk)
+            self._conn.commit()
+
+    def clear(self):
+        """Delete every paragraph."""
+        with self._lock:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.commit()
+
+    def count(self) -> int:
+        """Number of stored paragraphs."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
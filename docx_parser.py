@@ -0,0 +1,271 @@
+"""
+Parsing of .docx source documents into paragraph chunks.
+
+Paragraph text is streamed straight out of the document XML rather than through
+python-docx's object model, which keeps parsing fast and memory flat on large books.
+
+These are plain module-level functions so that they can run in worker processes:
+parse_documents fans a corpus out over a process pool and yields each document's
+chunks as soon as it has been parsed.
+"""
+
+import logging
+import multiprocessing
+import os
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# WordprocessingML element names, in ElementTree's {namespace}tag form
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_BODY = f"{_W}body"
+_P = f"{_W}p"
+_R = f"{_W}r"
+_HYPERLINK = f"{_W}hyperlink"
+_T = f"{_W}t"
+_TAB = f"{_W}tab"
+_PTAB = f"{_W}ptab"
+_BR = f"{_W}br"
+_BR_TYPE = f"{_W}type"
+_CR = f"{_W}cr"
+_NO_BREAK_HYPHEN = f"{_W}noBreakHyphen"
+_OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+def get_author_from_filename(filename: str) -> str:
+    """Determine the author based on filename."""
+    filename_lower = filename.lower().replace('.docx', '')
+
+    # Bahá'u'lláh
+    bahaullah_works = [
+        'kitab-i-iqan', 'hidden-words', 'gleanings-writings-bahaullah', 
+        'kitab-i-aqdas-2', 'epistle-son-wolf', 'gems-divine-mysteries',
+        'summons-lord-hosts', 'tablets-bahaullah', 'tabernacle-unity',
+        'prayers-meditations'
+    ]
+
+    # 'Abdu'l-Bahá  
+    abdul_baha_works = [
+        'some-answered-questions', 'paris-talks', 'promulgation-universal-peace',
+        'memorials-faithful', 'selections-writings-abdul-baha', 
+        'secret-divine-civilization', 'travelers-narrative', 
+        'will-testament-abdul-baha', 'tablets-divine-plan', 'tablet-auguste-forel'
+    ]
+
+    # The Báb
+    bab_works = ['selections-writings-bab']
+
+    # Shoghi Effendi
+    shoghi_works = [
+        'advent-divine-justice', 'god-passes-by', 'promised-day-come',
+        'world-order-bahaullah'
+    ]
+
+    # Universal House of Justice (dated documents and institutional)
+    uhj_works = [
+        'the-institution-of-the-counsellors', 'turning-point', 'muhj-1963-1986'
+    ]
+
+    # Compilations
+    compilation_works = ['days-remembrance', 'light-of-the-world']
+
+    # Check filename against each category
+    if filename_lower in bahaullah_works:
+        return "Bahá'u'lláh"
+    elif filename_lower in abdul_baha_works:
+        return "'Abdu'l-Bahá"
+    elif filename_lower in bab_works:
+        return "The Báb"
+    elif filename_lower in shoghi_works:
+        return "Shoghi Effendi"
+    elif filename_lower in uhj_works:
+        return "Universal House of Justice"
+    elif filename_lower in compilation_works:
+        return "Compilations"
+    # Handle dated documents (likely UHJ messages)
+    elif filename_lower.startswith(('19', '20')) and '_' in filename_lower:
+        return "Universal House of Justice"
+    else:
+        return "Other"
+
+def combine_short_paragraphs(raw_paragraphs: Iterable[Dict[str, Any]], min_words: int = 100) -> List[Tuple[str, List[int]]]:
+    """Merge runs of short paragraphs until each chunk has at least min_words words.
+    
+    A paragraph under min_words absorbs the following paragraphs until the running word
+    count reaches min_words. Returns (text, original_ids) per chunk. Each paragraph's
+    words are counted once and each chunk is joined once, so the cost is linear in the
+    size of the document, and raw_paragraphs may be a lazy iterator.
+    """
+    chunks = []
+    parts: List[str] = []
+    combined_ids: List[int] = []
+    word_count = 0
+    
+    for paragraph in raw_paragraphs:
+        parts.append(paragraph["text"])
+        combined_ids.append(paragraph["original_id"])
+        word_count += len(paragraph["text"].split())
+        
+        if word_count >= min_words:
+            chunks.append((" ".join(parts), combined_ids))
+            parts = []
+            combined_ids = []
+            word_count = 0
+    
+    # A trailing run that never reached min_words still forms a chunk
+    if parts:
+        chunks.append((" ".join(parts), combined_ids))
+    
+    return chunks
+
+def _main_document_part(archive: zipfile.ZipFile) -> str:
+    """Locate the main document part through the package relationships."""
+    try:
+        with archive.open("_rels/.rels") as rels:
+            for relationship in ET.parse(rels).getroot():
+                if relationship.get("Type") == _OFFICE_DOCUMENT_REL:
+                    return relationship.get("Target").lstrip("/")
+    except KeyError:
+        pass
+    return "word/document.xml"
+
+def _run_text(run: ET.Element) -> str:
+    """Text of a w:r element, mapped the way python-docx maps it."""
+    parts = []
+    for child in run:
+        if child.tag == _T:
+            parts.append(child.text or "")
+        elif child.tag in (_TAB, _PTAB):
+            parts.append("\t")
+        elif child.tag == _CR:
+            parts.append("\n")
+        elif child.tag == _BR:
+            # Page and column breaks carry no text
+            if child.get(_BR_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif child.tag == _NO_BREAK_HYPHEN:
+            parts.append("-")
+    return "".join(parts)
+
+def _paragraph_text(paragraph: ET.Element) -> str:
+    """Text of a w:p element: its runs plus the runs inside its hyperlinks."""
+    parts = []
+    for child in paragraph:
+        if child.tag == _R:
+            parts.append(_run_text(child))
+        elif child.tag == _HYPERLINK:
+            parts.extend(_run_text(run) for run in child if run.tag == _R)
+    return "".join(parts)
+
+def iter_docx_paragraphs(file_path: str) -> Iterator[Tuple[int, str]]:
+    """Stream (index, text) for each body paragraph of a .docx file.
+    
+    Reads the main document XML straight out of the zip with an incremental parser and
+    discards each top-level body element once it has been read, so memory stays flat
+    however long the book is. Indexes and text match python-docx's
+    Document(file_path).paragraphs and Paragraph.text, including empty paragraphs,
+    which keeps paragraph IDs stable.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(_main_document_part(archive)) as document_xml:
+            depth = 0
+            body = None
+            index = 0
+            for event, element in ET.iterparse(document_xml, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2 and element.tag == _BODY:
+                        body = element
+                    continue
+                
+                depth -= 1
+                # Only direct children of w:body count; paragraphs in tables do not
+                if depth == 2 and body is not None:
+                    if element.tag == _P:
+                        yield index, _paragraph_text(element)
+                        index += 1
+                    body.remove(element)
+
+def extract_paragraphs_from_docx(file_path: str) -> List[Dict[str, Any]]:
+    """Extract paragraphs from a .docx file, combining short paragraphs."""
+    logger.info(f"Processing document: {file_path}")
+
+    raw_count = 0
+
+    # First, stream all non-empty paragraphs
+    def raw_paragraphs():
+        nonlocal raw_count
+        for i, text in iter_docx_paragraphs(file_path):
+            text = text.strip()
+            if text:  # Only keep non-empty paragraphs
+                raw_count += 1
+                yield {
+                    "text": text,
+                    "original_id": i
+                }
+
+    # Now combine paragraphs with <min_words words
+    combined_paragraphs = []
+    for text, combined_ids in combine_short_paragraphs(raw_paragraphs(), min_words=100):
+        start_id = combined_ids[0]
+
+        # Create the combined paragraph entry
+        if len(combined_ids) == 1:
+            document_id = f"{Path(file_path).stem}_para_{start_id}"
+        else:
+            document_id = f"{Path(file_path).stem}_para_{combined_ids[0]}-{combined_ids[-1]}"
+
+        combined_paragraphs.append({
+            "text": text,
+            "paragraph_id": start_id,  # Use the ID of the first paragraph
+            "source_file": Path(file_path).name,
+            "document_id": document_id,
+            "author": get_author_from_filename(Path(file_path).name)
+        })
+
+    logger.info(f"Extracted {raw_count} raw paragraphs, combined into {len(combined_paragraphs)} final paragraphs")
+    return combined_paragraphs
+
+def parse_documents(file_paths: List[str], workers: Optional[int] = None) -> Iterator[Tuple[str, Optional[List[Dict[str, Any]]], Optional[Exception]]]:
+    """Parse documents across a process pool, yielding results as each one finishes.
+    
+    Yields (file_path, paragraphs, None) on success and (file_path, None, error) on
+    failure, in completion order. At most twice `workers` documents are queued or being
+    parsed at a time, so parsed chunks never pile up far ahead of a slower consumer.
+    With one worker (or one document) parsing happens in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(file_paths) <= 1:
+        for file_path in file_paths:
+            try:
+                yield file_path, extract_paragraphs_from_docx(file_path), None
+            except Exception as e:
+                yield file_path, None, e
+        return
+    
+    # Spawned workers import this module fresh rather than forking a threaded parent
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        remaining = iter(file_paths)
+        pending = {}
+        
+        def fill():
+            while len(pending) < workers * 2:
+                file_path = next(remaining, None)
+                if file_path is None:
+                    return
+                pending[pool.submit(extract_paragraphs_from_docx, file_path)] = file_path
+        
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path = pending.pop(future)
+                try:
+                    yield file_path, future.result(), None
+                except Exception as e:
+                    yield file_path, None, e
+            fill()
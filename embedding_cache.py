@@ -0,0 +1,192 @@
+"""
+Persistent, content-addressed cache of embeddings.
+
+Entries are keyed by a SHA-256 of (model, dimensions, normalized text) and stored as
+float32 blobs in SQLite, so re-ingesting unchanged text never pays for a second
+embedding call. QueryEmbeddingCache puts a size- and TTL-bounded in-process LRU in
+front of such a cache for the app's search queries.
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "./.cache/embeddings.sqlite"
+DEFAULT_QUERY_CACHE_PATH = "./.cache/query_embeddings.sqlite"
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys: NFC form, collapsed whitespace, no outer spaces."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def embedding_key(text: str, model: str, dimensions: int) -> str:
+    """Content hash identifying an embedding of text under a model and dimension count."""
+    payload = f"{model}\x00{dimensions}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, model: str = "text-embedding-3-large",
+                 dimensions: int = 3072):
+        """Open (or create) the cache database at path."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.dimensions = dimensions
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def key(self, text: str) -> str:
+        """Cache key for text under this cache's model and dimensions."""
+        return embedding_key(text, self.model, self.dimensions)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for text, or None."""
+        return self.get_many([text])[0]
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return cached embeddings for texts in order, with None for misses."""
+        keys = [self.key(text) for text in texts]
+        found = {}
+
+        with self._lock:
+            for i in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[i:i + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+
+        results = []
+        for key in keys:
+            blob = found.get(key)
+            if blob is None:
+                results.append(None)
+            else:
+                results.append(np.frombuffer(blob, dtype=np.float32))
+
+        hit_count = sum(result is not None for result in results)
+        with self._lock:
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        return results
+
+    def put(self, text: str, embedding: Sequence[float]):
+        """Store the embedding for text."""
+        self.put_many([text], [embedding])
+
+    def put_many(self, texts: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """Store embeddings for texts in one transaction."""
+        rows = [(self.key(text), np.asarray(embedding, dtype=np.float32).tobytes())
+                for text, embedding in zip(texts, embeddings)]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class QueryEmbeddingCache:
+    """Two-tier cache of query embeddings: an in-process LRU in front of an EmbeddingCache on disk.
+
+    The LRU holds at most max_entries embeddings, each for at most ttl_seconds; the disk
+    tier (skipped when path is None) keeps every embedding, since an embedding of the
+    same text under the same model never changes. Both tiers use embedding_key, so
+    queries differing only in whitespace or Unicode form share an entry.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 24 * 3600,
+                 path: Optional[str] = DEFAULT_QUERY_CACHE_PATH, model: str = "text-embedding-3-large",
+                 dimensions: int = 3072):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.model = model
+        self.dimensions = dimensions
+        self.disk = EmbeddingCache(path, model, dimensions) if path else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (expiry time, embedding), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, embedding: np.ndarray):
+        """Insert into the LRU, evicting the least recently used entries beyond max_entries."""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for text from either tier, or None."""
+        key = embedding_key(text, self.model, self.dimensions)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, embedding = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return embedding
+                del self._entries[key]
+
+        embedding = self.disk.get(text) if self.disk is not None else None
+        with self._lock:
+            if embedding is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, embedding)
+        return embedding
+
+    def put(self, text: str, embedding: Sequence[float]):
+        """Store the embedding for text in both tiers."""
+        embedding = np.array(embedding, dtype=np.float32)
+        # Shared by every session, so callers must not modify it
+        embedding.setflags(write=False)
+        with self._lock:
+            self._remember(embedding_key(text, self.model, self.dimensions), embedding)
+        if self.disk is not None:
+            self.disk.put(text, embedding)
+
+    def stats(self) -> str:
+        """One-line summary of hits per tier and misses."""
+        with self._lock:
+            memory_hits, disk_hits, misses, entries = self.memory_hits, self.disk_hits, self.misses, len(self)
+        lookups = memory_hits + disk_hits + misses
+        hit_rate = (memory_hits + disk_hits) / lookups if lookups else 0.0
+        return (f"{memory_hits} memory hits, {disk_hits} disk hits, {misses} misses "
+                f"({hit_rate:.0%} hit rate, {entries} in memory)")
@@ -0,0 +1,33 @@
+"""
+Reciprocal rank fusion (RRF) of several ranked result lists.
+
+Each list contributes weight / (k + rank) to the fused score of every item in it, with
+ranks counted from 1. Only ranks matter, so lists whose scores are not comparable (a
+raw and a rewritten query, or keyword and vector search) can be merged directly. k
+(60 by default, as in Cormack et al.) damps the influence of the very top ranks.
+"""
+
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[T]], key: Callable[[T], Hashable], k: int = DEFAULT_RRF_K,
+                           weights: Optional[Sequence[float]] = None) -> List[T]:
+    """Merge best-first rankings into one, best first.
+
+    key identifies the same item across lists; an item found in several lists is
+    returned as it appears in the first of them. Ties keep first-seen order.
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[Hashable, float] = {}
+    items: Dict[Hashable, T] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item in enumerate(ranking, 1):
+            item_key = key(item)
+            scores[item_key] = scores.get(item_key, 0.0) + weight / (k + rank)
+            items.setdefault(item_key, item)
+    order = sorted(scores, key=lambda item_key: -scores[item_key])
+    return [items[item_key] for item_key in order]
@@ -0,0 +1,282 @@
+"""
+Hierarchical navigable small world (HNSW) graph for approximate local search.
+
+The graph stores only neighbor lists; vectors stay in the local store's matrix (or its
+memory-mapped vector file) and are passed in for every build and search. Similarity
+is the dot product, which is cosine similarity for the store's normalized rows.
+
+M sets how many neighbors each node links to (twice that on the bottom layer),
+ef_construction the beam width used while inserting, and ef_search the beam width
+used while querying; higher values trade speed for recall. The graph is saved in a
+file next to the vectors, with the bottom layer opened through numpy.memmap.
+"""
+
+import heapq
+import logging
+import math
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BWHNSW\x00\x00"
+FORMAT_VERSION = 1
+
+# magic, version, M, ef_construction, max level, count, entry point, vector fingerprint
+_HEADER = struct.Struct("<8sIIIiQqQ")
+_LEVEL_HEADER = struct.Struct("<Q")
+
+
+class HNSWIndex:
+    # Suffix of the graph file saved next to the vector file
+    SUFFIX = ".hnsw"
+
+    def __init__(self, M: int = 16, ef_construction: int = 100, ef_search: int = 64, seed: int = 0):
+        """Create an empty graph."""
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        # Fingerprint of the vectors the graph was built over (see LocalVectorStore)
+        self.fingerprint = 0
+        self.count = 0
+        self.entry_point = -1
+        self.max_level = -1
+
+        self._rng = np.random.default_rng(seed)
+        self._level_scale = 1 / math.log(M)
+        self._levels = np.zeros(0, dtype=np.int8)
+        self._counts0 = np.zeros(0, dtype=np.int32)
+        self._links0 = np.zeros((0, self.M0), dtype=np.int32)
+        # Upper layers: _upper[level - 1] maps node -> neighbor array
+        self._upper: List[Dict[int, np.ndarray]] = []
+
+    def __len__(self) -> int:
+        return self.count
+
+    def empty_copy(self) -> "HNSWIndex":
+        """A new, empty graph with the same parameters."""
+        return HNSWIndex(M=self.M, ef_construction=self.ef_construction, ef_search=self.ef_search)
+
+    def copy_search_params(self, other: "HNSWIndex"):
+        """Search with other's query-time settings."""
+        self.ef_search = other.ef_search
+
+    def _neighbors(self, node: int, level: int) -> np.ndarray:
+        if level == 0:
+            return self._links0[node, :self._counts0[node]]
+        return self._upper[level - 1][node]
+
+    def _set_neighbors(self, node: int, level: int, neighbors: np.ndarray):
+        if level == 0:
+            self._links0[node, :len(neighbors)] = neighbors
+            self._counts0[node] = len(neighbors)
+        else:
+            self._upper[level - 1][node] = np.asarray(neighbors, dtype=np.int32)
+
+    def _search_layer(self, vectors: np.ndarray, query: np.ndarray, entry_points: List[int], ef: int,
+                      level: int, visited: np.ndarray) -> List[Tuple[float, int]]:
+        """Beam search of one layer, returning up to ef (similarity, node) pairs, best first."""
+        entry_points = [node for node in entry_points if not visited[node]]
+        visited[entry_points] = True
+        similarities = (vectors[entry_points] @ query).tolist()
+        candidates = [(-similarity, node) for similarity, node in zip(similarities, entry_points)]
+        heapq.heapify(candidates)
+        results = [(similarity, node) for similarity, node in zip(similarities, entry_points)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            negative_similarity, node = heapq.heappop(candidates)
+            if -negative_similarity < results[0][0] and len(results) >= ef:
+                break
+            neighbors = self._neighbors(node, level)
+            neighbors = neighbors[~visited[neighbors]]
+            if not len(neighbors):
+                continue
+            visited[neighbors] = True
+            for similarity, neighbor in zip((vectors[neighbors] @ query).tolist(), neighbors.tolist()):
+                if len(results) < ef or similarity > results[0][0]:
+                    heapq.heappush(candidates, (-similarity, neighbor))
+                    heapq.heappush(results, (similarity, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def _select_neighbors(self, vectors: np.ndarray, candidates: List[Tuple[float, int]], m: int) -> np.ndarray:
+        """Pick up to m diverse neighbors from (similarity, node) candidates sorted best first.
+
+        A candidate is kept only if it is closer to the base node than to every neighbor
+        already kept, which keeps links spread across directions (the HNSW heuristic).
+        """
+        nodes = np.array([node for _, node in candidates], dtype=np.int32)
+        if len(nodes) <= m:
+            return nodes
+        similarities = np.array([similarity for similarity, _ in candidates], dtype=np.float32)
+        candidate_vectors = vectors[nodes]
+        pairwise = candidate_vectors @ candidate_vectors.T
+
+        selected: List[int] = []
+        for i in range(len(nodes)):
+            if not selected or pairwise[i, selected].max() < similarities[i]:
+                selected.append(i)
+                if len(selected) == m:
+                    break
+        return nodes[selected]
+
+    def _random_level(self) -> int:
+        return int(-math.log(1.0 - self._rng.random()) * self._level_scale)
+
+    def _reserve(self, count: int):
+        if count <= len(self._levels):
+            return
+        capacity = max(count, 2 * len(self._levels), 1024)
+        levels = np.zeros(capacity, dtype=np.int8)
+        levels[:self.count] = self._levels[:self.count]
+        counts0 = np.zeros(capacity, dtype=np.int32)
+        counts0[:self.count] = self._counts0[:self.count]
+        links0 = np.full((capacity, self.M0), -1, dtype=np.int32)
+        links0[:self.count] = self._links0[:self.count]
+        self._levels, self._counts0, self._links0 = levels, counts0, links0
+
+    def _insert(self, vectors: np.ndarray, node: int):
+        level = self._random_level()
+        self._levels[node] = level
+        while len(self._upper) < level:
+            self._upper.append({})
+        for layer in range(1, level + 1):
+            self._upper[layer - 1][node] = np.zeros(0, dtype=np.int32)
+        self.count = node + 1
+
+        if self.entry_point < 0:
+            self.entry_point = node
+            self.max_level = level
+            return
+
+        query = vectors[node]
+        visited = np.zeros(self.count, dtype=bool)
+        entry_points = [self.entry_point]
+        for layer in range(self.max_level, level, -1):
+            visited[:] = False
+            entry_points = [self._search_layer(vectors, query, entry_points, 1, layer, visited)[0][1]]
+
+        for layer in range(min(level, self.max_level), -1, -1):
+            visited[:] = False
+            visited[node] = True
+            candidates = self._search_layer(vectors, query, entry_points, self.ef_construction, layer, visited)
+            neighbors = self._select_neighbors(vectors, candidates, self.M)
+            self._set_neighbors(node, layer, neighbors)
+
+            capacity = self.M0 if layer == 0 else self.M
+            for neighbor in neighbors.tolist():
+                links = self._neighbors(neighbor, layer)
+                if len(links) < capacity:
+                    self._set_neighbors(neighbor, layer, np.append(links, node))
+                    continue
+                # Full: keep the most diverse set among its links and the new node
+                links = np.append(links, node)
+                similarities = vectors[links] @ vectors[neighbor]
+                order = np.argsort(-similarities)
+                ranked = [(float(similarities[i]), int(links[i])) for i in order]
+                self._set_neighbors(neighbor, layer, self._select_neighbors(vectors, ranked, capacity))
+            entry_points = [candidate for _, candidate in candidates]
+
+        if level > self.max_level:
+            self.entry_point = node
+            self.max_level = level
+
+    def add(self, vectors: np.ndarray, log_every: int = 10_000):
+        """Insert rows count..len(vectors) - 1 of vectors, which must extend the rows already indexed."""
+        total = len(vectors)
+        if total <= self.count:
+            return
+        # A memory-mapped graph is copied into memory before it is extended
+        self._levels = np.array(self._levels)
+        self._counts0 = np.array(self._counts0)
+        self._links0 = np.array(self._links0)
+        self._reserve(total)
+        start = self.count
+        for node in range(start, total):
+            self._insert(vectors, node)
+            if log_every and (node + 1 - start) % log_every == 0:
+                logger.info(f"HNSW: inserted {node + 1 - start}/{total - start} vectors")
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, top_k: int,
+               ef: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top_k rows for a normalized query, as (rows, similarities) best first."""
+        if self.entry_point < 0 or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        ef = max(ef or self.ef_search, top_k)
+        visited = np.zeros(self.count, dtype=bool)
+        entry_points = [self.entry_point]
+        for layer in range(self.max_level, 0, -1):
+            visited[:] = False
+            entry_points = [self._search_layer(vectors, query, entry_points, 1, layer, visited)[0][1]]
+        visited[:] = False
+        results = self._search_layer(vectors, query, entry_points, ef, 0, visited)[:top_k]
+        return (np.array([node for _, node in results], dtype=np.int64),
+                np.array([similarity for similarity, _ in results], dtype=np.float32))
+
+    def save(self, path: str):
+        """Write the graph to path, replacing it atomically."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, self.M, self.ef_construction, self.max_level,
+                                 self.count, self.entry_point, self.fingerprint))
+            f.write(self._levels[:self.count].tobytes())
+            f.write(self._counts0[:self.count].astype("<i4").tobytes())
+            f.write(self._links0[:self.count].astype("<i4").tobytes())
+            for layer in self._upper:
+                nodes = np.array(sorted(layer), dtype="<i4")
+                f.write(_LEVEL_HEADER.pack(len(nodes)))
+                f.write(nodes.tobytes())
+                counts = np.array([len(layer[node]) for node in nodes.tolist()], dtype="<i4")
+                links = np.full((len(nodes), self.M), -1, dtype="<i4")
+                for i, node in enumerate(nodes.tolist()):
+                    links[i, :counts[i]] = layer[node]
+                f.write(counts.tobytes())
+                f.write(links.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, ef_search: int = 64) -> "HNSWIndex":
+        """Open a saved graph, mapping its bottom layer read-only."""
+        path = Path(path)
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not an HNSW graph")
+            _, version, M, ef_construction, max_level, count, entry_point, fingerprint = _HEADER.unpack(header)
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported HNSW graph version in {path}: {version}")
+
+            index = cls(M=M, ef_construction=ef_construction, ef_search=ef_search)
+            index.count, index.entry_point, index.max_level, index.fingerprint = count, entry_point, max_level, fingerprint
+            offset = _HEADER.size
+            if count:
+                index._levels = np.memmap(path, dtype=np.int8, mode="r", offset=offset, shape=(count,))
+                offset += count
+                index._counts0 = np.memmap(path, dtype="<i4", mode="r", offset=offset, shape=(count,))
+                offset += 4 * count
+                index._links0 = np.memmap(path, dtype="<i4", mode="r", offset=offset, shape=(count, index.M0))
+                offset += 4 * count * index.M0
+
+            # Upper layers hold about 1/M of the nodes and are read into memory
+            f.seek(offset)
+            for _ in range(max(max_level, 0)):
+                (size,) = _LEVEL_HEADER.unpack(f.read(_LEVEL_HEADER.size))
+                nodes = np.frombuffer(f.read(4 * size), dtype="<i4")
+                counts = np.frombuffer(f.read(4 * size), dtype="<i4")
+                links = np.frombuffer(f.read(4 * size * M), dtype="<i4").reshape(size, M)
+                index._upper.append({int(node): links[i, :counts[i]].astype(np.int32)
+                                     for i, node in enumerate(nodes)})
+        return index
@@ -0,0 +1,47 @@
+"""
+Index statistics refreshed in the background and shared by every app session.
+
+Reading stats is a network round trip to Pinecone, too slow to repeat on every
+Streamlit rerun. IndexStatsCache serves the latest snapshot immediately and, once it
+is older than the TTL, refreshes it on a background thread, so page rendering never
+waits for the backend.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IndexStatsCache:
+    def __init__(self, fetch: Callable[[], Dict[str, Any]], ttl_seconds: float = 300):
+        """Serve snapshots of fetch(), refetched in the background once older than ttl_seconds."""
+        self.fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._refreshed = 0.0
+        self._refreshing = False
+
+    def _refresh(self):
+        try:
+            snapshot = dict(self.fetch())
+        except Exception as e:
+            logger.warning(f"Refreshing index stats failed: {e}")
+            snapshot = {"error": str(e)}
+        snapshot["refreshed_at"] = time.time()
+        with self._lock:
+            self._snapshot = snapshot
+            self._refreshed = time.monotonic()
+            self._refreshing = False
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """The latest snapshot (None until the first refresh finishes), starting a refresh if it is stale."""
+        with self._lock:
+            stale = self._snapshot is None or time.monotonic() - self._refreshed >= self.ttl_seconds
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, name="index-stats-refresh", daemon=True).start()
+            return self._snapshot
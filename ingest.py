@@ -5,14 +5,34 @@ Processes .docx files, chunks by paragraphs, and stores embeddings in Pinecone.
 """
 
 import os
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
 import logging
 import shutil
+import time
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import numpy as np
 from pinecone import Pinecone, ServerlessSpec
-from docx import Document
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
+from rate_limiter import RateLimiter, estimate_tokens
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from manifest import IngestManifest, DEFAULT_MANIFEST_PATH
+from checkpoint import IngestCheckpoint, DEFAULT_CHECKPOINT_PATH
+from upserter import PendingVector
+from vector_store import (VectorBackend, PineconeBackend, LocalVectorStore, DEFAULT_LOCAL_INDEX_PATH,
+                          FULL_EMBEDDING_DIMENSIONS, pinecone_index_name)
+from document_store import DocumentStore, DEFAULT_DOCUMENT_STORE_PATH
+from bm25 import DEFAULT_BM25_INDEX_PATH, write_bm25_index
+from dimension_eval import DEFAULT_QUERY_LOG_PATH, evaluate_dimensions, format_report, read_query_log
+from hnsw import HNSWIndex
+from ivfpq import IVFPQIndex
+from quantization import BinaryIndex, Int8Index
+from docx_parser import extract_paragraphs_from_docx, get_author_from_filename, parse_documents
 import streamlit as st 
 
 # Load environment variables
@@ -22,15 +42,53 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def decode_embedding(data) -> np.ndarray:
+    """Decode an embedding from the API (base64 or a list of floats) into a float32 array."""
+    if isinstance(data, str):
+        return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+    return np.asarray(data, dtype=np.float32)
+
 class BahaiWritingsIngestor:
-    def __init__(self, openai_api_key: str, pinecone_api_key: str):
-        """Initialize the ingestion pipeline."""
-        self.openai_client = OpenAI(api_key=openai_api_key)
-        self.pc = Pinecone(api_key=pinecone_api_key)
-        self.index_name = "bahai-writings"
-        self.dimension = 3072  # Dimension for text-embedding-3-large
+    def __init__(self, openai_api_key: str, pinecone_api_key: str, rate_limiter: Optional[RateLimiter] = None,
+                 embedding_cache: Optional[EmbeddingCache] = None, upsert_parallelism: int = 4,
+                 backend: Optional[VectorBackend] = None, dimensions: int = FULL_EMBEDDING_DIMENSIONS,
+                 documents: Optional[DocumentStore] = None):
+        """Initialize the ingestion pipeline, storing vectors in Pinecone unless another backend is given.
+        
+        dimensions is the embedding size requested from text-embedding-3-large; each size
+        is kept in its own Pinecone index. With a documents store, paragraph text is kept
+        there instead of in vector metadata.
+        """
+        # Retries are handled by the rate limiter, which backs off across all callers
+        self.openai_client = OpenAI(api_key=openai_api_key, max_retries=0)
+        self.async_openai_client = AsyncOpenAI(api_key=openai_api_key, max_retries=0)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.embedding_cache = embedding_cache
+        # When set, records which chunks (and which content) are in the index
+        self.manifest: Optional[IngestManifest] = None
+        # When set, logs per-batch progress so interrupted runs can resume
+        self.checkpoint: Optional[IngestCheckpoint] = None
+        self.documents = documents
+        self.dimension = dimensions
+        self.index_name = pinecone_index_name(dimensions)
+        
+        # Embedding batches are capped by item count and by an estimated token budget
+        # (the API allows at most 2048 inputs and 300k tokens per request)
+        self.embedding_batch_size = 256
+        self.embedding_batch_max_tokens = 200_000
+        
+        # Processes used to parse .docx files (None uses every core)
+        self.parse_workers: Optional[int] = None
+        
+        if backend is not None:
+            self.pc = None
+            self.index = None
+            self.backend = backend
+            self.backend.on_committed = self.record_upserted
+            return
         
         # Create or get index
+        self.pc = Pinecone(api_key=pinecone_api_key)
         try:
             # Check if index exists
             if self.index_name not in [index.name for index in self.pc.list_indexes()]:
@@ -51,172 +109,421 @@ class BahaiWritingsIngestor:
         except Exception as e:
             logger.error(f"Error initializing Pinecone index: {e}")
             raise
+        
+        # Upserts are packed by payload size and sent concurrently
+        self.backend = PineconeBackend(self.index, parallelism=upsert_parallelism,
+                                       on_committed=self.record_upserted)
 
     def get_author_from_filename(self, filename: str) -> str:
         """Determine the author based on filename."""
-        filename_lower = filename.lower().replace('.docx', '')
-        
-        # Bahá'u'lláh
-        bahaullah_works = [
-            'kitab-i-iqan', 'hidden-words', 'gleanings-writings-bahaullah', 
-            'kitab-i-aqdas-2', 'epistle-son-wolf', 'gems-divine-mysteries',
-            'summons-lord-hosts', 'tablets-bahaullah', 'tabernacle-unity',
-            'prayers-meditations'
-        ]
-        
-        # 'Abdu'l-Bahá  
-        abdul_baha_works = [
-            'some-answered-questions', 'paris-talks', 'promulgation-universal-peace',
-            'memorials-faithful', 'selections-writings-abdul-baha', 
-            'secret-divine-civilization', 'travelers-narrative', 
-            'will-testament-abdul-baha', 'tablets-divine-plan', 'tablet-auguste-forel'
-        ]
-        
-        # The Báb
-        bab_works = ['selections-writings-bab']
-        
-        # Shoghi Effendi
-        shoghi_works = [
-            'advent-divine-justice', 'god-passes-by', 'promised-day-come',
-            'world-order-bahaullah'
-        ]
-        
-        # Universal House of Justice (dated documents and institutional)
-        uhj_works = [
-            'the-institution-of-the-counsellors', 'turning-point', 'muhj-1963-1986'
-        ]
-        
-        # Compilations
-        compilation_works = ['days-remembrance', 'light-of-the-world']
-        
-        # Check filename against each category
-        if filename_lower in bahaullah_works:
-            return "Bahá'u'lláh"
-        elif filename_lower in abdul_baha_works:
-            return "'Abdu'l-Bahá"
-        elif filename_lower in bab_works:
-            return "The Báb"
-        elif filename_lower in shoghi_works:
-            return "Shoghi Effendi"
-        elif filename_lower in uhj_works:
-            return "Universal House of Justice"
-        elif filename_lower in compilation_works:
-            return "Compilations"
-        # Handle dated documents (likely UHJ messages)
-        elif filename_lower.startswith(('19', '20')) and '_' in filename_lower:
-            return "Universal House of Justice"
-        else:
-            return "Other"
+        return get_author_from_filename(filename)
 
     def extract_paragraphs_from_docx(self, file_path: str) -> List[Dict[str, Any]]:
         """Extract paragraphs from a .docx file, combining short paragraphs."""
-        logger.info(f"Processing document: {file_path}")
-        
-        doc = Document(file_path)
-        raw_paragraphs = []
-        
-        # First, extract all non-empty paragraphs
-        for i, paragraph in enumerate(doc.paragraphs):
-            text = paragraph.text.strip()
-            if text:  # Only keep non-empty paragraphs
-                raw_paragraphs.append({
-                    "text": text,
-                    "original_id": i
-                })
-        
-        # Now combine paragraphs with <min_words words
-        min_words = 100
-        combined_paragraphs = []
-        i = 0
-        
-        while i < len(raw_paragraphs):
-            current_text = raw_paragraphs[i]["text"]
-            current_word_count = len(current_text.split())
-            start_id = raw_paragraphs[i]["original_id"]
-            combined_ids = [start_id]
-            
-            # If current paragraph has <min_words words, combine with next paragraphs
-            if current_word_count < min_words and i < len(raw_paragraphs) - 1:
-                j = i + 1
-                while j < len(raw_paragraphs) and len(current_text.split()) < min_words:
-                    next_text = raw_paragraphs[j]["text"]
-                    current_text += " " + next_text
-                    combined_ids.append(raw_paragraphs[j]["original_id"])
-                    j += 1
-                i = j  # Skip the paragraphs we just combined
-            else:
-                i += 1  # Move to next paragraph
-            
-            # Create the combined paragraph entry
-            if len(combined_ids) == 1:
-                document_id = f"{Path(file_path).stem}_para_{start_id}"
-            else:
-                document_id = f"{Path(file_path).stem}_para_{combined_ids[0]}-{combined_ids[-1]}"
-            
-            combined_paragraphs.append({
-                "text": current_text,
-                "paragraph_id": start_id,  # Use the ID of the first paragraph
-                "source_file": Path(file_path).name,
-                "document_id": document_id,
-                "author": self.get_author_from_filename(Path(file_path).name)
-            })
-        
-        logger.info(f"Extracted {len(raw_paragraphs)} raw paragraphs, combined into {len(combined_paragraphs)} final paragraphs")
-        return combined_paragraphs
+        return extract_paragraphs_from_docx(file_path)
+
+    def parse_documents(self, file_paths: List[str]) -> Iterator[Tuple[str, Optional[List[Dict[str, Any]]], Optional[Exception]]]:
+        """Parse documents on the process pool, yielding (file_path, paragraphs, error) as they finish."""
+        return parse_documents(file_paths, self.parse_workers)
 
-    def generate_embedding(self, text: str) -> List[float]:
+    def generate_embedding(self, text: str) -> np.ndarray:
         """Generate embedding for text using OpenAI's text-embedding-3-large model."""
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.get(text)
+            if cached is not None:
+                return cached
+        
         try:
-            response = self.openai_client.embeddings.create(
-                model="text-embedding-3-large",
-                input=text,
-                encoding_format="float"
+            response = self.rate_limiter.call(
+                lambda: self.openai_client.embeddings.with_raw_response.create(
+                    model="text-embedding-3-large",
+                    input=text,
+                    dimensions=self.dimension,
+                    encoding_format="base64"
+                ),
+                tokens=estimate_tokens(text)
             )
-            return response.data[0].embedding
+            embedding = decode_embedding(response.data[0].embedding)
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             raise
+        
+        if self.embedding_cache is not None:
+            self.embedding_cache.put(text, embedding)
+        return embedding
 
-    def ingest_paragraphs(self, paragraphs: List[Dict[str, Any]]):
-        """Generate embeddings and store paragraphs in Pinecone."""
-        logger.info(f"Generating embeddings for {len(paragraphs)} paragraphs...")
+    def _cached_embeddings(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look texts up in the embedding cache, with None for anything not cached."""
+        if self.embedding_cache is None:
+            return [None] * len(texts)
+        return self.embedding_cache.get_many(texts)
+
+    def _fill_embeddings(self, texts: List[str], embeddings: List[Optional[np.ndarray]],
+                         missing: List[int], response) -> None:
+        """Place embeddings from a response for texts[missing] into embeddings and cache them."""
+        fresh_texts = []
+        fresh_embeddings = []
+        for item in response.data:
+            position = missing[item.index]
+            embedding = decode_embedding(item.embedding)
+            embeddings[position] = embedding
+            fresh_texts.append(texts[position])
+            fresh_embeddings.append(embedding)
+        
+        if self.embedding_cache is not None and fresh_texts:
+            self.embedding_cache.put_many(fresh_texts, fresh_embeddings)
+
+    def generate_embeddings(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Generate embeddings for several texts in a single API call, in input order.
+        
+        Cached texts are not sent. Items missing from the response stay None.
+        """
+        embeddings = self._cached_embeddings(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if not missing:
+            return embeddings
         
-        vectors = []
+        missing_texts = [texts[i] for i in missing]
+        response = self.rate_limiter.call(
+            lambda: self.openai_client.embeddings.with_raw_response.create(
+                model="text-embedding-3-large",
+                input=missing_texts,
+                dimensions=self.dimension,
+                encoding_format="base64"
+            ),
+            tokens=sum(estimate_tokens(text) for text in missing_texts)
+        )
+        self._fill_embeddings(texts, embeddings, missing, response)
+        return embeddings
+
+    def batch_paragraphs(self, paragraphs: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """Group paragraphs into embedding batches bounded by item count and token budget."""
+        batch = []
+        batch_tokens = 0
         
         for paragraph in paragraphs:
-            try:
-                # Generate embedding
-                embedding = self.generate_embedding(paragraph["text"])
-                
-                # Create vector for Pinecone
-                vector = {
-                    "id": paragraph["document_id"],
-                    "values": embedding,
-                    "metadata": {
-                        "text": paragraph["text"],
-                        "source_file": paragraph["source_file"],
-                        "paragraph_id": paragraph["paragraph_id"],
-                        "author": paragraph["author"]
-                    }
-                }
-                vectors.append(vector)
+            tokens = estimate_tokens(paragraph["text"])
+            if batch and (len(batch) >= self.embedding_batch_size
+                          or batch_tokens + tokens > self.embedding_batch_max_tokens):
+                yield batch
+                batch = []
+                batch_tokens = 0
+            batch.append(paragraph)
+            batch_tokens += tokens
+        
+        if batch:
+            yield batch
+
+    def embed_batch(self, batch: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], np.ndarray]]:
+        """Embed one batch of paragraphs, returning (paragraph, embedding) pairs in order.
+        
+        If the batch request fails, or comes back without some of its items, only the
+        affected paragraphs are retried one at a time. Paragraphs that still fail are
+        logged and skipped.
+        """
+        try:
+            embeddings = self.generate_embeddings([p["text"] for p in batch])
+        except Exception as e:
+            logger.warning(f"Embedding batch of {len(batch)} paragraphs failed, retrying individually: {e}")
+            embeddings = [None] * len(batch)
+        
+        pairs = []
+        for paragraph, embedding in zip(batch, embeddings):
+            if embedding is None:
+                try:
+                    embedding = self.generate_embedding(paragraph["text"])
+                except Exception as e:
+                    logger.error(f"Error processing paragraph {paragraph['paragraph_id']}: {e}")
+                    continue
+            pairs.append((paragraph, embedding))
+        
+        logger.info(f"Embedded batch of {len(batch)} paragraphs")
+        return pairs
+
+    def to_vector(self, paragraph: Dict[str, Any], embedding: np.ndarray) -> Dict[str, Any]:
+        """Build the Pinecone vector record for an embedded paragraph."""
+        metadata = {
+            "source_file": paragraph["source_file"],
+            "paragraph_id": paragraph["paragraph_id"],
+            "author": paragraph["author"]
+        }
+        if self.documents is None:
+            metadata["text"] = paragraph["text"]
+        return {
+            "id": paragraph["document_id"],
+            "values": embedding,
+            "metadata": metadata
+        }
+
+    def to_vectors(self, pairs: List[Tuple[Dict[str, Any], np.ndarray]]) -> List[Dict[str, Any]]:
+        """Build vector records for (paragraph, embedding) pairs, first saving their text to the document store."""
+        if self.documents is not None and pairs:
+            self.documents.put_many([paragraph for paragraph, _ in pairs])
+        return [self.to_vector(paragraph, embedding) for paragraph, embedding in pairs]
+
+    def chunk_hash(self, paragraph: Dict[str, Any]) -> str:
+        """Hash of everything that determines a chunk's stored vector and metadata."""
+        content = {
+            "model": "text-embedding-3-large",
+            "dimension": self.dimension,
+            "text": paragraph["text"],
+            "source_file": paragraph["source_file"],
+            "paragraph_id": paragraph["paragraph_id"],
+            "author": paragraph["author"]
+        }
+        if self.documents is not None:
+            # Moving text between metadata and the document store changes the stored vector
+            content["text_in_document_store"] = True
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def resume_from_checkpoint(self, paragraphs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], np.ndarray]], List[str]]:
+        """Split paragraphs by the progress recorded in the checkpoint.
+        
+        Returns the paragraphs that still need embedding, (paragraph, embedding) pairs that
+        were embedded but not yet upserted, and the document_ids that are already upserted. Entries whose
+        content hash no longer matches the paragraph are ignored.
+        """
+        if self.checkpoint is None or not paragraphs:
+            return list(paragraphs), [], []
+        
+        states = {}
+        for source_file in {paragraph["source_file"] for paragraph in paragraphs}:
+            for document_id, state in self.checkpoint.load(source_file).items():
+                states[(source_file, document_id)] = state
+        
+        to_embed, ready_pairs, upserted_ids = [], [], []
+        for paragraph in paragraphs:
+            state = states.get((paragraph["source_file"], paragraph["document_id"]))
+            if state is None or state.chunk_hash != self.chunk_hash(paragraph):
+                to_embed.append(paragraph)
+            elif state.upserted:
+                upserted_ids.append(paragraph["document_id"])
+            elif state.embedding is not None:
+                ready_pairs.append((paragraph, state.embedding))
+            else:
+                to_embed.append(paragraph)
+        
+        return to_embed, ready_pairs, upserted_ids
+
+    def checkpoint_embedded(self, pairs: List[Tuple[Dict[str, Any], np.ndarray]]):
+        """Log freshly embedded paragraphs, with their embeddings, to the checkpoint."""
+        if self.checkpoint is None:
+            return
+        
+        by_source: Dict[str, List[Tuple[str, str, np.ndarray]]] = {}
+        for paragraph, embedding in pairs:
+            by_source.setdefault(paragraph["source_file"], []).append(
+                (paragraph["document_id"], self.chunk_hash(paragraph), embedding)
+            )
+        for source_file, chunks in by_source.items():
+            self.checkpoint.record_embedded(source_file, chunks)
+
+    def finish_checkpoint(self, source_file: str):
+        """Drop checkpointed progress for a document that is fully ingested."""
+        if self.checkpoint is not None:
+            self.checkpoint.clear_document(source_file)
+
+    def record_upserted(self, batch: List[PendingVector]):
+        """Log an upserted request batch to the checkpoint. Called from upsert worker threads."""
+        if self.checkpoint is None:
+            return
+        
+        by_source: Dict[str, List[str]] = {}
+        for vector_id, _, metadata in batch:
+            by_source.setdefault(metadata["source_file"], []).append(vector_id)
+        for source_file, document_ids in by_source.items():
+            self.checkpoint.record_upserted(source_file, document_ids)
+
+    def upsert_vectors(self, vectors: List[Dict[str, Any]]) -> List[str]:
+        """Upsert vectors to the backend and wait for them, returning the stored IDs."""
+        return self.backend.upsert([(vector["id"], vector["values"], vector["metadata"]) for vector in vectors])
+
+    def ingest_paragraphs(self, paragraphs: List[Dict[str, Any]]) -> List[str]:
+        """Generate embeddings and store paragraphs in the vector backend.
+        
+        Vectors are streamed to the backend as each embedding batch arrives; for Pinecone
+        they are sent in payload-sized requests, so peak memory does not depend on document size.
+        With a checkpoint attached, batches are logged when embedded and again when
+        upserted, so an interrupted run resumes from the last committed batch without
+        repeating any API calls. Returns the document_ids that were successfully stored.
+        """
+        logger.info(f"Generating embeddings for {len(paragraphs)} paragraphs...")
+        
+        to_embed, resumed_pairs, ingested_ids = self.resume_from_checkpoint(paragraphs)
+        if resumed_pairs or ingested_ids:
+            logger.info(f"Resuming from checkpoint: {len(ingested_ids)} paragraphs already upserted, "
+                        f"{len(resumed_pairs)} already embedded")
+        
+        try:
+            for vector in self.to_vectors(resumed_pairs):
+                self.backend.submit(vector["id"], vector["values"], vector["metadata"])
+            
+            for batch in self.batch_paragraphs(to_embed):
+                pairs = self.embed_batch(batch)
+                self.checkpoint_embedded(pairs)
+                for vector in self.to_vectors(pairs):
+                    self.backend.submit(vector["id"], vector["values"], vector["metadata"])
+            
+            ingested_ids += self.backend.flush()
+        except Exception:
+            self.backend.discard()
+            raise
+        
+        if ingested_ids:
+            logger.info(f"Successfully ingested {len(ingested_ids)} paragraphs")
+            logger.info(f"Upserts so far: {self.backend.stats.summary()}")
+        
+        return ingested_ids
+
+    async def agenerate_embeddings(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Async counterpart of generate_embeddings."""
+        embeddings = self._cached_embeddings(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if not missing:
+            return embeddings
+        
+        missing_texts = [texts[i] for i in missing]
+        response = await self.rate_limiter.call_async(
+            lambda: self.async_openai_client.embeddings.with_raw_response.create(
+                model="text-embedding-3-large",
+                input=missing_texts,
+                dimensions=self.dimension,
+                encoding_format="base64"
+            ),
+            tokens=sum(estimate_tokens(text) for text in missing_texts)
+        )
+        self._fill_embeddings(texts, embeddings, missing, response)
+        return embeddings
+
+    async def aembed_batch(self, batch: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], np.ndarray]]:
+        """Embed one batch asynchronously, retrying failed items individually."""
+        try:
+            embeddings = await self.agenerate_embeddings([p["text"] for p in batch])
+        except Exception as e:
+            logger.warning(f"Embedding batch of {len(batch)} paragraphs failed, retrying individually: {e}")
+            embeddings = [None] * len(batch)
+        
+        pairs = []
+        for paragraph, embedding in zip(batch, embeddings):
+            if embedding is None:
+                try:
+                    embedding = (await self.agenerate_embeddings([paragraph["text"]]))[0]
+                except Exception as e:
+                    logger.error(f"Error processing paragraph {paragraph['paragraph_id']}: {e}")
+                    continue
+            if embedding is not None:
+                pairs.append((paragraph, embedding))
+        return pairs
+
+    async def ingest_documents_async(self, file_paths: List[str], max_concurrent_embeddings: int = 4,
+                                     max_concurrent_upserts: int = 4, queue_size: int = 16):
+        """Ingest documents through a concurrent parse -> embed -> upsert pipeline.
+        
+        Each stage runs as its own set of tasks joined by bounded queues, so parsing the
+        next document overlaps with embedding and upserting the previous ones. At most
+        max_concurrent_embeddings embedding requests are in flight, and at most
+        max_concurrent_upserts embedding batches are being upserted, their requests
+        sharing the upserter's thread pool. A document is moved to corpus_indexed once
+        all of its batches have been upserted.
+        """
+        start_time = time.monotonic()
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        pending_batches: Dict[str, int] = {}
+        failed_documents = set()
+        totals = {"documents": 0, "vectors": 0}
+        # Saves snapshot the manifest here on the loop, in order, while upserts keep updating it
+        manifest_lock = asyncio.Lock()
+
+        async def finish_batch(file_path: str):
+            pending_batches[file_path] -= 1
+            if pending_batches[file_path] > 0:
+                return
+            if file_path in failed_documents:
+                logger.error(f"Not moving {file_path}: some batches failed to upsert")
+                return
+            if self.manifest is not None:
+                async with manifest_lock:
+                    documents = self.manifest.snapshot()
+                    await asyncio.to_thread(self.manifest.save, documents)
+            await asyncio.to_thread(self.move_document_to_indexed, file_path)
+            await asyncio.to_thread(self.finish_checkpoint, Path(file_path).name)
+            totals["documents"] += 1
+            logger.info(f"Completed ingestion of {file_path}")
+
+        async def parse_stage():
+            # Documents are parsed on the process pool and enter the pipeline as they finish
+            documents = self.parse_documents(file_paths)
+            while (parsed := await asyncio.to_thread(next, documents, None)) is not None:
+                file_path, paragraphs, error = parsed
+                if error is not None:
+                    logger.error(f"Failed to ingest {file_path}: {error}")
+                    continue
                 
-                logger.info(f"Processed paragraph {paragraph['paragraph_id']}")
+                to_embed, resumed_pairs, upserted_ids = self.resume_from_checkpoint(paragraphs)
+                if self.manifest is not None and upserted_ids:
+                    done = set(upserted_ids)
+                    self.manifest.update(Path(file_path).name, {
+                        paragraph["document_id"]: self.chunk_hash(paragraph)
+                        for paragraph in paragraphs if paragraph["document_id"] in done
+                    })
                 
-            except Exception as e:
-                logger.error(f"Error processing paragraph {paragraph['paragraph_id']}: {e}")
-                continue
-        
-        # Upsert to Pinecone index
-        if vectors:
-            # Pinecone has a limit on batch size, so we'll process in chunks
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
-                logger.info(f"Upserted batch {i//batch_size + 1} of {(len(vectors) + batch_size - 1)//batch_size}")
+                batches = list(self.batch_paragraphs(to_embed))
+                pending_batches[file_path] = len(batches) + (1 if resumed_pairs else 0)
+                if pending_batches[file_path] == 0:
+                    pending_batches[file_path] = 1
+                    await finish_batch(file_path)
+                if resumed_pairs:
+                    await upsert_queue.put((file_path, resumed_pairs))
+                for batch in batches:
+                    await embed_queue.put((file_path, batch))
             
-            logger.info(f"Successfully ingested {len(vectors)} paragraphs into Pinecone")
+            for _ in range(max_concurrent_embeddings):
+                await embed_queue.put(None)
+
+        async def embed_worker():
+            while (item := await embed_queue.get()) is not None:
+                file_path, batch = item
+                pairs = await self.aembed_batch(batch)
+                await asyncio.to_thread(self.checkpoint_embedded, pairs)
+                logger.info(f"Embedded {len(pairs)} paragraphs from {Path(file_path).name}")
+                await upsert_queue.put((file_path, pairs))
+
+        async def upsert_worker():
+            while (item := await upsert_queue.get()) is not None:
+                file_path, pairs = item
+                try:
+                    vectors = await asyncio.to_thread(self.to_vectors, pairs)
+                    await asyncio.to_thread(self.upsert_vectors, vectors)
+                    totals["vectors"] += len(vectors)
+                    if self.manifest is not None:
+                        self.manifest.update(Path(file_path).name, {
+                            paragraph["document_id"]: self.chunk_hash(paragraph) for paragraph, _ in pairs
+                        })
+                except Exception as e:
+                    logger.error(f"Error upserting batch from {file_path}: {e}")
+                    failed_documents.add(file_path)
+                await finish_batch(file_path)
+
+        async def run_embed_stage():
+            await asyncio.gather(*(embed_worker() for _ in range(max_concurrent_embeddings)))
+            for _ in range(max_concurrent_upserts):
+                await upsert_queue.put(None)
+
+        await asyncio.gather(
+            parse_stage(),
+            run_embed_stage(),
+            *(upsert_worker() for _ in range(max_concurrent_upserts))
+        )
+        
+        elapsed = time.monotonic() - start_time
+        logger.info(f"Pipeline ingested {totals['vectors']} paragraphs from {totals['documents']} documents "
+                    f"in {elapsed:.1f}s")
+        logger.info(f"Upserts: {self.backend.stats.summary()}")
+
+    def ingest_documents_pipelined(self, file_paths: List[str], **kwargs):
+        """Run the async ingestion pipeline to completion."""
+        asyncio.run(self.ingest_documents_async(file_paths, **kwargs))
 
     def move_document_to_indexed(self, file_path: str):
         """Move document from corpus to corpus_indexed folder after successful ingestion."""
@@ -236,56 +543,304 @@ class BahaiWritingsIngestor:
             logger.error(f"Failed to move {source_path.name}: {e}")
             raise
 
-    def ingest_document(self, file_path: str):
-        """Complete ingestion pipeline for a single document."""
+    def ingest_document(self, file_path: str, paragraphs: Optional[List[Dict[str, Any]]] = None):
+        """Complete ingestion pipeline for a single document, optionally already parsed."""
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Document not found: {file_path}")
         
         # Extract paragraphs
-        paragraphs = self.extract_paragraphs_from_docx(file_path)
+        if paragraphs is None:
+            paragraphs = self.extract_paragraphs_from_docx(file_path)
+        
+        # Ingest into Pinecone
+        ingested_ids = set(self.ingest_paragraphs(paragraphs))
         
-        # Ingest into ChromaDB
-        self.ingest_paragraphs(paragraphs)
+        if self.manifest is not None:
+            self.manifest.set(Path(file_path).name, {
+                paragraph["document_id"]: self.chunk_hash(paragraph)
+                for paragraph in paragraphs if paragraph["document_id"] in ingested_ids
+            })
+            self.manifest.save()
         
         # Move document to indexed folder after successful ingestion
         self.move_document_to_indexed(file_path)
+        self.finish_checkpoint(Path(file_path).name)
         
         logger.info(f"Completed ingestion of {file_path}")
 
+    def ingest_document_incremental(self, file_path: str, paragraphs: Optional[List[Dict[str, Any]]] = None):
+        """Bring the index up to date with a document, touching only chunks that changed.
+        
+        New and changed chunks are upserted first and vectors for chunks that no longer
+        exist are deleted afterwards, so the document stays searchable throughout.
+        """
+        if self.manifest is None:
+            raise ValueError("Incremental ingestion requires a manifest")
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Document not found: {file_path}")
+        
+        source_file = Path(file_path).name
+        if paragraphs is None:
+            paragraphs = self.extract_paragraphs_from_docx(file_path)
+        previous = self.manifest.get(source_file)
+        current = {paragraph["document_id"]: self.chunk_hash(paragraph) for paragraph in paragraphs}
+        
+        changed = [paragraph for paragraph in paragraphs
+                   if previous.get(paragraph["document_id"]) != current[paragraph["document_id"]]]
+        ingested_ids = set(self.ingest_paragraphs(changed)) if changed else set()
+        
+        stale_ids = [document_id for document_id in previous if document_id not in current]
+        self.delete_vectors(stale_ids)
+        
+        # Chunks that failed to re-ingest keep their old hash so the next run retries them
+        hashes = {}
+        for document_id, chunk_hash in current.items():
+            if document_id in ingested_ids or previous.get(document_id) == chunk_hash:
+                hashes[document_id] = chunk_hash
+            elif document_id in previous:
+                hashes[document_id] = previous[document_id]
+        self.manifest.set(source_file, hashes)
+        self.manifest.save()
+        
+        if Path(file_path).parent.resolve() != Path("./corpus_indexed").resolve():
+            self.move_document_to_indexed(file_path)
+        self.finish_checkpoint(source_file)
+        
+        logger.info(f"Incremental update of {source_file}: {len(ingested_ids)} upserted, "
+                    f"{len(paragraphs) - len(changed)} unchanged, {len(stale_ids)} deleted")
+
+    def remove_missing_documents(self, present_source_files: List[str]):
+        """Delete vectors of documents that are in the manifest but no longer in the corpus."""
+        if self.manifest is None:
+            raise ValueError("Removing documents requires a manifest")
+        
+        present = set(present_source_files)
+        for source_file in self.manifest.source_files():
+            if source_file in present:
+                continue
+            document_ids = list(self.manifest.get(source_file))
+            self.delete_vectors(document_ids)
+            self.manifest.remove(source_file)
+            self.manifest.save()
+            logger.info(f"Removed {len(document_ids)} vectors of deleted document {source_file}")
+
+    def delete_vectors(self, document_ids: List[str]):
+        """Delete vectors by ID from the backend, and their text from the document store."""
+        if document_ids:
+            self.backend.delete(document_ids)
+            if self.documents is not None:
+                self.documents.delete(document_ids)
+
     def clear_index(self):
         """Clear all vectors from the existing index."""
         try:
             logger.info(f"Clearing all vectors from index '{self.index_name}'...")
-            self.index.delete(delete_all=True)
+            self.backend.delete_all()
+            if self.documents is not None:
+                self.documents.clear()
+            if self.manifest is not None:
+                self.manifest.clear()
+                self.manifest.save()
+            if self.checkpoint is not None:
+                self.checkpoint.clear()
             logger.info("Index cleared successfully")
         except Exception as e:
             logger.error(f"Error clearing index: {e}")
             raise
 
+    def build_bm25_index(self, path: str):
+        """Rebuild the BM25 keyword index at path over every paragraph in the document store."""
+        if self.documents is None:
+            logger.warning("Skipping the BM25 index: paragraph text is not in a document store")
+            return
+        start = time.perf_counter()
+        write_bm25_index(path, (
+            (document["document_id"], document["text"], get_author_from_filename(document["source_file"]))
+            for document in self.documents.iter_documents()
+        ))
+        logger.info(f"Built BM25 index {path} ({os.path.getsize(path) / 1e6:.1f} MB) "
+                    f"in {time.perf_counter() - start:.1f}s")
+
     def get_index_stats(self):
         """Get statistics about the index."""
-        stats = self.index.describe_index_stats()
-        count = stats['total_vector_count']
+        count = self.backend.count()
         logger.info(f"Index '{self.index_name}' contains {count} vectors")
         return count
 
+def parse_args() -> argparse.Namespace:
+    """Parse command line options for the ingestion script."""
+    parser = argparse.ArgumentParser(description="Ingest .docx files from ./corpus into Pinecone")
+    parser.add_argument("--backend", choices=["pinecone", "local"], default="pinecone",
+                        help="Where to store vectors: the Pinecone index or a local exact-search index")
+    parser.add_argument("--dimensions", type=int, default=FULL_EMBEDDING_DIMENSIONS,
+                        help="Embedding size requested from text-embedding-3-large (e.g. 1024 or 256)")
+    parser.add_argument("--local-index-path", default=DEFAULT_LOCAL_INDEX_PATH,
+                        help="Vector file of the local index used with --backend local")
+    parser.add_argument("--local-index-dtype", choices=["float32", "float16"], default="float32",
+                        help="Precision of vectors saved in the local index file")
+    parser.add_argument("--ann", choices=["none", "hnsw", "ivfpq", "int8", "binary"], default="none",
+                        help="Approximate nearest-neighbor index to build next to the local index file")
+    parser.add_argument("--hnsw-m", type=int, default=16,
+                        help="Neighbors linked per node in the HNSW graph")
+    parser.add_argument("--hnsw-ef-construction", type=int, default=100,
+                        help="Beam width used while building the HNSW graph")
+    parser.add_argument("--ivf-lists", type=int, default=None,
+                        help="Inverted lists in the IVF-PQ index (default: about 4 * sqrt(vectors))")
+    parser.add_argument("--pq-subvectors", type=int, default=64,
+                        help="Bytes per vector in the IVF-PQ index; must divide the embedding dimension")
+    parser.add_argument("--document-store-path", default=DEFAULT_DOCUMENT_STORE_PATH,
+                        help="SQLite file holding paragraph text, which the app reads to display results")
+    parser.add_argument("--text-in-metadata", action="store_true",
+                        help="Store paragraph text in vector metadata instead of the document store")
+    parser.add_argument("--bm25-index-path", default=DEFAULT_BM25_INDEX_PATH,
+                        help="BM25 keyword index rebuilt from the document store after ingesting")
+    parser.add_argument("--no-bm25", action="store_true",
+                        help="Do not rebuild the BM25 keyword index")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Use the concurrent async pipeline instead of one document at a time")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Update the index in place from ./corpus and ./corpus_indexed instead of rebuilding it")
+    parser.add_argument("--manifest-path", default=DEFAULT_MANIFEST_PATH,
+                        help="JSON manifest of indexed chunks and their content hashes")
+    parser.add_argument("--checkpoint-path", default=DEFAULT_CHECKPOINT_PATH,
+                        help="SQLite log of per-batch progress used to resume interrupted runs")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="Processes parsing .docx files in parallel (default: one per core)")
+    parser.add_argument("--max-concurrent-embeddings", type=int, default=4,
+                        help="Embedding requests in flight at once in pipeline mode")
+    parser.add_argument("--max-concurrent-upserts", type=int, default=4,
+                        help="Embedding batches being upserted at once in pipeline mode; their requests "
+                             "share the --upsert-parallelism limit")
+    parser.add_argument("--upsert-parallelism", type=int, default=4,
+                        help="Pinecone upsert requests in flight at once")
+    parser.add_argument("--requests-per-minute", type=float, default=3000,
+                        help="OpenAI embedding request rate limit")
+    parser.add_argument("--tokens-per-minute", type=float, default=1_000_000,
+                        help="OpenAI embedding token rate limit")
+    parser.add_argument("--embedding-cache-path", default=DEFAULT_CACHE_PATH,
+                        help="SQLite file caching embeddings between runs")
+    parser.add_argument("--no-embedding-cache", action="store_true",
+                        help="Always request fresh embeddings")
+    parser.add_argument("--evaluate-dimensions", type=int, nargs="+", metavar="SIZE",
+                        help="Instead of ingesting, compare search at these embedding sizes with the "
+                             "full-size local index over the queries in --query-log")
+    parser.add_argument("--query-log", default=DEFAULT_QUERY_LOG_PATH,
+                        help="JSON-lines log of searched texts written by the app (QUERY_LOG_PATH)")
+    parser.add_argument("--evaluate-top-k", type=int, default=10,
+                        help="Results per query compared by --evaluate-dimensions")
+    args = parser.parse_args()
+    if args.evaluate_dimensions and args.backend != "local":
+        parser.error("--evaluate-dimensions reads the vectors of a full-size local index; use --backend local")
+    if args.incremental and args.pipeline:
+        parser.error("--incremental processes documents one at a time and cannot be combined with --pipeline")
+    return args
+
+def report_stats(ingestor: BahaiWritingsIngestor):
+    """Log final index, upsert and embedding cache statistics."""
+    ingestor.get_index_stats()
+    logger.info(f"Upserts: {ingestor.backend.stats.summary()}")
+    if ingestor.embedding_cache is not None:
+        cache = ingestor.embedding_cache
+        logger.info(f"Embedding cache: {cache.hits} hits, {cache.misses} misses")
+
+def run_dimension_evaluation(ingestor: BahaiWritingsIngestor, query_log: str, dimensions: List[int], top_k: int):
+    """Log recall, storage and latency of reduced embedding sizes against the full-size local index."""
+    if not os.path.exists(query_log):
+        logger.error(f"No query log at {query_log}; set QUERY_LOG_PATH for the app to record searches")
+        return
+    queries = read_query_log(query_log)
+    if not queries or not ingestor.backend.count():
+        logger.error(f"Dimension evaluation needs logged queries in {query_log} and a non-empty local index")
+        return
+    
+    embeddings = []
+    for batch in ingestor.batch_paragraphs([{"text": query} for query in queries]):
+        embeddings.extend(ingestor.generate_embeddings([item["text"] for item in batch]))
+    embedded = [embedding for embedding in embeddings if embedding is not None]
+    logger.info(f"Evaluating embedding sizes {dimensions} on {len(embedded)} logged queries "
+                f"against {ingestor.backend.count()} vectors of size {ingestor.dimension}")
+    rows = evaluate_dimensions(ingestor.backend, np.stack(embedded), dimensions, top_k)
+    logger.info("Embedding size evaluation:\n" + format_report(rows, top_k))
+
 def main():
     """Main ingestion function."""
+    args = parse_args()
+    
     # Check for required environment variables
     openai_api_key = st.secrets["OPENAI_API_KEY"]
-    pinecone_api_key = st.secrets["PINECONE_API_KEY"]
+    pinecone_api_key = st.secrets["PINECONE_API_KEY"] if args.backend == "pinecone" else None
     
     if not openai_api_key:
         raise ValueError("OPENAI_API_KEY is required in streamlit secrets")
-    if not pinecone_api_key:
+    if args.backend == "pinecone" and not pinecone_api_key:
         raise ValueError("PINECONE_API_KEY is required in streamlit secrets")
     
     # Initialize ingestor
-    ingestor = BahaiWritingsIngestor(openai_api_key, pinecone_api_key)
+    rate_limiter = RateLimiter(args.requests_per_minute, args.tokens_per_minute)
+    embedding_cache = None if args.no_embedding_cache else EmbeddingCache(args.embedding_cache_path,
+                                                                          dimensions=args.dimensions)
+    if args.evaluate_dimensions:
+        # Memory-mapped and read-only; the ingestor is only used to embed the logged queries
+        backend = LocalVectorStore(dimension=args.dimensions, path=args.local_index_path, mmap=True)
+        ingestor = BahaiWritingsIngestor(openai_api_key, pinecone_api_key, rate_limiter, embedding_cache,
+                                         backend=backend, dimensions=args.dimensions)
+        run_dimension_evaluation(ingestor, args.query_log, args.evaluate_dimensions, args.evaluate_top_k)
+        return
+    
+    backend = None
+    if args.backend == "local":
+        ann = None
+        if args.ann == "hnsw":
+            ann = HNSWIndex(M=args.hnsw_m, ef_construction=args.hnsw_ef_construction)
+        elif args.ann == "ivfpq":
+            ann = IVFPQIndex(nlist=args.ivf_lists, m=args.pq_subvectors)
+        elif args.ann == "int8":
+            ann = Int8Index()
+        elif args.ann == "binary":
+            ann = BinaryIndex()
+        backend = LocalVectorStore(dimension=args.dimensions, path=args.local_index_path,
+                                   storage_dtype=args.local_index_dtype, ann=ann)
+    documents = None if args.text_in_metadata else DocumentStore(args.document_store_path)
+    ingestor = BahaiWritingsIngestor(openai_api_key, pinecone_api_key, rate_limiter, embedding_cache,
+                                     upsert_parallelism=args.upsert_parallelism, backend=backend,
+                                     dimensions=args.dimensions, documents=documents)
+    
+    ingestor.parse_workers = args.parse_workers
+    ingestor.manifest = IngestManifest(args.manifest_path)
+    ingestor.checkpoint = IngestCheckpoint(args.checkpoint_path)
+    interrupted = ingestor.checkpoint.pending_documents()
+    
+    if args.incremental:
+        # Every known document is re-parsed; only changed chunks are re-embedded or upserted
+        docx_files = {}
+        for directory in ("./corpus_indexed", "./corpus"):
+            for docx_file in Path(directory).glob("*.docx"):
+                docx_files[docx_file.name] = docx_file
+        
+        for docx_file, paragraphs, error in ingestor.parse_documents([str(path) for path in docx_files.values()]):
+            try:
+                if error is not None:
+                    raise error
+                ingestor.ingest_document_incremental(docx_file, paragraphs)
+            except Exception as e:
+                logger.error(f"Failed to update {docx_file}: {e}")
+        ingestor.remove_missing_documents(list(docx_files))
+        
+        ingestor.backend.close()
+        if not args.no_bm25:
+            ingestor.build_bm25_index(args.bm25_index_path)
+        if documents is not None:
+            # Folds the write-ahead log into the database file, so that one file can be deployed
+            documents.close()
+        report_stats(ingestor)
+        return
     
     # Check if index has existing data
     stats = ingestor.get_index_stats()
-    if stats > 0:
+    if interrupted:
+        # Clearing now would throw away the interrupted run's progress
+        logger.info(f"Resuming interrupted ingestion of {len(interrupted)} documents: {', '.join(interrupted)}")
+    elif stats > 0:
         logger.info(f"Found {stats} existing vectors in the database.")
         
         # Ask for user confirmation before clearing
@@ -307,14 +862,27 @@ def main():
         logger.warning("No .docx files found in current directory")
         return
     
-    for docx_file in docx_files:
-        try:
-            ingestor.ingest_document(str(docx_file))
-        except Exception as e:
-            logger.error(f"Failed to ingest {docx_file}: {e}")
+    if args.pipeline:
+        ingestor.ingest_documents_pipelined(
+            [str(docx_file) for docx_file in docx_files],
+            max_concurrent_embeddings=args.max_concurrent_embeddings,
+            max_concurrent_upserts=args.max_concurrent_upserts
+        )
+    else:
+        for docx_file, paragraphs, error in ingestor.parse_documents([str(path) for path in docx_files]):
+            try:
+                if error is not None:
+                    raise error
+                ingestor.ingest_document(docx_file, paragraphs)
+            except Exception as e:
+                logger.error(f"Failed to ingest {docx_file}: {e}")
     
-    # Print final statistics
-    ingestor.get_index_stats()
+    ingestor.backend.close()
+    if not args.no_bm25:
+        ingestor.build_bm25_index(args.bm25_index_path)
+    if documents is not None:
+        documents.close()
+    report_stats(ingestor)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+Inverted-file index with product quantization (IVF-PQ) for the local index.
+
+A coarse k-means quantizer splits the vectors into nlist inverted lists. Within a
+list, each vector's residual from its list centroid is compressed by product
+quantization: the dimensions are cut into m sub-vectors and each is replaced by the
+one-byte index of its nearest of 256 sub-centroids, so a vector costs m bytes (64
+by default) instead of 4 bytes per dimension. A query scores the nprobe closest
+lists from the codes with one lookup table, then reranks the best `rerank`
+candidates exactly against the full-precision vectors, which are read from the
+memory-mapped vector file and so only paged in for those rows.
+"""
+
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BWIVFPQ\x00"
+FORMAT_VERSION = 1
+
+# magic, version, dimension, nlist, m, sub-centroids per sub-vector, count, vector fingerprint
+_HEADER = struct.Struct("<8sIIIIIxxxxQQ")
+
+# Rows assigned or encoded at a time, bounding the temporary score matrices
+_CHUNK_ROWS = 8192
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid (by L2 distance) for each row of data."""
+    half_norms = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    assignments = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), _CHUNK_ROWS):
+        block = np.asarray(data[start:start + _CHUNK_ROWS], dtype=np.float32)
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T - half_norms, axis=1)
+    return assignments
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Lloyd's k-means; empty clusters are reseeded from random rows."""
+    rng = rng or np.random.default_rng(0)
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignments = _nearest(data, centroids)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.zeros_like(centroids)
+        # Sum each cluster a block at a time so the data is never copied whole
+        for start in range(0, len(data), _CHUNK_ROWS):
+            block_assignments = assignments[start:start + _CHUNK_ROWS]
+            order = np.argsort(block_assignments, kind="stable")
+            clusters, starts = np.unique(block_assignments[order], return_index=True)
+            sums[clusters] += np.add.reduceat(data[start:start + _CHUNK_ROWS][order], starts, axis=0)
+        present = np.flatnonzero(counts)
+        centroids[present] = sums[present] / counts[present, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    return centroids
+
+
+class IVFPQIndex:
+    # Suffix of the index file saved next to the vector file
+    SUFFIX = ".ivfpq"
+
+    def __init__(self, nlist: Optional[int] = None, m: int = 64, nprobe: int = 128, rerank: int = 300,
+                 max_train: int = 20_000, seed: int = 0):
+        """Create an untrained index.
+
+        nlist defaults to about 4 * sqrt(N) lists when the index is trained. m must divide
+        the vector dimension. nprobe lists are scanned per query and the best rerank
+        candidates are rescored exactly.
+        """
+        self.nlist = nlist
+        # nlist as requested, so a rebuild picks its own default for the new corpus size
+        self._requested_nlist = nlist
+        self.m = m
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.max_train = max_train
+        self.seed = seed
+        # Fingerprint of the vectors the index was built over (see LocalVectorStore)
+        self.fingerprint = 0
+        self.count = 0
+
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None
+        # Entries sorted by list: list l holds entries list_offsets[l]:list_offsets[l + 1]
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.rows = np.zeros(0, dtype=np.int32)
+        self.codes = np.zeros((0, m), dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def empty_copy(self) -> "IVFPQIndex":
+        """A new, untrained index with the same parameters."""
+        return IVFPQIndex(nlist=self._requested_nlist, m=self.m, nprobe=self.nprobe, rerank=self.rerank,
+                          max_train=self.max_train, seed=self.seed)
+
+    def copy_search_params(self, other: "IVFPQIndex"):
+        """Search with other's query-time settings."""
+        self.nprobe = other.nprobe
+        self.rerank = other.rerank
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the index itself (the full-precision vectors are not counted)."""
+        arrays = [self.centroids, self.codebooks, self.list_offsets, self.rows, self.codes]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def train(self, vectors: np.ndarray):
+        """Fit the coarse quantizer and the product quantizer on a sample of vectors."""
+        count, dimension = vectors.shape
+        if dimension % self.m:
+            raise ValueError(f"m={self.m} sub-vectors do not divide dimension {dimension}")
+        rng = np.random.default_rng(self.seed)
+        sample_rows = np.sort(rng.choice(count, min(count, self.max_train), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+
+        nlist = self._requested_nlist or max(1, int(4 * np.sqrt(count)))
+        nlist = min(nlist, len(sample))
+        logger.info(f"IVF-PQ: training {nlist} lists and {self.m} sub-quantizers on {len(sample)} vectors")
+        self.centroids = kmeans(sample, nlist, rng=rng)
+        self.nlist = nlist
+
+        residuals = sample - self.centroids[_nearest(sample, self.centroids)]
+        sub_dimension = dimension // self.m
+        sub_centroids = min(256, len(sample))
+        self.codebooks = np.stack([
+            kmeans(np.ascontiguousarray(residuals[:, j * sub_dimension:(j + 1) * sub_dimension]), sub_centroids,
+                   iterations=15, rng=rng)
+            for j in range(self.m)
+        ])
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(list assignments, PQ codes) for rows of vectors."""
+        assignments = _nearest(vectors, self.centroids)
+        sub_dimension = self.codebooks.shape[2]
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for start in range(0, len(vectors), _CHUNK_ROWS):
+            block = np.asarray(vectors[start:start + _CHUNK_ROWS], dtype=np.float32)
+            residuals = block - self.centroids[assignments[start:start + len(block)]]
+            for j in range(self.m):
+                codes[start:start + len(block), j] = _nearest(
+                    residuals[:, j * sub_dimension:(j + 1) * sub_dimension], self.codebooks[j]
+                )
+        return assignments, codes
+
+    def add(self, vectors: np.ndarray):
+        """Encode rows count..len(vectors) - 1 of vectors, which must extend the rows already indexed.
+
+        The quantizers are trained on the first call and kept for later additions.
+        """
+        total = len(vectors)
+        if total <= self.count:
+            return
+        if self.centroids is None:
+            self.train(vectors)
+
+        new_lists, new_codes = self._encode(vectors[self.count:])
+        old_lists = np.repeat(np.arange(self.nlist, dtype=np.int32), np.diff(self.list_offsets)) \
+            if self.count else np.zeros(0, dtype=np.int32)
+        lists = np.concatenate([old_lists, new_lists])
+        rows = np.concatenate([np.asarray(self.rows), np.arange(self.count, total, dtype=np.int32)])
+        codes = np.concatenate([np.asarray(self.codes), new_codes])
+
+        order = np.argsort(lists, kind="stable")
+        self.rows = rows[order]
+        self.codes = codes[order]
+        self.list_offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        self.list_offsets[1:] = np.cumsum(np.bincount(lists, minlength=self.nlist))
+        self.count = total
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top_k rows for a normalized query, as (rows, exact similarities) best first."""
+        if not self.count or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        coarse = self.centroids @ query
+        nprobe = min(self.nprobe, self.nlist)
+        probed = np.argpartition(-coarse, nprobe - 1)[:nprobe]
+        starts, ends = self.list_offsets[probed], self.list_offsets[probed + 1]
+        entries = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+        if not len(entries):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        # q . x ~= q . centroid + sum over sub-vectors of q_j . codebook_j[code_j]
+        lookup = np.einsum("jkd,jd->jk", self.codebooks, query.reshape(self.m, -1))
+        entry_coarse = np.repeat(coarse[probed], ends - starts)
+        approximate = entry_coarse + lookup[np.arange(self.m), self.codes[entries]].sum(axis=1)
+
+        candidates = min(max(self.rerank, top_k), len(entries))
+        best = np.argpartition(-approximate, candidates - 1)[:candidates]
+        rows = np.sort(self.rows[entries[best]]).astype(np.int64)
+        exact = vectors[rows] @ query
+        top = np.argsort(-exact, kind="stable")[:top_k]
+        return rows[top], exact[top].astype(np.float32)
+
+    def save(self, path: str):
+        """Write the index to path, replacing it atomically."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        dimension = self.centroids.shape[1]
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, dimension, self.nlist, self.m, self.codebooks.shape[1],
+                                 self.count, self.fingerprint))
+            f.write(self.centroids.astype("<f4").tobytes())
+            f.write(self.codebooks.astype("<f4").tobytes())
+            f.write(self.list_offsets.astype("<i8").tobytes())
+            f.write(np.asarray(self.rows, dtype="<i4").tobytes())
+            f.write(np.asarray(self.codes, dtype=np.uint8).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFPQIndex":
+        """Open a saved index, mapping its codes read-only."""
+        path = Path(path)
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an IVF-PQ index")
+        _, version, dimension, nlist, m, sub_centroids, count, fingerprint = _HEADER.unpack(header)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported IVF-PQ index version in {path}: {version}")
+
+        index = cls(nlist=nlist, m=m)
+        index.count, index.fingerprint = count, fingerprint
+
+        def section(offset: int, dtype, shape):
+            if int(np.prod(shape)) == 0:
+                return np.zeros(shape, dtype=dtype), offset
+            array = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+            return array, offset + array.nbytes
+
+        offset = _HEADER.size
+        index.centroids, offset = section(offset, "<f4", (nlist, dimension))
+        index.codebooks, offset = section(offset, "<f4", (m, sub_centroids, dimension // m))
+        index.list_offsets, offset = section(offset, "<i8", (nlist + 1,))
+        index.rows, offset = section(offset, "<i4", (count,))
+        index.codes, offset = section(offset, np.uint8, (count, m))
+        # The small quantizer tables are searched on every query, so keep them in memory
+        index.centroids = np.array(index.centroids)
+        index.codebooks = np.array(index.codebooks)
+        index.list_offsets = np.array(index.list_offsets)
+        return index
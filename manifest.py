@@ -0,0 +1,90 @@
+"""
+Ingestion manifest: which chunks of which documents are in the index, and with what content.
+
+The manifest maps each source file to {document_id: content hash}. Incremental
+ingestion compares a freshly parsed document against it to find chunks that are new,
+changed or gone, so only those touch the index.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MANIFEST_PATH = "./ingest_manifest.json"
+MANIFEST_VERSION = 1
+
+
+class IngestManifest:
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        """Load the manifest at path, starting empty if it does not exist."""
+        self.path = Path(path)
+        self.documents: Dict[str, Dict[str, str]] = {}
+        self._save_lock = threading.Lock()
+
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                raise ValueError(f"Unsupported manifest version in {self.path}: {data.get('version')}")
+            self.documents = data["documents"]
+            logger.info(f"Loaded manifest with {len(self.documents)} documents from {self.path}")
+
+    def source_files(self) -> List[str]:
+        """Source files that currently have chunks in the index."""
+        return list(self.documents)
+
+    def get(self, source_file: str) -> Dict[str, str]:
+        """Chunk hashes recorded for a source file, keyed by document_id."""
+        return dict(self.documents.get(source_file, {}))
+
+    def set(self, source_file: str, hashes: Dict[str, str]):
+        """Replace the recorded chunks of a source file."""
+        if hashes:
+            self.documents[source_file] = dict(hashes)
+        else:
+            self.documents.pop(source_file, None)
+
+    def update(self, source_file: str, hashes: Dict[str, str]):
+        """Record additional chunks for a source file."""
+        self.documents.setdefault(source_file, {}).update(hashes)
+
+    def remove(self, source_file: str):
+        """Forget a source file entirely."""
+        self.documents.pop(source_file, None)
+
+    def clear(self):
+        """Forget every document, e.g. after the index was emptied."""
+        self.documents = {}
+
+    def snapshot(self) -> Dict[str, Dict[str, str]]:
+        """A copy of the recorded chunks that later updates do not change."""
+        return {source_file: dict(hashes) for source_file, hashes in self.documents.items()}
+
+    def save(self, documents: Optional[Dict[str, Dict[str, str]]] = None):
+        """Write the manifest, or a snapshot of it, atomically so a crash never leaves it half written.
+
+        Pass a snapshot taken on the thread that updates the manifest when saving from
+        another thread. Saves are serialized and each writes its own temporary file.
+        """
+        if documents is None:
+            documents = self.snapshot()
+        with self._save_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.path.parent,
+                                             prefix=self.path.name + ".", suffix=".tmp", delete=False) as f:
+                try:
+                    json.dump({"version": MANIFEST_VERSION, "documents": documents}, f,
+                              ensure_ascii=False, sort_keys=True)
+                    f.flush()
+                    os.fsync(f.fileno())
+                except BaseException:
+                    f.close()
+                    os.unlink(f.name)
+                    raise
+            os.replace(f.name, self.path)
@@ -0,0 +1,209 @@
+"""
+Scalar (int8) and binary quantized copies of the local index for a compact first pass.
+
+Int8Index keeps one signed byte per dimension, scaled per dimension to the range the
+stored vectors span (4x smaller than float32). It saves memory, not time: NumPy has
+no integer matrix product faster than its float32 one, so the codes are widened to
+float32 as they are scanned. BinaryIndex keeps one bit per
+dimension, the sign of the vector minus the per-dimension mean (32x smaller), and
+scores by Hamming distance. Either way a query scans every code, then rescores the
+best `rerank` candidates exactly against the full-precision vectors, which are read
+from the memory-mapped vector file and so only paged in for those rows.
+"""
+
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# magic, version, dimension, bytes per code, count, vector fingerprint
+_HEADER = struct.Struct("<8sIIIxxxxQQ")
+
+# Rows encoded at a time
+_ENCODE_CHUNK_ROWS = 8192
+# Int8 rows widened to float32 at a time when scanning; small enough to stay in cache
+_SCAN_CHUNK_ROWS = 64
+# Binary codes compared at a time, bounding the temporary XOR result
+_HAMMING_CHUNK_ROWS = 65536
+
+
+class QuantizedIndex:
+    """Shared training, rescoring and persistence of the quantized indexes."""
+
+    MAGIC = b""
+    SUFFIX = ""
+    CODE_DTYPE = np.uint8
+
+    def __init__(self, rerank: int = 100, max_train: int = 20_000, seed: int = 0):
+        """Create an untrained index whose queries rescore the best rerank candidates exactly."""
+        self.rerank = rerank
+        self.max_train = max_train
+        self.seed = seed
+        # Fingerprint of the vectors the index was built over (see LocalVectorStore)
+        self.fingerprint = 0
+        self.count = 0
+        # Per-dimension quantization parameters, fitted on the first add
+        self.offset: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        self.codes: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def empty_copy(self) -> "QuantizedIndex":
+        """A new, untrained index with the same parameters."""
+        return type(self)(rerank=self.rerank, max_train=self.max_train, seed=self.seed)
+
+    def copy_search_params(self, other: "QuantizedIndex"):
+        """Search with other's query-time settings."""
+        self.rerank = other.rerank
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the index itself (the full-precision vectors are not counted)."""
+        arrays = [self.offset, self.scale, self.codes]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def _fit(self, sample: np.ndarray):
+        raise NotImplementedError
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _approximate(self, query: np.ndarray) -> np.ndarray:
+        """First-pass scores of every code against a normalized query, higher is closer."""
+        raise NotImplementedError
+
+    def add(self, vectors: np.ndarray):
+        """Encode rows count..len(vectors) - 1 of vectors, which must extend the rows already indexed.
+
+        The quantization parameters are fitted on the first call and kept for later additions.
+        """
+        total = len(vectors)
+        if total <= self.count:
+            return
+        if self.offset is None:
+            rng = np.random.default_rng(self.seed)
+            sample_rows = np.sort(rng.choice(total, min(total, self.max_train), replace=False))
+            self._fit(np.asarray(vectors[sample_rows], dtype=np.float32))
+
+        new_codes = np.concatenate([
+            self._encode(np.asarray(vectors[start:min(start + _ENCODE_CHUNK_ROWS, total)], dtype=np.float32))
+            for start in range(self.count, total, _ENCODE_CHUNK_ROWS)
+        ])
+        # A memory-mapped index is copied into memory before it is extended
+        self.codes = new_codes if self.codes is None else np.concatenate([np.asarray(self.codes), new_codes])
+        self.count = total
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top_k rows for a normalized query, as (rows, exact similarities) best first."""
+        if not self.count or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        approximate = self._approximate(query)
+        candidates = min(max(self.rerank, top_k), self.count)
+        best = np.argpartition(-approximate, candidates - 1)[:candidates]
+        rows = np.sort(best).astype(np.int64)
+        exact = vectors[rows] @ query
+        top = np.argsort(-exact, kind="stable")[:top_k]
+        return rows[top], exact[top].astype(np.float32)
+
+    def save(self, path: str):
+        """Write the index to path, replacing it atomically."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(self.MAGIC, FORMAT_VERSION, len(self.offset), self.codes.shape[1],
+                                 self.count, self.fingerprint))
+            f.write(self.offset.astype("<f4").tobytes())
+            f.write(self.scale.astype("<f4").tobytes())
+            f.write(np.ascontiguousarray(self.codes).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "QuantizedIndex":
+        """Open a saved index, mapping its codes read-only."""
+        path = Path(path)
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size or header[:len(cls.MAGIC)] != cls.MAGIC:
+                raise ValueError(f"{path} is not a {cls.__name__} file")
+            _, version, dimension, code_bytes, count, fingerprint = _HEADER.unpack(header)
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported {cls.__name__} version in {path}: {version}")
+            index = cls()
+            index.count, index.fingerprint = count, fingerprint
+            index.offset = np.frombuffer(f.read(4 * dimension), dtype="<f4").astype(np.float32)
+            index.scale = np.frombuffer(f.read(4 * dimension), dtype="<f4").astype(np.float32)
+
+        offset = _HEADER.size + 8 * dimension
+        if count:
+            index.codes = np.memmap(path, dtype=cls.CODE_DTYPE, mode="r", offset=offset, shape=(count, code_bytes))
+        else:
+            index.codes = np.zeros((0, code_bytes), dtype=cls.CODE_DTYPE)
+        return index
+
+
+class Int8Index(QuantizedIndex):
+    """One signed byte per dimension: x ~= offset + scale * code. Scans as fast as float32."""
+
+    MAGIC = b"BWINT8\x00\x00"
+    SUFFIX = ".int8"
+    CODE_DTYPE = np.int8
+
+    def _fit(self, sample: np.ndarray):
+        low, high = sample.min(axis=0), sample.max(axis=0)
+        self.offset = (low + high) / 2
+        self.scale = np.where(high > low, (high - low) / 254, 1.0).astype(np.float32)
+        logger.info(f"Int8 quantization fitted on {len(sample)} vectors")
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        # Rows added later may fall outside the fitted range and are clipped to it
+        return np.clip(np.rint((vectors - self.offset) / self.scale), -127, 127).astype(np.int8)
+
+    def _approximate(self, query: np.ndarray) -> np.ndarray:
+        # q . x ~= q . offset + (q * scale) . code, and q . offset is the same for every row
+        weights = (query * self.scale).astype(np.float32)
+        scores = np.empty(self.count, dtype=np.float32)
+        block = np.empty((min(_SCAN_CHUNK_ROWS, self.count), len(weights)), dtype=np.float32)
+        for start in range(0, self.count, _SCAN_CHUNK_ROWS):
+            rows = min(_SCAN_CHUNK_ROWS, self.count - start)
+            block[:rows] = self.codes[start:start + rows]
+            np.matmul(block[:rows], weights, out=scores[start:start + rows])
+        return scores
+
+
+class BinaryIndex(QuantizedIndex):
+    """One bit per dimension: the sign of x - offset, compared by Hamming distance."""
+
+    MAGIC = b"BWBIN\x00\x00\x00"
+    SUFFIX = ".binary"
+
+    def _fit(self, sample: np.ndarray):
+        # Centering first makes each bit split the stored vectors roughly in half
+        self.offset = sample.mean(axis=0)
+        self.scale = np.ones_like(self.offset)
+        logger.info(f"Binary quantization fitted on {len(sample)} vectors")
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(vectors > self.offset, axis=1)
+
+    def _approximate(self, query: np.ndarray) -> np.ndarray:
+        query_bits = self._encode(query[None, :])[0]
+        codes = self.codes
+        # Compare 64 bits at a time when the code length allows it
+        if codes.shape[1] % 8 == 0:
+            codes, query_bits = codes.view(np.uint64), query_bits.view(np.uint64)
+        scores = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, _HAMMING_CHUNK_ROWS):
+            block = codes[start:start + _HAMMING_CHUNK_ROWS]
+            distances = np.bitwise_count(block ^ query_bits).sum(axis=1, dtype=np.int32)
+            np.negative(distances, out=scores[start:start + len(distances)], casting="unsafe")
+        return scores
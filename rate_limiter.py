@@ -0,0 +1,212 @@
+"""
+Rate-aware scheduling for OpenAI API calls.
+
+Requests are admitted through two token buckets, one for requests per minute and one
+for tokens per minute. The buckets are corrected from the x-ratelimit-* headers that
+OpenAI returns, and 429s are retried with jittered exponential backoff. All callers
+sharing a RateLimiter pause together when the server asks them to slow down.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Mapping, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: rate limits, timeouts, dropped connections and 5xx responses
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of text (errs on the high side for English prose)."""
+    return len(text) // 3 + 1
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Parse an OpenAI reset duration such as '20ms', '1s' or '6m0s' into seconds."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at a per-minute rate.
+
+    Reservations may drive the level negative; the caller then waits until the debt
+    is repaid. This keeps admission first-come-first-served without a wait queue.
+    """
+
+    def __init__(self, limit_per_minute: float):
+        self.capacity = float(limit_per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount from the bucket and return how long to wait before using it."""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def set_limit(self, limit_per_minute: float, now: float):
+        """Change the bucket's capacity and refill rate."""
+        self._refill(now)
+        self.capacity = float(limit_per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = min(self.level, self.capacity)
+
+    def clamp(self, remaining: float, now: float):
+        """Lower the level to what the server says is left in the current window."""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """Shared scheduler for OpenAI requests, safe to use from threads and asyncio tasks."""
+
+    def __init__(self, requests_per_minute: float = 3000, tokens_per_minute: float = 1_000_000,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.blocked_until = 0.0
+        self.rate_limited_count = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            return max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(tokens, now),
+                self.blocked_until - now
+            )
+
+    def acquire(self, tokens: int = 0):
+        """Block until a request using the given number of tokens may be sent."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: int = 0):
+        """Wait without blocking the event loop until a request may be sent."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]):
+        """Adjust the buckets from OpenAI's x-ratelimit-* response headers."""
+        if not headers:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                try:
+                    limit = headers.get(f"x-ratelimit-limit-{kind}")
+                    if limit and float(limit) != bucket.capacity:
+                        bucket.set_limit(float(limit), now)
+                    remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                    if remaining is not None:
+                        bucket.clamp(float(remaining), now)
+                        if float(remaining) <= 0:
+                            reset = parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                            if reset:
+                                self.blocked_until = max(self.blocked_until, now + reset)
+                except ValueError:
+                    logger.debug(f"Ignoring malformed rate limit headers for {kind}")
+
+    def backoff_delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """Delay before retry number attempt (0-based), honouring retry-after when present."""
+        if headers:
+            retry_after_ms = headers.get("retry-after-ms")
+            retry_after = headers.get("retry-after")
+            try:
+                if retry_after_ms is not None:
+                    return float(retry_after_ms) / 1000 + random.uniform(0, self.base_delay)
+                if retry_after is not None:
+                    return float(retry_after) + random.uniform(0, self.base_delay)
+            except ValueError:
+                pass
+
+        # Full jitter: uniform over [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _handle_error(self, error: Exception, attempt: int) -> float:
+        """Record a failed attempt and return the delay before retrying, or re-raise."""
+        if not isinstance(error, RETRYABLE_ERRORS) or attempt >= self.max_retries:
+            raise error
+        # An exhausted quota will not recover by waiting
+        if getattr(error, "code", None) == "insufficient_quota":
+            raise error
+
+        response = getattr(error, "response", None)
+        headers = response.headers if response is not None else None
+        delay = self.backoff_delay(attempt, headers)
+
+        if isinstance(error, openai.RateLimitError):
+            self.update_from_headers(headers)
+            with self._lock:
+                self.rate_limited_count += 1
+                # Hold back every caller sharing this limiter, not just this one
+                self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+        logger.warning(f"OpenAI request failed ({type(error).__name__}), retrying in {delay:.1f}s "
+                       f"(attempt {attempt + 1} of {self.max_retries})")
+        return delay
+
+    def call(self, request: Callable[[], Any], tokens: int = 0) -> Any:
+        """Run a raw-response OpenAI request under the rate limits and return the parsed result.
+
+        request must return the object from a client.<resource>.with_raw_response call.
+        """
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                raw_response = request()
+            except Exception as e:
+                time.sleep(self._handle_error(e, attempt))
+                attempt += 1
+                continue
+            self.update_from_headers(raw_response.headers)
+            return raw_response.parse()
+
+    async def call_async(self, request: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+        """Async counterpart of call for AsyncOpenAI raw-response requests."""
+        attempt = 0
+        while True:
+            await self.acquire_async(tokens)
+            try:
+                raw_response = await request()
+            except Exception as e:
+                await asyncio.sleep(self._handle_error(e, attempt))
+                attempt += 1
+                continue
+            self.update_from_headers(raw_response.headers)
+            return raw_response.parse()
@@ -0,0 +1,52 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+from docx import Document
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from ingest import BahaiWritingsIngestor
+from rate_limiter import RateLimiter
+from vector_store import LocalVectorStore
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """The fake embeddings endpoint with limits no test reaches, used by every OpenAI client the test creates."""
+    server = FakeOpenAIServer(requests_per_minute=60_000, tokens_per_minute=100_000_000)
+    monkeypatch.setenv("OPENAI_BASE_URL", server.start())
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def make_ingestor(fake_openai, tmp_path, monkeypatch):
+    """Build ingestors with 8-dimensional embeddings on a local store in tmp_path.
+
+    tmp_path is also the working directory, since ingested documents are moved to
+    ./corpus_indexed.
+    """
+    monkeypatch.chdir(tmp_path)
+
+    def make(**kwargs) -> BahaiWritingsIngestor:
+        backend = LocalVectorStore(dimension=8, path=str(tmp_path / "index.vec"))
+        return BahaiWritingsIngestor("fake-key", "unused", RateLimiter(), backend=backend, dimensions=8, **kwargs)
+
+    return make
+
+
+@pytest.fixture
+def write_docx(tmp_path):
+    """Write a .docx of the given paragraphs to tmp_path/corpus and return its path."""
+
+    def write(name: str, paragraphs: List[str]) -> str:
+        path = Path(tmp_path, "corpus", name)
+        path.parent.mkdir(exist_ok=True)
+        document = Document()
+        for text in paragraphs:
+            document.add_paragraph(text)
+        document.save(str(path))
+        return str(path)
+
+    return write
+
@@ -0,0 +1,82 @@
+import math
+
+import numpy as np
+import pytest
+
+from app import BahaiSemanticSearch
+from bm25 import BM25Index, tokenize, write_bm25_index
+from document_store import DocumentStore
+from vector_store import LocalVectorStore
+
+DOCUMENTS = [
+    ("doc_0", "The earth is but one country, and mankind its citizens.", "Bahá'u'lláh"),
+    ("doc_1", "Be generous in prosperity, and thankful in adversity.", "Bahá'u'lláh"),
+    ("doc_2", "The earth is one home; the country of the heart.", "'Abdu'l-Bahá"),
+    ("doc_3", "Unity of mankind is the pivot round which all the teachings revolve.", "Shoghi Effendi"),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "bm25.idx"
+    write_bm25_index(str(path), DOCUMENTS)
+    return BM25Index(str(path))
+
+
+def test_tokenize_folds_case_diacritics_and_apostrophes():
+    assert tokenize("Bahá’u’lláh said: “Be GENEROUS!”") == ["bahaullah", "said", "be", "generous"]
+    assert tokenize("Bahá'u'lláh") == tokenize("Bahaullah")
+
+
+def test_round_trip_and_scores(index):
+    assert len(index) == 4
+    assert [index.id(doc) for doc in range(4)] == ["doc_0", "doc_1", "doc_2", "doc_3"]
+    assert index.authors == ["Bahá'u'lláh", "'Abdu'l-Bahá", "Shoghi Effendi"]
+
+    results = index.search("generous")
+    assert [document_id for document_id, _ in results] == ["doc_1"]
+    # One matching document out of four, term frequency 1
+    idf = math.log(1 + (4 - 1 + 0.5) / (1 + 0.5))
+    length_norm = 1 - index.b + index.b * 8 / index.average_length
+    assert results[0][1] == pytest.approx(idf * (index.k1 + 1) / (1 + index.k1 * length_norm), rel=1e-5)
+
+
+def test_ranking_filters_and_misses(index):
+    ranked = [document_id for document_id, _ in index.search("earth country mankind")]
+    assert set(ranked) == {"doc_0", "doc_2", "doc_3"}
+    assert ranked[0] == "doc_0"
+    assert [document_id for document_id, _ in index.search("earth", top_k=1)] in (["doc_0"], ["doc_2"])
+    assert [document_id for document_id, _ in index.search("earth", authors=["'Abdu'l-Bahá"])] == ["doc_2"]
+    assert index.search("nothing matches") == []
+    assert index.search("earth", top_k=0) == []
+
+
+def test_empty_index_and_bad_file(tmp_path):
+    write_bm25_index(str(tmp_path / "empty.idx"), [])
+    assert BM25Index(str(tmp_path / "empty.idx")).search("earth") == []
+    (tmp_path / "bad.idx").write_bytes(b"not an index")
+    with pytest.raises(ValueError):
+        BM25Index(str(tmp_path / "bad.idx"))
+
+
+def test_hybrid_search_fuses_keyword_and_vector_matches(fake_openai, tmp_path):
+    documents = DocumentStore(str(tmp_path / "documents.sqlite"))
+    documents.put_many([{"document_id": document_id, "text": text, "source_file": "a.docx", "paragraph_id": i}
+                        for i, (document_id, text, _) in enumerate(DOCUMENTS)])
+    write_bm25_index(str(tmp_path / "bm25.idx"), DOCUMENTS)
+    backend = LocalVectorStore(dimension=8)
+    search = BahaiSemanticSearch("fake-key", None, backend=backend, dimensions=8,
+                                 documents=documents, bm25=BM25Index(str(tmp_path / "bm25.idx")))
+
+    # doc_3 gets the query's own embedding, so it leads the vector ranking, while only
+    # doc_1 contains the query's words
+    query = "thankful in adversity"
+    rng = np.random.default_rng(0)
+    backend.upsert([(document_id, search.generate_query_embedding(query) if document_id == "doc_3"
+                     else rng.standard_normal(8), {"author": author})
+                    for document_id, _, author in DOCUMENTS])
+    results = search.search(query, n_results=2)
+    assert sorted(result["text"] for result in results) == sorted([DOCUMENTS[1][1], DOCUMENTS[3][1]])
+
+    results = search.search(query, n_results=2, author_filter=["Shoghi Effendi"])
+    assert [result["text"] for result in results] == [DOCUMENTS[3][1]]
@@ -0,0 +1,107 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from checkpoint import IngestCheckpoint
+from docx_parser import extract_paragraphs_from_docx
+
+
+def paragraph(label: str) -> str:
+    """A paragraph of 100 words, long enough not to be combined with its neighbours."""
+    return " ".join(f"{label}w{i}" for i in range(100))
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "checkpoint.sqlite")
+    checkpoint = IngestCheckpoint(path)
+    checkpoint.record_embedded("a.docx", [("a_1", "h1", [1, 2]), ("a_2", "h2", np.array([3, 4]))])
+    checkpoint.record_embedded("b.docx", [("b_1", "h3", [5, 6])])
+    checkpoint.record_upserted("a.docx", ["a_1"])
+    checkpoint.close()
+
+    checkpoint = IngestCheckpoint(path)
+    states = checkpoint.load("a.docx")
+    assert states["a_1"].upserted and states["a_1"].embedding is None
+    assert not states["a_2"].upserted and states["a_2"].chunk_hash == "h2"
+    np.testing.assert_array_equal(states["a_2"].embedding, [3, 4])
+    assert sorted(checkpoint.pending_documents()) == ["a.docx", "b.docx"]
+
+    checkpoint.clear_document("a.docx")
+    assert checkpoint.load("a.docx") == {}
+    assert checkpoint.pending_documents() == ["b.docx"]
+
+
+def test_resume_splits_paragraphs_by_progress(make_ingestor, tmp_path):
+    ingestor = make_ingestor()
+    ingestor.checkpoint = IngestCheckpoint(str(tmp_path / "checkpoint.sqlite"))
+    paragraphs = [{"text": paragraph(str(i)), "paragraph_id": i, "source_file": "hidden-words.docx",
+                   "document_id": f"hidden-words_para_{i}", "author": "Bahá'u'lláh"} for i in range(4)]
+    embeddings = [np.full(8, i, dtype=np.float32) for i in range(3)]
+    ingestor.checkpoint_embedded(list(zip(paragraphs[:3], embeddings)))
+    ingestor.checkpoint.record_upserted("hidden-words.docx", ["hidden-words_para_0"])
+    # A chunk whose text changed since it was checkpointed is embedded again
+    paragraphs[2] = dict(paragraphs[2], text="changed")
+
+    to_embed, ready, upserted = ingestor.resume_from_checkpoint(paragraphs)
+    assert [p["paragraph_id"] for p in to_embed] == [2, 3]
+    assert [(p["paragraph_id"], embedding[0]) for p, embedding in ready] == [(1, 1.0)]
+    assert upserted == ["hidden-words_para_0"]
+
+
+def test_interrupted_run_resumes_without_repeating_requests(make_ingestor, write_docx, fake_openai, tmp_path):
+    file_path = write_docx("hidden-words.docx", [paragraph(str(i)) for i in range(4)])
+    paragraphs = extract_paragraphs_from_docx(file_path)
+    assert len(paragraphs) == 4
+
+    ingestor = make_ingestor()
+    ingestor.checkpoint = IngestCheckpoint(str(tmp_path / "checkpoint.sqlite"))
+    ingestor.embedding_batch_size = 2
+    embed_batch = ingestor.embed_batch
+    calls = []
+
+    def crash_on_second_batch(batch):
+        calls.append(batch)
+        if len(calls) == 2:
+            raise RuntimeError("interrupted")
+        return embed_batch(batch)
+
+    ingestor.embed_batch = crash_on_second_batch
+    with pytest.raises(RuntimeError):
+        ingestor.ingest_document(file_path, paragraphs)
+    assert fake_openai.served == 1
+    assert ingestor.backend.count() == 0
+    assert Path(file_path).exists()
+
+    # The first batch's embeddings come from the checkpoint, so only the second is requested
+    ingestor = make_ingestor()
+    ingestor.checkpoint = IngestCheckpoint(str(tmp_path / "checkpoint.sqlite"))
+    ingestor.embedding_batch_size = 2
+    ingestor.ingest_document(file_path, paragraphs)
+    assert fake_openai.served == 2
+    assert ingestor.backend.count() == 4
+    assert ingestor.checkpoint.pending_documents() == []
+    assert (tmp_path / "corpus_indexed" / "hidden-words.docx").exists()
+
+
+def test_pipeline_resumes_upserted_document_without_requests(make_ingestor, write_docx, fake_openai, tmp_path):
+    file_path = write_docx("hidden-words.docx", [paragraph(str(i)) for i in range(3)])
+    ingestor = make_ingestor()
+    ingestor.checkpoint = IngestCheckpoint(str(tmp_path / "checkpoint.sqlite"))
+
+    def crash(file_path):
+        raise OSError("crashed before moving")
+
+    ingestor.move_document_to_indexed = crash
+    with pytest.raises(OSError):
+        ingestor.ingest_document(file_path)
+    served = fake_openai.served
+    ingestor.backend.close()
+
+    ingestor = make_ingestor()
+    ingestor.checkpoint = IngestCheckpoint(str(tmp_path / "checkpoint.sqlite"))
+    ingestor.ingest_documents_pipelined([file_path])
+    assert fake_openai.served == served
+    assert ingestor.backend.count() == 3
+    assert ingestor.checkpoint.pending_documents() == []
+    assert (tmp_path / "corpus_indexed" / "hidden-words.docx").exists()
@@ -0,0 +1,73 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import completion_cache
+from completion_cache import CompletionCache, completion_key
+
+
+def test_concurrent_callers_share_one_completion():
+    cache = CompletionCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "rewritten"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute)))
+                 for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    # Followers register as coalesced before waiting on the leader's flight
+    while cache.coalesced < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["rewritten"] * 4
+    assert cache.get_or_compute("key", lambda: "other") == "rewritten"
+    assert (cache.hits, cache.coalesced, cache.misses) == (1, 3, 1)
+    assert cache.hit_rate == pytest.approx(0.8)
+
+
+def test_errors_and_empty_results_are_not_cached():
+    def fail():
+        raise RuntimeError("API down")
+
+    cache = CompletionCache()
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("key", fail)
+    assert cache.get_or_compute("key", lambda: "") == ""
+    assert cache.get_or_compute("key", lambda: "ok") == "ok"
+    assert cache.misses == 3 and len(cache) == 1
+
+
+def test_entries_expire_and_are_evicted(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(completion_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache = CompletionCache(max_entries=2, ttl_seconds=10)
+    for key in ("a", "b", "c"):
+        cache.get_or_compute(key, lambda key=key: key.upper())
+    assert len(cache) == 2
+    assert cache.get_or_compute("a", lambda: "recomputed") == "recomputed"
+
+    now[0] = 11
+    assert cache.get_or_compute("c", lambda: "fresh") == "fresh"
+    assert cache.hits == 0
+
+
+def test_key_normalizes_text_but_not_prompt():
+    assert completion_key("m", "prompt", "a  b\n") == completion_key("m", "prompt", "a b")
+    assert completion_key("m", "prompt", "a b") != completion_key("m", "other prompt", "a b")
@@ -0,0 +1,58 @@
+import logging
+
+import numpy as np
+
+from dimension_eval import append_query_log, evaluate_dimensions, read_query_log
+from hnsw import HNSWIndex
+from ingest import run_dimension_evaluation
+from vector_store import LocalVectorStore, normalize_rows
+
+
+def random_vectors(count: int, dimension: int = 32, seed: int = 0) -> np.ndarray:
+    return normalize_rows(np.random.default_rng(seed).standard_normal((count, dimension), dtype=np.float32))
+
+
+def test_exact_search_and_items_include_journaled_changes(tmp_path):
+    path = str(tmp_path / "index.vec")
+    vectors = random_vectors(200)
+    store = LocalVectorStore(dimension=32, path=path, ann=HNSWIndex(M=8))
+    store.upsert([(f"doc_{i}", vector, {}) for i, vector in enumerate(vectors[:150])])
+    store.save()
+    store.delete(["doc_0"])
+    store.upsert([("doc_1", vectors[151], {}), ("doc_150", vectors[150], {})])
+
+    reader = LocalVectorStore(dimension=32, path=path, mmap=True, ann=HNSWIndex(M=8))
+    items = dict(reader.items())
+    assert len(items) == 150 and "doc_0" not in items
+    np.testing.assert_allclose(items["doc_1"], vectors[151], atol=1e-6)
+
+    scores = vectors[:151] @ vectors[7]
+    scores[0] = -np.inf
+    scores[1] = vectors[151] @ vectors[7]
+    expected = [f"doc_{row}" for row in np.argsort(-scores)[:10]]
+    matches = reader.exact_search(vectors[7], top_k=10, include_metadata=False)
+    assert [match["id"] for match in matches] == expected
+
+
+def test_evaluate_dimensions(tmp_path):
+    vectors = random_vectors(300, dimension=64)
+    store = LocalVectorStore(dimension=64)
+    store.upsert([(f"doc_{i}", vector, {}) for i, vector in enumerate(vectors)])
+
+    rows = evaluate_dimensions(store, vectors[:20], [64, 32, 128, 8], top_k=5)
+    assert [row["dimensions"] for row in rows] == [64, 32, 8]
+    assert rows[0]["recall"] == 1.0 and rows[0]["storage_bytes"] == 300 * 64 * 4
+    # Each query is a stored vector, which stays its own nearest neighbour when shortened
+    assert 0.2 <= rows[2]["recall"] <= rows[1]["recall"] < 1.0
+    assert rows[1]["storage_bytes"] == 300 * 32 * 4
+
+
+def test_query_log_and_missing_log(make_ingestor, tmp_path, caplog):
+    log_path = str(tmp_path / "queries.jsonl")
+    for text in ["unity", "justice", "unity"]:
+        append_query_log(log_path, "semantic", text)
+    assert read_query_log(log_path) == ["unity", "justice"]
+
+    with caplog.at_level(logging.ERROR):
+        run_dimension_evaluation(make_ingestor(), str(tmp_path / "missing.jsonl"), [4], top_k=5)
+    assert "QUERY_LOG_PATH" in caplog.text
@@ -0,0 +1,48 @@
+from app import BahaiSemanticSearch
+from document_store import DocumentStore
+
+
+def paragraph(label: str) -> str:
+    """A paragraph of 100 words, long enough not to be combined with its neighbours."""
+    return " ".join(f"{label}w{i}" for i in range(100))
+
+
+def test_put_get_delete_and_reopen(tmp_path):
+    path = str(tmp_path / "documents.sqlite")
+    store = DocumentStore(path)
+    store.put_many([{"document_id": f"doc_{i:04d}", "text": f"text {i}", "source_file": "a.docx", "paragraph_id": i}
+                    for i in range(1200)])
+    store.put_many([{"document_id": "doc_0001", "text": "replaced", "source_file": "a.docx", "paragraph_id": 1}])
+    store.delete(["doc_0002", "missing"])
+    store.close()
+
+    store = DocumentStore(path)
+    assert store.count() == 1199
+    found = store.get_many(["doc_0001", "doc_0002", "doc_1100", "missing"])
+    assert found == {"doc_0001": {"text": "replaced", "source_file": "a.docx", "paragraph_id": 1},
+                     "doc_1100": {"text": "text 1100", "source_file": "a.docx", "paragraph_id": 1100}}
+    # Iteration pages through more rows than one lookup chunk, in ID order
+    ids = [document["document_id"] for document in store.iter_documents()]
+    assert len(ids) == 1199 and ids == sorted(ids)
+
+    store.clear()
+    assert store.count() == 0 and list(store.iter_documents()) == []
+
+
+def test_ingested_text_is_kept_out_of_vector_metadata(make_ingestor, write_docx, tmp_path):
+    documents = DocumentStore(str(tmp_path / "documents.sqlite"))
+    ingestor = make_ingestor(documents=documents)
+    texts = [paragraph(str(i)) for i in range(3)]
+    ingestor.ingest_document(write_docx("hidden-words.docx", texts))
+    ingestor.backend.close()
+
+    metadata = ingestor.backend._metadata[0]
+    assert "text" not in metadata and metadata["author"] == "Bahá'u'lláh"
+    assert documents.get_many(["hidden-words_para_1"])["hidden-words_para_1"]["text"] == texts[1]
+
+    # Search results are hydrated from the store; IDs it lacks are dropped
+    documents.delete(["hidden-words_para_2"])
+    search = BahaiSemanticSearch("fake-key", None, backend=ingestor.backend, dimensions=8, documents=documents)
+    results = search.search(texts[1], n_results=3)
+    assert results[0]["text"] == texts[1] and results[0]["source_file"] == "hidden-words.docx"
+    assert sorted(result["paragraph_id"] for result in results) == [0, 1]
@@ -0,0 +1,84 @@
+import threading
+
+import numpy as np
+import pytest
+
+from embedding_cache import EmbeddingCache, QueryEmbeddingCache, embedding_key
+
+
+def test_keys_ignore_whitespace_and_unicode_form():
+    assert embedding_key("Bahá'u'lláh  said\n", "m", 8) == embedding_key("Bahá'u'lláh said", "m", 8)
+    assert embedding_key("text", "m", 8) != embedding_key("text", "m", 16)
+    assert embedding_key("text", "m", 8) != embedding_key("text", "other", 8)
+
+
+def test_put_get_and_reopen(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache(path, dimensions=4)
+    cache.put_many(["a", "b"], [[1, 2, 3, 4], np.array([5, 6, 7, 8], dtype=np.float64)])
+    cache.close()
+
+    cache = EmbeddingCache(path, dimensions=4)
+    a, missing, b = cache.get_many(["a", "missing", " b "])
+    assert a.dtype == np.float32
+    np.testing.assert_array_equal(a, [1, 2, 3, 4])
+    np.testing.assert_array_equal(b, [5, 6, 7, 8])
+    assert missing is None
+    assert (cache.hits, cache.misses) == (2, 1)
+    # Another dimension count is another key
+    assert EmbeddingCache(path, dimensions=8).get("a") is None
+
+
+def test_lookups_beyond_the_parameter_limit(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), dimensions=2)
+    texts = [f"text {i}" for i in range(1200)]
+    cache.put_many(texts[::2], [[i, i] for i in range(600)])
+    results = cache.get_many(texts)
+    assert sum(result is not None for result in results) == 600
+    np.testing.assert_array_equal(results[10], [5, 5])
+
+
+def test_concurrent_lookups_count_every_hit(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), dimensions=2)
+    cache.put("a", [1, 2])
+
+    def look_up():
+        for _ in range(200):
+            cache.get_many(["a", "missing"])
+
+    threads = [threading.Thread(target=look_up) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (cache.hits, cache.misses) == (800, 800)
+
+
+def test_query_cache_evicts_least_recently_used():
+    cache = QueryEmbeddingCache(max_entries=2, path=None, dimensions=2)
+    cache.put("a", [1, 1])
+    cache.put("b", [2, 2])
+    assert cache.get("a") is not None
+    cache.put("c", [3, 3])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert len(cache) == 2
+    with pytest.raises(ValueError):
+        cache.get("a")[0] = 0
+
+
+def test_query_cache_expires_memory_but_keeps_disk(tmp_path):
+    path = str(tmp_path / "queries.sqlite")
+    # With no TTL every memory entry has expired by the next lookup
+    cache = QueryEmbeddingCache(ttl_seconds=0, path=path, dimensions=2)
+    cache.put("query", [1, 2])
+    np.testing.assert_array_equal(cache.get("  query"), [1, 2])
+    assert cache.get("other") is None
+    assert (cache.memory_hits, cache.disk_hits, cache.misses) == (0, 1, 1)
+    assert cache.stats().startswith("0 memory hits, 1 disk hits, 1 misses (50% hit rate")
+
+    # A new process starts with an empty LRU but the same disk tier
+    restarted = QueryEmbeddingCache(path=path, dimensions=2)
+    np.testing.assert_array_equal(restarted.get("query"), [1, 2])
+    assert restarted.get("query") is not None
+    assert (restarted.memory_hits, restarted.disk_hits) == (1, 1)
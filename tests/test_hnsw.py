@@ -0,0 +1,75 @@
+import numpy as np
+
+from hnsw import HNSWIndex
+from vector_store import LocalVectorStore, normalize_rows
+
+
+def embedding_like_vectors(count: int, dimension: int = 32, seed: int = 0) -> np.ndarray:
+    """Normalized vectors concentrated near a low-dimensional subspace, like real embeddings."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, 8), dtype=np.float32) @ rng.standard_normal((8, dimension), dtype=np.float32)
+    vectors += 0.3 * rng.standard_normal((count, dimension), dtype=np.float32)
+    return normalize_rows(vectors)
+
+
+def exact_top(vectors: np.ndarray, query: np.ndarray, top_k: int) -> np.ndarray:
+    return np.argsort(-(vectors @ query), kind="stable")[:top_k]
+
+
+def recall(index: HNSWIndex, vectors: np.ndarray, queries: np.ndarray, top_k: int = 10) -> float:
+    found = sum(len(set(index.search(vectors, query, top_k)[0].tolist()) & set(exact_top(vectors, query, top_k)))
+                for query in queries)
+    return found / (len(queries) * top_k)
+
+
+def test_recall_against_exact_search():
+    vectors = embedding_like_vectors(2000)
+    index = HNSWIndex(M=8, ef_construction=64)
+    index.add(vectors)
+
+    assert len(index) == 2000
+    assert recall(index, vectors, vectors[:50]) >= 0.95
+    rows, scores = index.search(vectors, vectors[7], 5)
+    assert rows[0] == 7
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_save_load_and_extend(tmp_path):
+    vectors = embedding_like_vectors(600)
+    index = HNSWIndex(M=8)
+    index.add(vectors[:500])
+    index.fingerprint = 1234
+    index.save(tmp_path / "index.hnsw")
+
+    loaded = HNSWIndex.load(tmp_path / "index.hnsw")
+    assert (loaded.count, loaded.fingerprint, loaded.max_level) == (500, 1234, index.max_level)
+    for query in vectors[:10]:
+        np.testing.assert_array_equal(loaded.search(vectors, query, 10)[0], index.search(vectors, query, 10)[0])
+
+    # Extending a loaded graph copies its mapped arrays before inserting
+    loaded.add(vectors)
+    assert len(loaded) == 600
+    assert loaded.search(vectors, vectors[550], 1)[0][0] == 550
+
+
+def test_store_reloads_graph_and_rebuilds_after_delete(tmp_path):
+    path = str(tmp_path / "index.vec")
+    vectors = embedding_like_vectors(300)
+    store = LocalVectorStore(dimension=32, path=path, ann=HNSWIndex(M=8))
+    store.upsert([(f"doc_{i}", vector, {"author": "A" if i % 3 else "B"}) for i, vector in enumerate(vectors)])
+    store.close()
+    assert (tmp_path / "index.hnsw").exists()
+
+    reader = LocalVectorStore(dimension=32, path=path, mmap=True, ann=HNSWIndex(M=8))
+    assert reader._ann_ready
+    assert reader.query(vectors[42], top_k=1)[0]["id"] == "doc_42"
+    matches = reader.query(vectors[42], top_k=5, filter={"author": "B"})
+    assert len(matches) == 5 and all(match["metadata"]["author"] == "B" for match in matches)
+
+    store = LocalVectorStore(dimension=32, path=path, ann=HNSWIndex(M=8))
+    store.delete(["doc_0"])
+    assert not store._ann_ready
+    store.close()
+    reloaded = LocalVectorStore(dimension=32, path=path, ann=HNSWIndex(M=8))
+    assert reloaded._ann_ready and len(reloaded.ann) == 299
+    assert reloaded.query(vectors[0], top_k=1)[0]["id"] != "doc_0"
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from ivfpq import IVFPQIndex
+from vector_store import LocalVectorStore, normalize_rows
+
+
+def embedding_like_vectors(count: int, dimension: int = 32, seed: int = 0) -> np.ndarray:
+    """Normalized vectors concentrated near a low-dimensional subspace, like real embeddings."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, 8), dtype=np.float32) @ rng.standard_normal((8, dimension), dtype=np.float32)
+    vectors += 0.3 * rng.standard_normal((count, dimension), dtype=np.float32)
+    return normalize_rows(vectors)
+
+
+def recall(index: IVFPQIndex, vectors: np.ndarray, queries: np.ndarray, top_k: int = 10) -> float:
+    found = 0
+    for query in queries:
+        exact = np.argsort(-(vectors @ query), kind="stable")[:top_k]
+        found += len(set(index.search(vectors, query, top_k)[0].tolist()) & set(exact.tolist()))
+    return found / (len(queries) * top_k)
+
+
+def test_recall_with_exact_reranking():
+    vectors = embedding_like_vectors(2000)
+    index = IVFPQIndex(m=8, nprobe=16, rerank=100)
+    index.add(vectors)
+
+    assert len(index) == 2000
+    assert index.nlist == int(4 * np.sqrt(2000))
+    assert recall(index, vectors, vectors[:50]) >= 0.95
+    rows, scores = index.search(vectors, vectors[3], 5)
+    assert rows[0] == 3
+    np.testing.assert_allclose(scores, vectors[rows] @ vectors[3], rtol=1e-6)
+
+
+def test_sub_vectors_must_divide_dimension():
+    with pytest.raises(ValueError):
+        IVFPQIndex(m=5).add(embedding_like_vectors(100))
+
+
+def test_save_load_and_extend(tmp_path):
+    vectors = embedding_like_vectors(800)
+    index = IVFPQIndex(nlist=16, m=8, nprobe=8)
+    index.add(vectors[:600])
+    index.fingerprint = 99
+    index.save(tmp_path / "index.ivfpq")
+
+    loaded = IVFPQIndex.load(tmp_path / "index.ivfpq")
+    loaded.copy_search_params(index)
+    assert (loaded.count, loaded.nlist, loaded.fingerprint) == (600, 16, 99)
+    for query in vectors[:10]:
+        np.testing.assert_array_equal(loaded.search(vectors, query, 10)[0], index.search(vectors, query, 10)[0])
+
+    # Rows added later are encoded with the trained quantizers
+    loaded.add(vectors)
+    assert len(loaded) == 800
+    np.testing.assert_array_equal(loaded.centroids, index.centroids)
+    assert loaded.search(vectors, vectors[700], 1)[0][0] == 700
+
+
+def test_store_extends_index_across_runs(tmp_path):
+    path = str(tmp_path / "index.vec")
+    vectors = embedding_like_vectors(500)
+    store = LocalVectorStore(dimension=32, path=path, ann=IVFPQIndex(m=8, nprobe=8))
+    store.upsert([(f"doc_{i}", vector, {"author": "A"}) for i, vector in enumerate(vectors[:400])])
+    store.close()
+    centroids = np.array(IVFPQIndex.load(tmp_path / "index.ivfpq").centroids)
+
+    store = LocalVectorStore(dimension=32, path=path, ann=IVFPQIndex(m=8, nprobe=8))
+    assert store._ann_ready
+    store.upsert([(f"doc_{i}", vectors[i], {"author": "B"}) for i in range(400, 500)])
+    store.close()
+
+    reader = LocalVectorStore(dimension=32, path=path, mmap=True, ann=IVFPQIndex(m=8, nprobe=8))
+    assert reader._ann_ready and len(reader.ann) == 500
+    np.testing.assert_array_equal(reader.ann.centroids, centroids)
+    assert reader.query(vectors[450], top_k=1)[0]["id"] == "doc_450"
+    assert all(match["metadata"]["author"] == "B"
+               for match in reader.query(vectors[10], top_k=3, filter={"author": "B"}))
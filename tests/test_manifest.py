@@ -0,0 +1,95 @@
+import json
+import threading
+
+from manifest import IngestManifest
+
+
+def paragraph(label: str) -> str:
+    """A paragraph of 100 words, long enough not to be combined with its neighbours."""
+    return " ".join(f"{label}w{i}" for i in range(100))
+
+
+def test_save_and_reload(tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest = IngestManifest(str(path))
+    manifest.set("a.docx", {"a_1": "h1", "a_2": "h2"})
+    manifest.update("a.docx", {"a_3": "h3"})
+    manifest.set("b.docx", {"b_1": "h4"})
+    manifest.remove("b.docx")
+    manifest.save()
+
+    reloaded = IngestManifest(str(path))
+    assert reloaded.source_files() == ["a.docx"]
+    assert reloaded.get("a.docx") == {"a_1": "h1", "a_2": "h2", "a_3": "h3"}
+
+
+def test_snapshot_is_unaffected_by_later_updates(tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest = IngestManifest(str(path))
+    manifest.set("a.docx", {"a_1": "h1"})
+    documents = manifest.snapshot()
+    manifest.update("a.docx", {"a_2": "h2"})
+    manifest.save(documents)
+
+    assert IngestManifest(str(path)).get("a.docx") == {"a_1": "h1"}
+
+
+def test_concurrent_saves(tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest = IngestManifest(str(path))
+    errors = []
+
+    def save_repeatedly(worker: int):
+        try:
+            for i in range(50):
+                manifest.save({f"{worker}.docx": {f"{worker}_{i}": "h"}})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save_repeatedly, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(json.loads(path.read_text(encoding="utf-8"))["documents"]) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["manifest.json"]
+
+
+def test_incremental_ingestion_touches_only_changed_chunks(make_ingestor, write_docx, fake_openai, tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    ingestor = make_ingestor()
+    ingestor.manifest = IngestManifest(manifest_path)
+    ingestor.ingest_document_incremental(write_docx("hidden-words.docx", [paragraph(str(i)) for i in range(3)]))
+    ingestor.ingest_document_incremental(write_docx("kitab-i-iqan.docx", [paragraph("iqan")]))
+    assert ingestor.backend.count() == 4
+    served = fake_openai.served
+
+    # Paragraph 1 changes and paragraph 2 is removed
+    file_path = write_docx("hidden-words.docx", [paragraph("0"), paragraph("changed")])
+    ingestor.ingest_document_incremental(file_path)
+    assert fake_openai.served == served + 1
+    assert sorted(ingestor.backend._ids) == ["hidden-words_para_0", "hidden-words_para_1", "kitab-i-iqan_para_0"]
+
+    ingestor.remove_missing_documents(["hidden-words.docx"])
+    assert ingestor.backend.count() == 2
+    ingestor.backend.close()
+
+    manifest = IngestManifest(manifest_path)
+    assert manifest.source_files() == ["hidden-words.docx"]
+    assert sorted(manifest.get("hidden-words.docx")) == ["hidden-words_para_0", "hidden-words_para_1"]
+
+
+def test_pipeline_records_every_document_in_the_manifest(make_ingestor, write_docx, tmp_path):
+    file_paths = [write_docx(f"tablets-bahaullah-{n}.docx", [paragraph(f"{n}.{i}") for i in range(3)])
+                  for n in range(6)]
+    ingestor = make_ingestor()
+    ingestor.manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    ingestor.embedding_batch_size = 1
+    ingestor.ingest_documents_pipelined(file_paths, max_concurrent_embeddings=4, max_concurrent_upserts=4)
+
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    assert len(manifest.source_files()) == 6
+    assert all(len(manifest.get(source_file)) == 3 for source_file in manifest.source_files())
+    assert not list(tmp_path.glob("manifest.json.*"))
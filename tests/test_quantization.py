@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from quantization import BinaryIndex, Int8Index
+from vector_store import LocalVectorStore, normalize_rows
+
+
+def embedding_like_vectors(count: int, dimension: int = 64, seed: int = 0) -> np.ndarray:
+    """Normalized vectors concentrated near a low-dimensional subspace, like real embeddings."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, 8), dtype=np.float32) @ rng.standard_normal((8, dimension), dtype=np.float32)
+    vectors += 0.3 * rng.standard_normal((count, dimension), dtype=np.float32)
+    return normalize_rows(vectors)
+
+
+@pytest.mark.parametrize("index_class", [Int8Index, BinaryIndex])
+def test_recall_with_rescoring(index_class):
+    vectors = embedding_like_vectors(2000)
+    index = index_class(rerank=100)
+    index.add(vectors)
+
+    found = 0
+    for query in vectors[:50]:
+        exact = np.argsort(-(vectors @ query), kind="stable")[:10]
+        rows, scores = index.search(vectors, query, 10)
+        np.testing.assert_allclose(scores, vectors[rows] @ query, rtol=1e-6)
+        found += len(set(rows.tolist()) & set(exact.tolist()))
+    assert found / 500 >= 0.95
+
+
+def test_int8_codes_approximate_vectors():
+    vectors = embedding_like_vectors(500)
+    index = Int8Index()
+    index.add(vectors)
+    assert index.codes.dtype == np.int8
+    np.testing.assert_allclose(index.offset + index.scale * index.codes, vectors, atol=float(index.scale.max()))
+
+
+def test_binary_hamming_distance_counts_all_64_bit_words():
+    # 128 dimensions pack into two uint64 words per code, which must not wrap around
+    vectors = embedding_like_vectors(100, dimension=128)
+    index = BinaryIndex()
+    index.add(vectors)
+    query_bits = np.unpackbits(index._encode(vectors[:1]), axis=1)[0]
+    expected = -(np.unpackbits(index.codes, axis=1) != query_bits).sum(axis=1)
+    np.testing.assert_array_equal(index._approximate(vectors[0]), expected)
+
+
+@pytest.mark.parametrize("index_class", [Int8Index, BinaryIndex])
+def test_save_load_and_store_reload(tmp_path, index_class):
+    path = str(tmp_path / "index.vec")
+    vectors = embedding_like_vectors(300)
+    store = LocalVectorStore(dimension=64, path=path, ann=index_class(rerank=50))
+    store.upsert([(f"doc_{i}", vector, {"author": "A" if i % 2 else "B"}) for i, vector in enumerate(vectors)])
+    store.close()
+
+    loaded = index_class.load(tmp_path / f"index{index_class.SUFFIX}")
+    assert loaded.count == 300
+    np.testing.assert_array_equal(loaded.codes, store.ann.codes)
+    np.testing.assert_array_equal(loaded.offset, store.ann.offset)
+
+    reader = LocalVectorStore(dimension=64, path=path, mmap=True, ann=index_class(rerank=50))
+    assert reader._ann_ready
+    assert reader.query(vectors[123], top_k=1)[0]["id"] == "doc_123"
+    matches = reader.query(vectors[123], top_k=5, filter={"author": "B"})
+    assert len(matches) == 5 and all(match["metadata"]["author"] == "B" for match in matches)
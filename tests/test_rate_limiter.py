@@ -0,0 +1,69 @@
+import asyncio
+
+import openai
+import pytest
+from openai import AsyncOpenAI, OpenAI
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from rate_limiter import RateLimiter, TokenBucket, parse_reset_duration
+
+
+@pytest.fixture
+def flaky_server():
+    """A fake server that answers roughly a third of requests with a short 429."""
+    server = FakeOpenAIServer(requests_per_minute=60_000, tokens_per_minute=100_000_000, failure_rate=0.3)
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("20ms") == pytest.approx(0.02)
+    assert parse_reset_duration("6m0s") == 360
+    assert parse_reset_duration("1.5") == 1.5
+    assert parse_reset_duration("soon") is None
+    assert parse_reset_duration(None) is None
+
+
+def test_token_bucket_debt_sets_the_wait():
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60, now=bucket.updated) == 0
+    # One token a second, so a request for 3 more waits 3 seconds
+    assert bucket.reserve(3, now=bucket.updated) == pytest.approx(3)
+
+
+def test_headers_adjust_limits_and_block_callers():
+    limiter = RateLimiter(requests_per_minute=3000)
+    limiter.update_from_headers({"x-ratelimit-limit-requests": "500", "x-ratelimit-remaining-requests": "0",
+                                 "x-ratelimit-reset-requests": "2s", "x-ratelimit-limit-tokens": "bad"})
+    assert limiter.requests.capacity == 500 and limiter.requests.level == 0
+    assert limiter._reserve(0) == pytest.approx(2, abs=0.1)
+    assert limiter.backoff_delay(0, {"retry-after-ms": "250"}) >= 0.25
+
+
+def test_calls_retry_injected_rate_limits(flaky_server):
+    limiter = RateLimiter(base_delay=0.01)
+    client = OpenAI(api_key="fake", base_url=flaky_server.base_url, max_retries=0)
+    for i in range(10):
+        response = limiter.call(lambda: client.embeddings.with_raw_response.create(
+            model="text-embedding-3-large", input=[f"text {i}"], dimensions=8), tokens=3)
+        assert len(response.data[0].embedding) == 8
+    assert flaky_server.served == 10
+    assert limiter.rate_limited_count == flaky_server.injected > 0
+
+
+def test_async_calls_and_non_retryable_errors(flaky_server):
+    limiter = RateLimiter(base_delay=0.01)
+    client = AsyncOpenAI(api_key="fake", base_url=flaky_server.base_url, max_retries=0)
+
+    async def embed_all():
+        return await asyncio.gather(*(limiter.call_async(
+            lambda i=i: client.embeddings.with_raw_response.create(
+                model="text-embedding-3-large", input=[f"text {i}"], dimensions=8)) for i in range(10)))
+
+    assert len(asyncio.run(embed_all())) == 10
+    assert flaky_server.served == 10
+
+    sync_client = OpenAI(api_key="fake", base_url=flaky_server.base_url, max_retries=0)
+    with pytest.raises(openai.NotFoundError):
+        limiter.call(lambda: sync_client.completions.with_raw_response.create(model="fake", prompt="hi"))
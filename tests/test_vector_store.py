@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+import pytest
+
+from vector_store import LocalVectorStore
+
+
+def random_vectors(count: int, dimension: int = 8, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, dimension)).astype(np.float32)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "index.vec")
+
+
+def test_commit_close_reload(path):
+    vectors = random_vectors(5)
+    store = LocalVectorStore(dimension=8, path=path)
+    store.upsert([(f"doc_{i}", vector, {"author": "A" if i % 2 else "B", "paragraph_id": i})
+                  for i, vector in enumerate(vectors)])
+    store.close()
+
+    reloaded = LocalVectorStore(dimension=8, path=path)
+    assert reloaded.count() == 5
+    assert list(reloaded._ids) == [f"doc_{i}" for i in range(5)]
+    assert reloaded._metadata[3] == {"author": "A", "paragraph_id": 3}
+    expected = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.testing.assert_allclose(reloaded.vectors, expected, rtol=1e-6)
+    assert reloaded.count_by("author", ["A", "B", "C"]) == {"A": 2, "B": 3, "C": 0}
+
+
+def test_delete_and_delete_all_persist(path):
+    store = LocalVectorStore(dimension=8, path=path)
+    store.upsert([(f"doc_{i}", vector, {}) for i, vector in enumerate(random_vectors(4))])
+    store.delete(["doc_0", "missing"])
+    store.close()
+    assert sorted(LocalVectorStore(dimension=8, path=path)._ids) == ["doc_1", "doc_2", "doc_3"]
+
+    store = LocalVectorStore(dimension=8, path=path)
+    store.delete_all()
+    store.close()
+    assert LocalVectorStore(dimension=8, path=path).count() == 0
+
+
+def test_filtered_query_after_reload(path):
+    vectors = random_vectors(6)
+    store = LocalVectorStore(dimension=8, path=path)
+    store.upsert([(f"doc_{i}", vector, {"author": "A" if i < 3 else "B"}) for i, vector in enumerate(vectors)])
+    store.close()
+
+    reloaded = LocalVectorStore(dimension=8, path=path, mmap=True)
+    matches = reloaded.query(vectors[4], top_k=2, filter={"author": {"$in": ["B"]}})
+    assert matches[0]["id"] == "doc_4"
+    assert matches[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert all(match["metadata"]["author"] == "B" for match in matches)
+
+
+def write_crashed_store(path: str, vectors: np.ndarray) -> str:
+    """Save doc_0..3, then journal an update, a delete and a new row without closing, and tear the tail."""
+    store = LocalVectorStore(dimension=8, path=path)
+    store.upsert([(f"doc_{i}", vectors[i], {"author": "A"}) for i in range(4)])
+    store.save()
+    store.upsert([("doc_1", vectors[5], {"author": "B"}), ("doc_4", vectors[4], {"author": "B"})])
+    store.delete(["doc_2"])
+    journal = path + ".journal"
+    with open(journal, "ab") as f:
+        f.write(b"\x01\x00\x00\x00torn")
+    return journal
+
+
+def test_writer_replays_journal_after_crash(path):
+    vectors = random_vectors(6)
+    journal = write_crashed_store(path, vectors)
+    intact = len(open(journal, "rb").read()) - 8
+
+    store = LocalVectorStore(dimension=8, path=path)
+    assert sorted(store._ids) == ["doc_0", "doc_1", "doc_3", "doc_4"]
+    assert store.query(vectors[5], top_k=1)[0]["id"] == "doc_1"
+    assert store.count_by("author", ["A", "B"]) == {"A": 2, "B": 2}
+    assert len(open(journal, "rb").read()) == intact
+
+    store.close()
+    assert not os.path.exists(journal)
+    assert LocalVectorStore(dimension=8, path=path).count() == 4
+
+
+def test_memory_mapped_reader_overlays_journal(path):
+    vectors = random_vectors(6)
+    journal = write_crashed_store(path, vectors)
+    before = open(journal, "rb").read()
+
+    reader = LocalVectorStore(dimension=8, path=path, mmap=True)
+    assert isinstance(reader.vectors, np.memmap)
+    assert reader.count() == 4
+    assert reader.count_by("author", ["A", "B"]) == {"A": 2, "B": 2}
+    matches = reader.query(vectors[2], top_k=4)
+    assert sorted(match["id"] for match in matches) == ["doc_0", "doc_1", "doc_3", "doc_4"]
+    assert reader.query(vectors[5], top_k=1, filter={"author": "B"})[0]["id"] == "doc_1"
+    reader.close()
+    assert open(journal, "rb").read() == before
+
+    # The first change makes the reader a writer, which cuts off the torn tail before appending
+    reader.delete(["doc_0"])
+    assert not isinstance(reader.vectors, np.memmap)
+    assert LocalVectorStore(dimension=8, path=path, mmap=True).count() == 3
+    reader.close()
+    assert sorted(LocalVectorStore(dimension=8, path=path)._ids) == ["doc_1", "doc_3", "doc_4"]
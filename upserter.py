@@ -0,0 +1,230 @@
+"""
+Parallel, size-aware upserts to Pinecone.
+
+Vectors are packed into upsert requests by estimated serialized payload size rather
+than by a fixed count, since 3072-dimension vectors with paragraph text in their
+metadata can exceed Pinecone's request limit well before 100 vectors. Requests are
+sent concurrently through a thread pool, retried with jittered backoff, and counted
+so throughput and retries can be reported.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Pinecone rejects upsert requests over 2 MB or 1000 vectors
+PINECONE_MAX_REQUEST_BYTES = 2 * 1024 * 1024
+PINECONE_MAX_BATCH_VECTORS = 1000
+
+# Upper bound on the JSON characters one float32 value takes once widened to a Python
+# float (e.g. "-1.2345678329467773e-05, ")
+FLOAT_JSON_BYTES = 24
+
+# Status codes worth retrying; anything else in the 4xx range is a bad request
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# A vector waiting to be sent: (id, float32 values, metadata)
+PendingVector = Tuple[str, np.ndarray, Dict[str, Any]]
+
+
+def estimate_vector_bytes(vector_id: str, dimension: int, metadata: Dict[str, Any]) -> int:
+    """Estimate the serialized size of one vector in an upsert request."""
+    envelope = json.dumps({"id": vector_id, "values": [], "metadata": metadata}, ensure_ascii=False)
+    return len(envelope.encode("utf-8")) + dimension * FLOAT_JSON_BYTES
+
+
+def batch_by_payload(vectors: Sequence[PendingVector], max_bytes: int = PINECONE_MAX_REQUEST_BYTES,
+                     max_vectors: int = PINECONE_MAX_BATCH_VECTORS) -> Iterator[List[PendingVector]]:
+    """Group vectors into requests under both the payload size and vector count limits."""
+    batch: List[PendingVector] = []
+    batch_bytes = 0
+    for vector in vectors:
+        size = estimate_vector_bytes(vector[0], len(vector[1]), vector[2])
+        if batch and (batch_bytes + size > max_bytes or len(batch) >= max_vectors):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an upsert error is transient (throttling, server errors or connection trouble)."""
+    if isinstance(error, (ValueError, TypeError)):
+        return False
+    status = getattr(error, "status", None)
+    if status is None:
+        return True
+    return int(status) in RETRYABLE_STATUS
+
+
+class UpsertStats:
+    """Running totals for upsert throughput and reliability."""
+
+    def __init__(self):
+        self.vectors = 0
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self.failures = 0
+        self.started = time.monotonic()
+
+    def summary(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (f"{self.vectors} vectors in {self.requests} requests "
+                f"({self.vectors / elapsed:.1f} vectors/s, {self.bytes / elapsed / 1024 / 1024:.2f} MB/s), "
+                f"{self.retries} retries, {self.failures} failed requests")
+
+
+class ParallelUpserter:
+    """Sends upsert requests to a Pinecone index through a bounded thread pool.
+
+    Vectors can be streamed in with submit() and collected with flush(), or upserted
+    synchronously with upsert(). The streaming path keeps its pending request as float32
+    arrays and expands values to Python floats only when a request is sent. At most
+    twice `parallelism` requests are queued or in flight, so producers are held back
+    rather than buffering without limit.
+    """
+
+    def __init__(self, index, parallelism: int = 4, max_request_bytes: int = PINECONE_MAX_REQUEST_BYTES,
+                 max_batch_vectors: int = PINECONE_MAX_BATCH_VECTORS, max_retries: int = 5,
+                 base_delay: float = 0.5, on_committed: Optional[Callable[[List[PendingVector]], None]] = None):
+        self.index = index
+        self.parallelism = parallelism
+        self.max_request_bytes = max_request_bytes
+        self.max_batch_vectors = max_batch_vectors
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.on_committed = on_committed
+        self.stats = UpsertStats()
+
+        self._executor = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="upsert")
+        self._slots = threading.BoundedSemaphore(parallelism * 2)
+        self._lock = threading.Lock()
+        self._pending: List[PendingVector] = []
+        self._pending_bytes = 0
+        self._stream_futures: List[Future] = []
+        self._stream_error: Optional[BaseException] = None
+
+    def _send(self, batch: List[PendingVector]) -> List[str]:
+        """Send one request, retrying transient failures with jittered exponential backoff."""
+        payload = [{"id": vector_id, "values": values.tolist(), "metadata": metadata}
+                   for vector_id, values, metadata in batch]
+        size = sum(estimate_vector_bytes(vector_id, len(values), metadata) for vector_id, values, metadata in batch)
+
+        attempt = 0
+        while True:
+            try:
+                self.index.upsert(vectors=payload)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    with self._lock:
+                        self.stats.failures += 1
+                    raise
+                delay = random.uniform(0, self.base_delay * 2 ** attempt)
+                with self._lock:
+                    self.stats.retries += 1
+                logger.warning(f"Upsert of {len(batch)} vectors failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+        with self._lock:
+            self.stats.vectors += len(batch)
+            self.stats.requests += 1
+            self.stats.bytes += size
+        if self.on_committed is not None:
+            self.on_committed(batch)
+        return [vector_id for vector_id, _, _ in batch]
+
+    def _dispatch(self, batch: List[PendingVector]) -> Future:
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._send, batch)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def submit(self, vector_id: str, values: np.ndarray, metadata: Dict[str, Any]):
+        """Queue one vector, sending the pending request once it is full.
+
+        values are copied, so the caller may reuse its buffer. Raises the error of an
+        earlier streamed request if one has failed.
+        """
+        if self._stream_error is not None:
+            raise self._stream_error
+
+        values = np.array(values, dtype=np.float32)
+        size = estimate_vector_bytes(vector_id, len(values), metadata)
+        if self._pending and (self._pending_bytes + size > self.max_request_bytes
+                              or len(self._pending) >= self.max_batch_vectors):
+            self._dispatch_pending()
+        self._pending.append((vector_id, values, metadata))
+        self._pending_bytes += size
+
+    def _dispatch_pending(self):
+        future = self._dispatch(self._pending)
+        future.add_done_callback(self._record_stream_error)
+        self._stream_futures.append(future)
+        self._pending = []
+        self._pending_bytes = 0
+
+    def _record_stream_error(self, future: Future):
+        if future.exception() is not None and self._stream_error is None:
+            self._stream_error = future.exception()
+
+    def flush(self) -> List[str]:
+        """Send anything pending, wait for every streamed request, and return the stored IDs."""
+        if self._pending:
+            self._dispatch_pending()
+
+        futures, self._stream_futures = self._stream_futures, []
+        wait(futures)
+        self._stream_error = None
+        vector_ids: List[str] = []
+        errors = []
+        for future in futures:
+            if future.exception() is not None:
+                errors.append(future.exception())
+            else:
+                vector_ids.extend(future.result())
+        if errors:
+            raise errors[0]
+        return vector_ids
+
+    def discard(self):
+        """Drop anything pending and wait out streamed requests, e.g. after a failure."""
+        self._pending = []
+        self._pending_bytes = 0
+        futures, self._stream_futures = self._stream_futures, []
+        wait(futures)
+        self._stream_error = None
+
+    def upsert(self, vectors: Sequence[PendingVector]) -> List[str]:
+        """Upsert vectors now, in parallel size-bounded requests, returning the stored IDs."""
+        futures = [self._dispatch(batch)
+                   for batch in batch_by_payload(vectors, self.max_request_bytes, self.max_batch_vectors)]
+        wait(futures)
+        vector_ids: List[str] = []
+        for future in futures:
+            vector_ids.extend(future.result())
+        return vector_ids
+
+    def close(self):
+        """Flush outstanding work and stop the worker threads."""
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
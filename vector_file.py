@@ -0,0 +1,296 @@
+"""
+Single-file, memory-mappable format for the local vector index.
+
+Layout (little-endian):
+
+    header     fixed 72 bytes: magic, version, vector dtype, dimension, count and the
+               byte offset of every section below
+    vectors    count x dimension float32 or float16, starting on a page boundary
+    id table   count + 1 uint64 offsets into the ID strings
+    meta table count + 1 uint64 offsets into the metadata strings
+    ids        UTF-8 IDs, back to back
+    metadata   UTF-8 JSON metadata objects, back to back
+
+Every section is opened with numpy.memmap, so opening a file costs a header read no
+matter how large it is, processes searching the same file share its pages through
+the OS page cache, and IDs and metadata are decoded only for the rows a query returns.
+
+Changes made since the file was last written are appended to a VectorJournal next to
+it: a header (magic, version, dimension) followed by records, each a fixed 24-byte
+header (operation, row count, payload length, CRC-32 of the payload) and its payload.
+An upsert's payload is a length-prefixed JSON list of [id, metadata] pairs followed by
+its float32 vectors; a delete's is a JSON list of IDs. Appending costs only the size of
+the change, and a record torn by a crash fails its checksum and is dropped on replay.
+Only the process writing the journal cuts such a record off; readers stop before it,
+since it may be an append still in progress.
+"""
+
+import json
+import logging
+import os
+import struct
+import zlib
+from collections import abc
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BWVECS\x00\x00"
+FORMAT_VERSION = 1
+
+# magic, version, dtype code, dimension, count, then the offsets of vectors, id table,
+# meta table, ids and metadata sections
+_HEADER = struct.Struct("<8sIIIxxxxQQQQQQ")
+HEADER_SIZE = _HEADER.size
+
+_DTYPES = {0: np.dtype("<f4"), 1: np.dtype("<f2")}
+_DTYPE_CODES = {np.dtype(dtype).name: code for code, dtype in _DTYPES.items()}
+
+_PAGE_SIZE = 4096
+
+# Rows converted and written at a time, so saving never copies the whole matrix
+_WRITE_CHUNK_ROWS = 8192
+
+
+def _align(offset: int, alignment: int) -> int:
+    return -(-offset // alignment) * alignment
+
+
+def write_vector_file(path: str, vectors: np.ndarray, ids: Sequence[str], metadata: Sequence[Dict[str, Any]],
+                      dtype: str = "float32"):
+    """Write vectors with their IDs and metadata to path, replacing it atomically."""
+    if dtype not in _DTYPE_CODES:
+        raise ValueError(f"Unsupported vector dtype {dtype!r}, expected one of {sorted(_DTYPE_CODES)}")
+    if not (len(vectors) == len(ids) == len(metadata)):
+        raise ValueError(f"Got {len(vectors)} vectors, {len(ids)} IDs and {len(metadata)} metadata records")
+    count, dimension = vectors.shape
+    dtype_code = _DTYPE_CODES[dtype]
+
+    id_blobs = [vector_id.encode("utf-8") for vector_id in ids]
+    metadata_blobs = [json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                      for record in metadata]
+    id_offsets = np.zeros(count + 1, dtype="<u8")
+    id_offsets[1:] = np.cumsum([len(blob) for blob in id_blobs], dtype=np.uint64)
+    metadata_offsets = np.zeros(count + 1, dtype="<u8")
+    metadata_offsets[1:] = np.cumsum([len(blob) for blob in metadata_blobs], dtype=np.uint64)
+
+    vectors_offset = _PAGE_SIZE
+    id_table_offset = _align(vectors_offset + count * dimension * _DTYPES[dtype_code].itemsize, 8)
+    meta_table_offset = id_table_offset + id_offsets.nbytes
+    ids_offset = meta_table_offset + metadata_offsets.nbytes
+    metadata_offset = ids_offset + int(id_offsets[-1])
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, dtype_code, dimension, count, vectors_offset,
+                              id_table_offset, meta_table_offset, ids_offset, metadata_offset)
+        f.write(header.ljust(vectors_offset, b"\x00"))
+        for start in range(0, count, _WRITE_CHUNK_ROWS):
+            f.write(np.ascontiguousarray(vectors[start:start + _WRITE_CHUNK_ROWS], dtype=_DTYPES[dtype_code]).tobytes())
+        f.write(b"\x00" * (id_table_offset - f.tell()))
+        f.write(id_offsets.tobytes())
+        f.write(metadata_offsets.tobytes())
+        f.writelines(id_blobs)
+        f.writelines(metadata_blobs)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def ids_fingerprint(ids: Sequence[str]) -> int:
+    """Checksum of an ordered list of IDs, matching VectorFile.ids_fingerprint for the same IDs."""
+    blobs = [vector_id.encode("utf-8") for vector_id in ids]
+    offsets = np.zeros(len(blobs) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(blob) for blob in blobs], dtype=np.uint64)
+    return zlib.crc32(b"".join(blobs), zlib.crc32(offsets.tobytes()))
+
+
+class VectorFile:
+    """A vector file opened read-only through numpy.memmap."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a vector file")
+        (_, version, dtype_code, self.dimension, self.count, vectors_offset, id_table_offset,
+         meta_table_offset, ids_offset, metadata_offset) = _HEADER.unpack_from(header)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector file version in {self.path}: {version}")
+        if dtype_code not in _DTYPES:
+            raise ValueError(f"Unknown vector dtype code in {self.path}: {dtype_code}")
+        self.dtype = _DTYPES[dtype_code]
+
+        # np.memmap cannot map zero bytes, so empty sections become empty arrays
+        def section(offset: int, dtype, shape):
+            if int(np.prod(shape)) == 0:
+                return np.zeros(shape, dtype=dtype)
+            return np.memmap(self.path, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+        self.vectors = section(vectors_offset, self.dtype, (self.count, self.dimension))
+        self._id_offsets = section(id_table_offset, "<u8", (self.count + 1,))
+        self._metadata_offsets = section(meta_table_offset, "<u8", (self.count + 1,))
+        self._ids = section(ids_offset, np.uint8, (int(self._id_offsets[-1]),))
+        self._metadata = section(metadata_offset, np.uint8, (int(self._metadata_offsets[-1]),))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def id(self, row: int) -> str:
+        """ID of the vector in row."""
+        return self._ids[self._id_offsets[row]:self._id_offsets[row + 1]].tobytes().decode("utf-8")
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """Metadata of the vector in row."""
+        return json.loads(self._metadata[self._metadata_offsets[row]:self._metadata_offsets[row + 1]].tobytes())
+
+    def ids_fingerprint(self, count: Optional[int] = None) -> int:
+        """Checksum of the first count IDs (all by default), read straight from the file."""
+        count = self.count if count is None else count
+        offsets = self._id_offsets[:count + 1]
+        return zlib.crc32(self._ids[:int(offsets[-1])].tobytes(), zlib.crc32(offsets.tobytes()))
+
+    def ids(self) -> List[str]:
+        """Every ID, in row order."""
+        return [self.id(row) for row in range(self.count)]
+
+    def iter_metadata(self) -> Iterator[Dict[str, Any]]:
+        """Every metadata record, in row order."""
+        return (self.metadata(row) for row in range(self.count))
+
+
+class RecordView(abc.Sequence):
+    """Read-only sequence over one column (IDs or metadata) of a VectorFile."""
+
+    def __init__(self, vector_file: VectorFile, column: str):
+        self._file = vector_file
+        self._get = vector_file.id if column == "id" else vector_file.metadata
+
+    def __len__(self) -> int:
+        return len(self._file)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self._get(i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return self._get(row)
+
+
+JOURNAL_MAGIC = b"BWVJRNL\x00"
+JOURNAL_UPSERT = 1
+JOURNAL_DELETE = 2
+
+# magic, version, dimension
+_JOURNAL_HEADER = struct.Struct("<8sII")
+# operation, rows, payload bytes, payload CRC-32
+_JOURNAL_RECORD = struct.Struct("<BxxxIQIxxxx")
+_JSON_LENGTH = struct.Struct("<Q")
+
+
+class VectorJournal:
+    """Append-only log of the upserts and deletes made to a vector file since it was written.
+
+    Replaying the whole log onto the file it belongs to gives the current contents.
+    Replaying it twice gives the same result: the last change to each ID wins.
+    """
+
+    def __init__(self, path: str, dimension: int):
+        """Use the journal at path, which is only created by the first append."""
+        self.path = Path(path)
+        self.dimension = dimension
+        self.records = 0
+        # End of the intact records when a read-only replay stopped at a torn one
+        self._torn_end: Optional[int] = None
+
+    def _append(self, operation: int, rows: int, payload: bytes):
+        new = not self.path.exists()
+        if self._torn_end is not None and not new:
+            self._truncate(self._torn_end)
+        self._torn_end = None
+        with open(self.path, "ab") as f:
+            if new:
+                f.write(_JOURNAL_HEADER.pack(JOURNAL_MAGIC, FORMAT_VERSION, self.dimension))
+            f.write(_JOURNAL_RECORD.pack(operation, rows, len(payload), zlib.crc32(payload)))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self.records += 1
+
+    def append_upsert(self, ids: Sequence[str], vectors: np.ndarray, metadata: Sequence[Dict[str, Any]]):
+        """Durably record that vectors were stored under ids with metadata."""
+        records = json.dumps([[vector_id, record] for vector_id, record in zip(ids, metadata)],
+                             ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        payload = b"".join([_JSON_LENGTH.pack(len(records)), records,
+                            np.ascontiguousarray(vectors, dtype="<f4").tobytes()])
+        self._append(JOURNAL_UPSERT, len(ids), payload)
+
+    def append_delete(self, ids: Sequence[str]):
+        """Durably record that ids were deleted."""
+        self._append(JOURNAL_DELETE, len(ids), json.dumps(list(ids), ensure_ascii=False).encode("utf-8"))
+
+    def _truncate(self, end: int):
+        with open(self.path, "r+b") as f:
+            f.truncate(end)
+            os.fsync(f.fileno())
+
+    def replay(self, repair: bool = True
+               ) -> Iterator[Tuple[int, List[str], Optional[np.ndarray], Optional[List[Dict[str, Any]]]]]:
+        """Every intact record in order, as (operation, ids, vectors, metadata).
+
+        vectors and metadata are None for deletes. A torn or corrupt tail, left by a
+        crash during an append that was never acknowledged, is cut off if repair is set.
+        Readers pass repair=False, since the tail may be an append still in progress;
+        the file is then left alone until this journal's next append.
+        """
+        self.records = 0
+        self._torn_end = None
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            header = f.read(_JOURNAL_HEADER.size)
+            if len(header) < _JOURNAL_HEADER.size or header[:len(JOURNAL_MAGIC)] != JOURNAL_MAGIC:
+                raise ValueError(f"{self.path} is not a vector journal")
+            _, version, dimension = _JOURNAL_HEADER.unpack(header)
+            if version != FORMAT_VERSION or dimension != self.dimension:
+                raise ValueError(f"Vector journal {self.path} has version {version} and dimension {dimension}, "
+                                 f"expected {FORMAT_VERSION} and {self.dimension}")
+            while True:
+                good_end = f.tell()
+                record = f.read(_JOURNAL_RECORD.size)
+                if not record:
+                    return
+                if len(record) == _JOURNAL_RECORD.size:
+                    operation, rows, length, crc = _JOURNAL_RECORD.unpack(record)
+                    payload = f.read(length)
+                    if len(payload) == length and zlib.crc32(payload) == crc:
+                        self.records += 1
+                        if operation == JOURNAL_DELETE:
+                            yield operation, json.loads(payload), None, None
+                        else:
+                            (json_length,) = _JSON_LENGTH.unpack_from(payload)
+                            pairs = json.loads(payload[_JSON_LENGTH.size:_JSON_LENGTH.size + json_length])
+                            vectors = np.frombuffer(payload, dtype="<f4", offset=_JSON_LENGTH.size + json_length)
+                            yield (operation, [pair[0] for pair in pairs], vectors.reshape(rows, self.dimension),
+                                   [pair[1] for pair in pairs])
+                        continue
+                break
+        if not repair:
+            self._torn_end = good_end
+            return
+        logger.warning(f"Dropping a torn record at the end of {self.path}")
+        self._truncate(good_end)
+
+    def reset(self):
+        """Remove the journal once its changes have been written to the vector file."""
+        self.path.unlink(missing_ok=True)
+        self.records = 0
+        self._torn_end = None
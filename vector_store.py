@@ -0,0 +1,622 @@
+"""
+Vector backends for storing and searching paragraph embeddings.
+
+Ingestion and search talk to a VectorBackend rather than to Pinecone directly.
+PineconeBackend sends everything to the hosted index through the parallel upserter.
+LocalVectorStore keeps L2-normalized float32 vectors in one contiguous NumPy matrix
+and answers top-k cosine queries with a single matrix-vector product and
+argpartition, so a corpus of a few hundred thousand paragraphs can be searched in
+process, offline, in milliseconds. It is persisted in the memory-mappable format of
+vector_file.py.
+"""
+
+import logging
+import math
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from upserter import ParallelUpserter, PendingVector, UpsertStats
+from hnsw import HNSWIndex
+from ivfpq import IVFPQIndex
+from quantization import BinaryIndex, Int8Index
+from vector_file import JOURNAL_DELETE, RecordView, VectorFile, VectorJournal, ids_fingerprint, write_vector_file
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_INDEX_PATH = "./.cache/local_index.vec"
+
+# Full size of text-embedding-3-large embeddings; smaller sizes are requested with `dimensions`
+FULL_EMBEDDING_DIMENSIONS = 3072
+
+# Rows of a float16 matrix widened to float32 at a time when scoring
+_SCORE_CHUNK_ROWS = 1024
+
+# Most candidates a filtered approximate query fetches before an exact scan is used instead
+_ANN_MAX_FILTERED_FETCH = 1000
+
+# A search hit: {"id": ..., "score": ..., "metadata": {...}}
+Match = Dict[str, Any]
+
+# Approximate indexes the local store can build and search
+AnnIndex = Union[HNSWIndex, IVFPQIndex, Int8Index, BinaryIndex]
+
+
+class VectorBackend:
+    """Interface shared by every vector backend.
+
+    Vectors are streamed in with submit() and committed by flush(), or stored at once
+    with upsert(). Committed batches are reported to on_committed, which the ingestor
+    uses to checkpoint progress. Filters use Pinecone's metadata filter syntax.
+    """
+
+    on_committed: Optional[Callable[[List[PendingVector]], None]] = None
+    stats: UpsertStats
+
+    def submit(self, vector_id: str, values: np.ndarray, metadata: Dict[str, Any]):
+        """Queue one vector for storage."""
+        raise NotImplementedError
+
+    def flush(self) -> List[str]:
+        """Commit everything submitted so far and return the stored IDs."""
+        raise NotImplementedError
+
+    def discard(self):
+        """Drop anything submitted but not yet committed, e.g. after a failure."""
+        raise NotImplementedError
+
+    def upsert(self, vectors: Sequence[PendingVector]) -> List[str]:
+        """Store vectors now, returning the stored IDs."""
+        raise NotImplementedError
+
+    def query(self, vector: Sequence[float], top_k: int = 10,
+              filter: Optional[Dict[str, Any]] = None, include_metadata: bool = True) -> List[Match]:
+        """Return the top_k most similar vectors, best first (with empty metadata unless include_metadata)."""
+        raise NotImplementedError
+
+    def delete(self, vector_ids: Sequence[str]):
+        """Delete vectors by ID. Unknown IDs are ignored."""
+        raise NotImplementedError
+
+    def delete_all(self):
+        """Delete every vector."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Number of stored vectors."""
+        raise NotImplementedError
+
+    def count_by(self, field: str, values: Sequence[Any]) -> Dict[Any, int]:
+        """Number of stored vectors whose metadata field equals each of values."""
+        raise NotImplementedError
+
+    def close(self):
+        """Commit outstanding work and release resources."""
+        self.flush()
+
+
+def pinecone_index_name(dimensions: int = FULL_EMBEDDING_DIMENSIONS) -> str:
+    """Name of the Pinecone index holding embeddings of the given size (a Pinecone index has one dimension)."""
+    if dimensions == FULL_EMBEDDING_DIMENSIONS:
+        return "bahai-writings"
+    return f"bahai-writings-{dimensions}"
+
+
+class PineconeBackend(VectorBackend):
+    """Vectors stored in a Pinecone index, upserted through a ParallelUpserter."""
+
+    def __init__(self, index, parallelism: int = 4,
+                 on_committed: Optional[Callable[[List[PendingVector]], None]] = None):
+        self.index = index
+        self.upserter = ParallelUpserter(index, parallelism=parallelism, on_committed=on_committed)
+
+    @property
+    def on_committed(self):
+        return self.upserter.on_committed
+
+    @on_committed.setter
+    def on_committed(self, callback):
+        self.upserter.on_committed = callback
+
+    @property
+    def stats(self) -> UpsertStats:
+        return self.upserter.stats
+
+    def submit(self, vector_id: str, values: np.ndarray, metadata: Dict[str, Any]):
+        self.upserter.submit(vector_id, values, metadata)
+
+    def flush(self) -> List[str]:
+        return self.upserter.flush()
+
+    def discard(self):
+        self.upserter.discard()
+
+    def upsert(self, vectors: Sequence[PendingVector]) -> List[str]:
+        return self.upserter.upsert(vectors)
+
+    def query(self, vector: Sequence[float], top_k: int = 10,
+              filter: Optional[Dict[str, Any]] = None, include_metadata: bool = True) -> List[Match]:
+        if isinstance(vector, np.ndarray):
+            vector = vector.tolist()
+        results = self.index.query(vector=vector, top_k=top_k, include_metadata=include_metadata, filter=filter)
+        return [{"id": match["id"], "score": match["score"], "metadata": match["metadata"] if include_metadata else {}}
+                for match in results["matches"]]
+
+    def delete(self, vector_ids: Sequence[str]):
+        # Pinecone accepts at most 1000 IDs per delete
+        batch_size = 1000
+        for i in range(0, len(vector_ids), batch_size):
+            self.index.delete(ids=list(vector_ids[i:i + batch_size]))
+
+    def delete_all(self):
+        self.index.delete(delete_all=True)
+
+    def count(self) -> int:
+        return self.index.describe_index_stats()["total_vector_count"]
+
+    def count_by(self, field: str, values: Sequence[Any]) -> Dict[Any, int]:
+        # One filtered stats request per value; serverless indexes reject filtered stats
+        return {value: self.index.describe_index_stats(filter={field: {"$eq": value}})["total_vector_count"]
+                for value in values}
+
+    def close(self):
+        self.upserter.close()
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row in place (zero rows are left as zeros) and return it."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+class LocalVectorStore(VectorBackend):
+    """Exact cosine search over vectors held in a contiguous matrix.
+
+    Rows are L2-normalized on the way in, so cosine similarity is a plain dot product
+    and a query is one matrix-vector product followed by argpartition. Deleted rows are
+    filled by moving the last row into their place, keeping the matrix dense.
+
+    With a path, the store is loaded from a vector file (see vector_file.py) on open,
+    with vectors saved as storage_dtype (float32 or float16). Each commit and delete is
+    appended to a journal next to the file (path + ".journal") and fsynced before it is
+    reported, which costs only the size of the change. The journal is replayed on open,
+    and save() (called by close()) rewrites the file once and removes the journal.
+    With mmap=True the file is searched in place through numpy.memmap instead of being
+    copied into memory; the first change copies it into memory. Until then the journal
+    is only read, into a small in-memory overlay of the rows changed since the file was
+    written, so read-only processes like the app neither copy the mapping nor touch a
+    journal that ingest.py may still be appending to.
+
+    ann is an optional approximate index (HNSWIndex, IVFPQIndex, or a quantized Int8Index
+    or BinaryIndex). build_index() brings it up to date and saves it next to the vector
+    file, and it is loaded with the store when it was built over exactly the saved
+    vectors. Queries use it while it covers every stored vector and fall back to an
+    exact scan otherwise.
+    """
+
+    def __init__(self, dimension: int = FULL_EMBEDDING_DIMENSIONS, path: Optional[str] = None,
+                 on_committed: Optional[Callable[[List[PendingVector]], None]] = None,
+                 mmap: bool = False, storage_dtype: str = "float32", ann: Optional[AnnIndex] = None):
+        self.dimension = dimension
+        self.path = Path(path) if path else None
+        self.on_committed = on_committed
+        self.mmap = mmap
+        self.storage_dtype = storage_dtype
+        self.ann = ann
+        self.stats = UpsertStats()
+
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._size = 0
+        self._ids: Sequence[str] = []
+        self._metadata: Sequence[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._pending: List[PendingVector] = []
+        # The vector file being searched in place, while the store is memory-mapped
+        self._file: Optional[VectorFile] = None
+        # Per-field (value codes, vocabulary) used to evaluate filters without touching each row
+        self._field_codes: Dict[str, tuple] = {}
+        # Whether ann covers exactly the stored vectors
+        self._ann_ready = False
+        # Journaled changes over a memory-mapped file: its rows deleted or replaced since it
+        # was written, and a store of the rows upserted since
+        self._hidden: Optional[np.ndarray] = None
+        self._overlay: Optional[LocalVectorStore] = None
+
+        self._journal: Optional[VectorJournal] = None
+        if self.path is not None:
+            if self.path.exists():
+                self.load()
+            self._journal = VectorJournal(str(self.path) + ".journal", dimension)
+            self._replay_journal()
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """The normalized vectors currently stored, one row per ID.
+
+        With a journal overlay these are the vector file's rows, including hidden ones.
+        """
+        return self._matrix[:self._size]
+
+    def _make_writable(self):
+        """Copy a memory-mapped store into memory so it can be changed."""
+        if self._file is None:
+            return
+        self._matrix = np.array(self._file.vectors, dtype=np.float32)
+        self._ids = self._file.ids()
+        self._metadata = list(self._file.iter_metadata())
+        self._positions = {vector_id: row for row, vector_id in enumerate(self._ids)}
+        self._file = None
+        overlay, hidden = self._overlay, self._hidden
+        self._overlay = self._hidden = None
+        if overlay is not None:
+            self._remove([vector_id for vector_id, is_hidden in zip(self._ids, hidden) if is_hidden])
+            self._store(list(zip(overlay._ids, overlay.vectors, overlay._metadata)))
+
+    def _reserve(self, rows: int):
+        """Grow the matrix geometrically so appends are amortized O(1)."""
+        if rows <= len(self._matrix):
+            return
+        capacity = max(rows, 2 * len(self._matrix), 1024)
+        matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+
+    def _store(self, vectors: Sequence[PendingVector]):
+        """Apply upserts in memory."""
+        with self._lock:
+            self._make_writable()
+            self._reserve(self._size + len(vectors))
+            for vector_id, values, metadata in vectors:
+                values = np.asarray(values, dtype=np.float32)
+                if values.shape != (self.dimension,):
+                    raise ValueError(f"Vector {vector_id} has shape {values.shape}, expected ({self.dimension},)")
+                row = self._positions.get(vector_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._positions[vector_id] = row
+                    self._ids.append(vector_id)
+                    self._metadata.append(metadata)
+                else:
+                    self._metadata[row] = metadata
+                self._matrix[row] = values
+                normalize_rows(self._matrix[row:row + 1])
+            self._field_codes.clear()
+            self._ann_ready = False
+
+    def _remove(self, vector_ids: Sequence[str]):
+        """Apply deletes in memory, moving the last row into each freed row."""
+        with self._lock:
+            self._make_writable()
+            for vector_id in vector_ids:
+                row = self._positions.pop(vector_id, None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if row != last:
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = self._ids[last]
+                    self._metadata[row] = self._metadata[last]
+                    self._positions[self._ids[row]] = row
+                self._ids.pop()
+                self._metadata.pop()
+                self._size -= 1
+            self._field_codes.clear()
+            self._ann_ready = False
+
+    def _replay_journal(self):
+        """Apply the changes journaled since the vector file was last written.
+
+        A store held in memory applies them in place and cuts off a torn tail. A
+        memory-mapped one reads them into the overlay, leaving the journal as it is.
+        """
+        if self._file is None:
+            for operation, vector_ids, vectors, metadata in self._journal.replay():
+                if operation == JOURNAL_DELETE:
+                    self._remove(vector_ids)
+                else:
+                    self._store(list(zip(vector_ids, vectors, metadata)))
+        else:
+            self._read_overlay()
+        if self._journal.records:
+            logger.info(f"Replayed {self._journal.records} journaled changes onto {self.path}")
+
+    def _read_overlay(self):
+        """Read the journal into an overlay over the memory-mapped file."""
+        overlay = LocalVectorStore(self.dimension)
+        changed = set()
+        for operation, vector_ids, vectors, metadata in self._journal.replay(repair=False):
+            if operation == JOURNAL_DELETE:
+                overlay._remove(vector_ids)
+            else:
+                overlay._store(list(zip(vector_ids, vectors, metadata)))
+            changed.update(vector_ids)
+        if not changed:
+            return
+        with self._lock:
+            self._hidden = np.fromiter((vector_id in changed for vector_id in self._ids), dtype=bool, count=self._size)
+            self._overlay = overlay
+
+    def _live(self, mask: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """mask narrowed to the rows the overlay does not hide."""
+        if self._hidden is None:
+            return mask
+        return ~self._hidden if mask is None else mask & ~self._hidden
+
+    def _commit(self, vectors: List[PendingVector]) -> List[str]:
+        if not vectors:
+            return []
+        # Journaled in the order applied, so concurrent commits replay to the same state
+        with self._lock:
+            self._store(vectors)
+            self.stats.vectors += len(vectors)
+            self.stats.requests += 1
+            if self._journal is not None:
+                self._journal.append_upsert([vector_id for vector_id, _, _ in vectors],
+                                            np.stack([values for _, values, _ in vectors]),
+                                            [metadata for _, _, metadata in vectors])
+        if self.on_committed is not None:
+            self.on_committed(vectors)
+        return [vector_id for vector_id, _, _ in vectors]
+
+    def submit(self, vector_id: str, values: np.ndarray, metadata: Dict[str, Any]):
+        self._pending.append((vector_id, np.array(values, dtype=np.float32), metadata))
+
+    def flush(self) -> List[str]:
+        pending, self._pending = self._pending, []
+        return self._commit(pending)
+
+    def discard(self):
+        self._pending = []
+
+    def upsert(self, vectors: Sequence[PendingVector]) -> List[str]:
+        return self._commit(list(vectors))
+
+    def _codes(self, field: str) -> tuple:
+        """(per-row value codes, value -> code vocabulary) of a metadata field, built on first use."""
+        if field not in self._field_codes:
+            vocabulary: Dict[Any, int] = {}
+            codes = np.fromiter(
+                (vocabulary.setdefault(metadata.get(field), len(vocabulary)) for metadata in self._metadata),
+                dtype=np.int32, count=self._size
+            )
+            self._field_codes[field] = (codes, vocabulary)
+        return self._field_codes[field]
+
+    def _filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask for a Pinecone-style filter of $eq/$ne/$in/$nin conditions."""
+        mask = np.ones(self._size, dtype=bool)
+        for field, condition in filter.items():
+            codes, vocabulary = self._codes(field)
+
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for operator, operand in condition.items():
+                if operator in ("$eq", "$ne"):
+                    operand = [operand]
+                elif operator not in ("$in", "$nin"):
+                    raise ValueError(f"Unsupported filter operator for local search: {operator}")
+                wanted = np.array([vocabulary[value] for value in operand if value in vocabulary], dtype=np.int32)
+                matched = np.isin(codes, wanted)
+                mask &= ~matched if operator in ("$ne", "$nin") else matched
+        return mask
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine scores of every row against a normalized float32 query."""
+        vectors = self.vectors
+        if vectors.dtype == np.float32:
+            return vectors @ query
+        # float16 rows are widened into one reused block at a time rather than all at once
+        scores = np.empty(len(vectors), dtype=np.float32)
+        block = np.empty((min(_SCORE_CHUNK_ROWS, len(vectors)), self.dimension), dtype=np.float32)
+        for start in range(0, len(vectors), _SCORE_CHUNK_ROWS):
+            rows = min(_SCORE_CHUNK_ROWS, len(vectors) - start)
+            block[:rows] = vectors[start:start + rows]
+            np.matmul(block[:rows], query, out=scores[start:start + rows])
+        return scores
+
+    def _exact_top(self, query: np.ndarray, top_k: int,
+                   mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (rows, scores) by scanning every row."""
+        scores = self._scores(query)
+        available = self._size
+        if mask is not None:
+            scores[~mask] = -np.inf
+            available = int(mask.sum())
+        k = min(top_k, available)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return top, scores[top]
+
+    def _ann_top(self, query: np.ndarray, top_k: int,
+                 mask: Optional[np.ndarray]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Top-k (rows, scores) from the approximate index, or None if a filter rules it out.
+
+        With a filter, enough candidates are fetched to expect top_k of them to pass it;
+        when that would be too many, or too few pass, an exact scan is cheaper and exact.
+        """
+        if mask is None:
+            return self.ann.search(self.vectors, query, top_k)
+        available = int(mask.sum())
+        if available == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        fetch = min(self._size, 2 * math.ceil(top_k * self._size / available))
+        if fetch > _ANN_MAX_FILTERED_FETCH:
+            return None
+        rows, scores = self.ann.search(self.vectors, query, fetch)
+        keep = mask[rows]
+        rows, scores = rows[keep][:top_k], scores[keep][:top_k]
+        if len(rows) < min(top_k, available):
+            return None
+        return rows, scores
+
+    def query(self, vector: Sequence[float], top_k: int = 10,
+              filter: Optional[Dict[str, Any]] = None, include_metadata: bool = True) -> List[Match]:
+        return self._search(vector, top_k, filter, include_metadata, approximate=True)
+
+    def exact_search(self, vector: Sequence[float], top_k: int = 10,
+                     filter: Optional[Dict[str, Any]] = None, include_metadata: bool = True) -> List[Match]:
+        """Like query, but always scanning every vector instead of using the approximate index."""
+        return self._search(vector, top_k, filter, include_metadata, approximate=False)
+
+    def _search(self, vector: Sequence[float], top_k: int, filter: Optional[Dict[str, Any]],
+                include_metadata: bool, approximate: bool) -> List[Match]:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        with self._lock:
+            mask = self._live(self._filter_mask(filter) if filter else None)
+            top = None
+            if approximate and self.ann is not None and self._ann_ready:
+                top = self._ann_top(query, top_k, mask)
+            if top is None:
+                top = self._exact_top(query, top_k, mask)
+            rows, scores = top
+            matches = [{"id": self._ids[row], "score": score,
+                        "metadata": self._metadata[row] if include_metadata else {}}
+                       for row, score in zip(rows.tolist(), scores.tolist())]
+            if self._overlay is not None:
+                matches = sorted(matches + self._overlay.exact_search(query, top_k, filter, include_metadata),
+                                 key=lambda match: -match["score"])[:top_k]
+            return matches
+
+    def items(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """Every stored (ID, normalized vector), including journaled changes, without copying the vectors."""
+        vectors, ids, hidden, overlay = self.vectors, self._ids, self._hidden, self._overlay
+        for row in range(len(vectors)):
+            if hidden is None or not hidden[row]:
+                yield ids[row], vectors[row]
+        if overlay is not None:
+            yield from overlay.items()
+
+    def delete(self, vector_ids: Sequence[str]):
+        with self._lock:
+            self._remove(vector_ids)
+            if self._journal is not None:
+                self._journal.append_delete(vector_ids)
+
+    def delete_all(self):
+        with self._lock:
+            self._matrix = np.zeros((0, self.dimension), dtype=np.float32)
+            self._size = 0
+            self._ids = []
+            self._metadata = []
+            self._positions = {}
+            self._pending = []
+            self._file = None
+            self._hidden = None
+            self._overlay = None
+            self._field_codes.clear()
+            self._ann_ready = False
+        # Writing the empty store is cheap and supersedes the journal
+        if self.path is not None:
+            self.save()
+
+    def count(self) -> int:
+        with self._lock:
+            if self._overlay is None:
+                return self._size
+            return self._size - int(self._hidden.sum()) + self._overlay.count()
+
+    def count_by(self, field: str, values: Sequence[Any]) -> Dict[Any, int]:
+        with self._lock:
+            codes, vocabulary = self._codes(field)
+            if self._hidden is not None:
+                codes = codes[~self._hidden]
+            counts = np.bincount(codes, minlength=len(vocabulary))
+            counted = {value: int(counts[vocabulary[value]]) if value in vocabulary else 0 for value in values}
+            if self._overlay is not None:
+                for value, count in self._overlay.count_by(field, values).items():
+                    counted[value] += count
+            return counted
+
+    def save(self):
+        """Write the store to its vector file, replacing the file atomically, and drop the journal."""
+        with self._lock:
+            if self._overlay is not None:
+                self._make_writable()
+            write_vector_file(self.path, self.vectors, self._ids, self._metadata, self.storage_dtype)
+            self._journal.reset()
+
+    def load(self):
+        """Replace the store's contents with its vector file, mapping it if mmap is set."""
+        vector_file = VectorFile(self.path)
+        if vector_file.dimension != self.dimension:
+            raise ValueError(f"Local index at {self.path} has dimension {vector_file.dimension}, "
+                             f"expected {self.dimension}")
+        with self._lock:
+            self._file = vector_file
+            self._matrix = vector_file.vectors
+            self._size = len(vector_file)
+            self._ids = RecordView(vector_file, "id")
+            self._metadata = RecordView(vector_file, "metadata")
+            self._positions = {}
+            self._hidden = None
+            self._overlay = None
+            self._field_codes.clear()
+            self._ann_ready = False
+            self._load_ann()
+            if not self.mmap:
+                self._make_writable()
+        logger.info(f"Loaded {self._size} vectors from {self.path}"
+                    f"{' (memory-mapped)' if self.mmap else ''}")
+
+    def _ids_fingerprint(self, count: int) -> int:
+        if self._file is not None:
+            return self._file.ids_fingerprint(count)
+        return ids_fingerprint(self._ids[:count])
+
+    def _ann_path(self) -> Path:
+        return self.path.with_suffix(self.ann.SUFFIX)
+
+    def _load_ann(self):
+        """Load the saved approximate index if it was built over exactly the stored vectors."""
+        if self.ann is None or not self._ann_path().exists():
+            return
+        saved = type(self.ann).load(self._ann_path())
+        if saved.count != self._size or saved.fingerprint != self._ids_fingerprint(self._size):
+            logger.warning(f"{self._ann_path()} is out of date with {self.path}; "
+                           f"using exact search until the index is rebuilt")
+            return
+        saved.copy_search_params(self.ann)
+        self.ann = saved
+        self._ann_ready = True
+
+    def build_index(self):
+        """Bring the approximate index up to date with the stored vectors and save it.
+
+        Rows appended since the index was last built are inserted into it; if any
+        indexed row was deleted or moved, the index is rebuilt from scratch.
+        """
+        if self.ann is None:
+            return
+        with self._lock:
+            if self._ann_ready:
+                return
+            indexed = self.ann.count
+            if indexed and (indexed > self._size or self.ann.fingerprint != self._ids_fingerprint(indexed)):
+                logger.info("Stored vectors changed since the approximate index was built; rebuilding it")
+                self.ann = self.ann.empty_copy()
+            logger.info(f"Adding {self._size - self.ann.count} vectors to the approximate index")
+            self.ann.add(self.vectors)
+            self.ann.fingerprint = self._ids_fingerprint(self._size)
+            if self.path is not None:
+                self.ann.save(self._ann_path())
+            self._ann_ready = True
+
+    def close(self):
+        """Commit outstanding vectors, fold the journal into the vector file and bring the approximate index up to date."""
+        self.flush()
+        # A memory-mapped store that changed nothing leaves the journal to the process writing it
+        if self._journal is not None and self._file is None and (self._journal.records or not self.path.exists()):
+            self.save()
+        self.build_index()